@@ -1,3 +1,6 @@
+# Imported first so the startup timer also covers the imports below
+from config.startup import startup_timer
+
 from flask import Flask, render_template, request, jsonify, redirect, url_for, session, flash
 from flask_cors import CORS
 import os
@@ -8,11 +11,16 @@ from functools import wraps
 
 # Import our custom modules
 from config.settings import Config
-from sheets_api.google_sheets import SheetsManager
+from storage.factory import create_storage_backend
 from inventory.models import InventoryManager
 from shipments.models import ShipmentManager
 from transfers.models import TransferManager
 from auth.auth_manager import AuthManager
+from reports.models import DashboardManager
+from reports.analytics import AnalyticsManager
+from reports.forecast import ForecastManager
+from reports.movements import GRANULARITIES, MovementReportManager, parse_report_date
+from jobs.models import JobManager
 
 # Load environment variables
 load_dotenv()
@@ -25,15 +33,47 @@ app.config['SESSION_PERMANENT'] = False
 
 CORS(app)
 
-# Initialize managers
-sheets_manager = SheetsManager()
+# Initialize managers (storage connects lazily on first use)
+sheets_manager = create_storage_backend()
 inventory_manager = InventoryManager(sheets_manager)
 shipment_manager = ShipmentManager(sheets_manager)
 transfer_manager = TransferManager(sheets_manager)
 auth_manager = AuthManager(sheets_manager)
+dashboard_manager = DashboardManager(sheets_manager)
+analytics_manager = AnalyticsManager(sheets_manager)
+forecast_manager = ForecastManager(sheets_manager)
+movement_report_manager = MovementReportManager(sheets_manager)
+job_manager = JobManager(sheets_manager)
+
+startup_timer.mark('app_ready')
+
+# Snapshots loaded while serving a request need no re-check before its writes
+@app.before_request
+def begin_storage_request():
+    sheets_manager.begin_request()
+
+@app.teardown_request
+def end_storage_request(error=None):
+    sheets_manager.end_request()
 
-# Create default admin user if needed
-auth_manager.create_default_admin()
+# Write queued stock movements once the response has been sent
+@app.after_request
+def flush_stock_movements(response):
+    response.call_on_close(sheets_manager.flush_movements)
+    return response
+
+# Move closed months of Stock_Movements into their partitions in the background
+@app.after_request
+def schedule_movement_archive(response):
+    if Config.JOBS_ENABLED and sheets_manager.movement_archive_due():
+        job_manager.submit('movement_archive', lambda progress: sheets_manager.archive_movements())
+    return response
+
+# Log the import-to-first-response breakdown once per process
+@app.after_request
+def log_startup_timings(response):
+    startup_timer.report_first_response()
+    return response
 
 # Authentication decorator
 def login_required(f):
@@ -44,6 +84,15 @@ def login_required(f):
         return f(*args, **kwargs)
     return decorated_function
 
+# Background job helpers (?async=1 runs a long operation as a job)
+def run_as_job():
+    return Config.JOBS_ENABLED and request.args.get('async', '').lower() in ('1', 'true', 'yes')
+
+def job_accepted(job_id):
+    if not job_id:
+        return jsonify({'success': False, 'error': 'Job queue is full, try again shortly'}), 503
+    return jsonify({'success': True, 'job_id': job_id, 'status': 'queued', 'status_url': f"/api/jobs/{job_id}"}), 202
+
 # Authentication routes
 @app.route('/login', methods=['GET', 'POST'])
 def login():
@@ -55,6 +104,9 @@ def login():
             flash('Please enter both username and password', 'error')
             return render_template('auth/login.html')
         
+        # Create default admin user if needed
+        auth_manager.ensure_default_admin()
+        
         user = auth_manager.validate_user(username, password)
         if user:
             session['user'] = user
@@ -121,6 +173,114 @@ def add_inventory_item():
     except Exception as e:
         return jsonify({'success': False, 'error': str(e)}), 500
 
+@app.route('/api/inventory/search')
+def search_inventory():
+    try:
+        query = request.args.get('q', '')
+        category = request.args.get('category') or None
+        limit = min(max(request.args.get('limit', 20, type=int), 1), 200)
+        
+        results, suggestions = inventory_manager.search_items_ranked(query, category, limit)
+        return jsonify({
+            'success': True,
+            'data': [{'item': item, 'score': score} for score, item in results],
+            'suggestions': suggestions
+        })
+    except Exception as e:
+        return jsonify({'success': False, 'error': str(e)}), 500
+
+@app.route('/api/inventory/bulk', methods=['POST'])
+def bulk_add_inventory_items():
+    try:
+        upload = request.files.get('file')
+        if upload:
+            items = inventory_manager.parse_csv_items(upload.read().decode('utf-8-sig'))
+        elif request.mimetype == 'text/csv':
+            items = inventory_manager.parse_csv_items(request.get_data(as_text=True))
+        else:
+            data = request.get_json(silent=True)
+            items = data.get('items', []) if isinstance(data, dict) else data
+        
+        if not isinstance(items, list):
+            return jsonify({'success': False, 'error': 'Expected a JSON array or CSV of items'}), 400
+        
+        if run_as_job():
+            return job_accepted(job_manager.submit('inventory_bulk', lambda progress: inventory_manager.add_items_bulk(items, progress)))
+        
+        result = inventory_manager.add_items_bulk(items)
+        if not result['success']:
+            return jsonify({
+                'success': False, 'error': 'Bulk import failed', 'errors': result['errors'], 'item_ids': result['item_ids']
+            }), 400
+        return jsonify({'success': True, 'count': len(result['item_ids']), 'item_ids': result['item_ids']})
+    except Exception as e:
+        return jsonify({'success': False, 'error': str(e)}), 500
+
+@app.route('/api/inventory/cycle-count', methods=['POST'])
+def cycle_count_inventory():
+    try:
+        data = request.get_json(silent=True)
+        counts = data.get('counts', []) if isinstance(data, dict) else data
+        counted_by = data.get('counted_by', '') if isinstance(data, dict) else ''
+        
+        if not isinstance(counts, list):
+            return jsonify({'success': False, 'error': 'Expected a list of counts'}), 400
+        
+        result = inventory_manager.cycle_count(counts, counted_by)
+        if not result['success']:
+            return jsonify({'success': False, 'error': 'Cycle count failed', 'errors': result['errors']}), 400
+        
+        variances = result['variances']
+        return jsonify({
+            'success': True,
+            'count_id': result['count_id'],
+            'counted': len(variances),
+            'adjusted': sum(1 for line in variances if line['variance'] != 0),
+            'variances': variances
+        })
+    except Exception as e:
+        return jsonify({'success': False, 'error': str(e)}), 500
+
+@app.route('/api/inventory/<item_id>/locations')
+def get_item_locations(item_id):
+    try:
+        data = inventory_manager.get_item_locations(item_id)
+        if data is None:
+            return jsonify({'success': False, 'error': 'Item not found'}), 404
+        return jsonify({'success': True, 'data': data})
+    except Exception as e:
+        return jsonify({'success': False, 'error': str(e)}), 500
+
+@app.route('/api/inventory/locations/rebuild', methods=['POST'])
+@login_required
+def rebuild_item_locations():
+    """Check the location ledger against Stock_Movements; ?apply=1 rewrites it"""
+    try:
+        apply = request.args.get('apply', '').lower() in ('1', 'true', 'yes')
+        result = inventory_manager.rebuild_locations(apply)
+        if result is None:
+            return jsonify({'success': False, 'error': 'Unable to rebuild stock locations'}), 500
+        return jsonify({'success': True, 'data': result})
+    except Exception as e:
+        return jsonify({'success': False, 'error': str(e)}), 500
+
+@app.route('/api/admin/reconcile')
+@login_required
+def reconcile_stock():
+    """Replay Stock_Movements and report items whose Current Stock disagrees"""
+    try:
+        flag = request.args.get('checkpoint', '').lower()
+        checkpoint = True if flag in ('1', 'true', 'yes') else False if flag in ('0', 'false', 'no') else None
+        if run_as_job():
+            return job_accepted(job_manager.submit('reconcile', lambda progress: inventory_manager.reconcile_stock(checkpoint)))
+        
+        result = inventory_manager.reconcile_stock(checkpoint)
+        if result is None:
+            return jsonify({'success': False, 'error': 'Unable to reconcile stock'}), 500
+        return jsonify({'success': True, 'data': result})
+    except Exception as e:
+        return jsonify({'success': False, 'error': str(e)}), 500
+
 @app.route('/api/inventory/<item_id>', methods=['PUT'])
 def update_inventory_item(item_id):
     try:
@@ -141,7 +301,10 @@ def delete_inventory_item(item_id):
 @app.route('/api/shipments', methods=['GET'])
 def get_shipments():
     try:
-        shipments = shipment_manager.get_all_shipments()
+        shipments = shipment_manager.find_shipments(
+            status=request.args.get('status'),
+            supplier=request.args.get('supplier')
+        )
         return jsonify({'success': True, 'data': shipments})
     except Exception as e:
         return jsonify({'success': False, 'error': str(e)}), 500
@@ -158,7 +321,11 @@ def add_shipment():
 @app.route('/api/transfers', methods=['GET'])
 def get_transfers():
     try:
-        transfers = transfer_manager.get_all_transfers()
+        transfers = transfer_manager.find_transfers(
+            status=request.args.get('status'),
+            from_location=request.args.get('from_location'),
+            to_location=request.args.get('to_location')
+        )
         return jsonify({'success': True, 'data': transfers})
     except Exception as e:
         return jsonify({'success': False, 'error': str(e)}), 500
@@ -167,6 +334,9 @@ def get_transfers():
 def add_transfer():
     try:
         data = request.json
+        error = transfer_manager.source_error(data)
+        if error:
+            return jsonify({'success': False, 'error': error}), 400
         transfer_id = transfer_manager.add_transfer(data)
         return jsonify({'success': True, 'transfer_id': transfer_id})
     except Exception as e:
@@ -179,16 +349,61 @@ def receive_shipment(shipment_id):
         items_received = data.get('items_received', [])
         received_by = data.get('received_by', '')
         
-        success = shipment_manager.receive_shipment(shipment_id, items_received, received_by)
-        return jsonify({'success': success})
+        if not isinstance(items_received, list):
+            return jsonify({'success': False, 'error': 'Expected a list of received items'}), 400
+        
+        if run_as_job():
+            return job_accepted(job_manager.submit('shipment_receive', lambda progress: shipment_manager.receive_shipment(
+                shipment_id, items_received, received_by, progress
+            )))
+        
+        result = shipment_manager.receive_shipment(shipment_id, items_received, received_by)
+        if not result['success']:
+            status = 404 if result['error'] == 'Shipment not found' else 400
+            return jsonify({'success': False, 'error': result['error'], 'results': result['results']}), status
+        
+        received = [line for line in result['results'] if line['status'] == 'received']
+        return jsonify({
+            'success': True,
+            'shipment_id': shipment_id,
+            'received_lines': len(received),
+            'rejected_lines': len(result['results']) - len(received),
+            'results': result['results']
+        })
+    except Exception as e:
+        return jsonify({'success': False, 'error': str(e)}), 500
+
+@app.route('/api/transfers/complete', methods=['POST'])
+def complete_transfers():
+    try:
+        data = request.get_json(silent=True)
+        transfer_ids = data.get('transfer_ids', []) if isinstance(data, dict) else data
+        
+        if not isinstance(transfer_ids, list) or not transfer_ids:
+            return jsonify({'success': False, 'error': 'Expected a list of transfer IDs'}), 400
+        
+        result = transfer_manager.complete_transfers(transfer_ids)
+        if not result['success']:
+            return jsonify({'success': False, 'error': result['error'], 'results': result['results']}), 500
+        
+        completed = sum(1 for line in result['results'] if line['status'] == 'completed')
+        return jsonify({
+            'success': True,
+            'completed': completed,
+            'rejected': len(result['results']) - completed,
+            'results': result['results']
+        })
     except Exception as e:
         return jsonify({'success': False, 'error': str(e)}), 500
 
 @app.route('/api/transfers/<transfer_id>/complete', methods=['POST'])
 def complete_transfer(transfer_id):
     try:
-        success = transfer_manager.complete_transfer(transfer_id)
-        return jsonify({'success': success})
+        result = transfer_manager.complete_transfer(transfer_id)
+        if not result['success']:
+            status = 404 if result['error'] == 'Transfer not found' else 400
+            return jsonify({'success': False, 'error': result['error']}), status
+        return jsonify({'success': True, 'transfer_id': transfer_id, 'locations': result['locations']})
     except Exception as e:
         return jsonify({'success': False, 'error': str(e)}), 500
 
@@ -205,10 +420,168 @@ def update_transfer_status(transfer_id):
 @app.route('/api/stock-check')
 def stock_check():
     try:
-        low_stock_items = inventory_manager.get_low_stock_items()
+        limit = request.args.get('limit', type=int)
+        low_stock_items = inventory_manager.get_low_stock_items(limit)
         return jsonify({'success': True, 'data': low_stock_items})
     except Exception as e:
         return jsonify({'success': False, 'error': str(e)}), 500
 
+@app.route('/api/stock-check/events')
+def stock_check_events():
+    try:
+        limit = request.args.get('limit', 50, type=int)
+        return jsonify({'success': True, 'data': inventory_manager.get_stock_alerts(limit)})
+    except Exception as e:
+        return jsonify({'success': False, 'error': str(e)}), 500
+
+@app.route('/api/dashboard')
+def get_dashboard():
+    try:
+        limit = request.args.get('recent', 10, type=int)
+        data = dashboard_manager.get_dashboard(recent_limit=limit)
+        if data is None:
+            return jsonify({'success': False, 'error': 'Unable to load dashboard data'}), 500
+        return jsonify({'success': True, 'data': data})
+    except Exception as e:
+        return jsonify({'success': False, 'error': str(e)}), 500
+
+@app.route('/api/analytics/inventory')
+def get_inventory_analytics():
+    try:
+        data = analytics_manager.get_inventory_analytics()
+        if data is None:
+            return jsonify({'success': False, 'error': 'Unable to compute inventory analytics'}), 500
+        return jsonify({'success': True, 'data': data})
+    except Exception as e:
+        return jsonify({'success': False, 'error': str(e)}), 500
+
+@app.route('/api/forecast')
+def get_demand_forecast():
+    try:
+        window_days = request.args.get('days', type=int)
+        lead_time_days = request.args.get('lead_time', type=float)
+        review_days = request.args.get('review_days', type=float)
+        if (window_days is not None and window_days < 1) or any(
+            value is not None and value < 0 for value in (lead_time_days, review_days)
+        ):
+            return jsonify({'success': False, 'error': 'days must be positive and lead_time and review_days not negative'}), 400
+        limit = request.args.get('limit', type=int)
+        data = forecast_manager.get_forecast(window_days, lead_time_days, review_days, limit)
+        if data is None:
+            return jsonify({'success': False, 'error': 'Unable to compute demand forecast'}), 500
+        return jsonify({'success': True, 'data': data})
+    except Exception as e:
+        return jsonify({'success': False, 'error': str(e)}), 500
+
+@app.route('/api/forecast/reorder-levels', methods=['POST'])
+@login_required
+def apply_forecast_reorder_levels():
+    """Set each item's Reorder Level to the forecast's suggestion"""
+    try:
+        window_days = request.args.get('days', type=int)
+        lead_time_days = request.args.get('lead_time', type=float)
+        if (window_days is not None and window_days < 1) or (lead_time_days is not None and lead_time_days < 0):
+            return jsonify({'success': False, 'error': 'days must be positive and lead_time not negative'}), 400
+        if run_as_job():
+            return job_accepted(job_manager.submit(
+                'reorder_levels', lambda progress: forecast_manager.apply_reorder_levels(window_days, lead_time_days)
+            ))
+        
+        result = forecast_manager.apply_reorder_levels(window_days, lead_time_days)
+        if result is None or not result['success']:
+            return jsonify({'success': False, 'error': 'Unable to update reorder levels'}), 500
+        return jsonify({'success': True, 'data': result})
+    except Exception as e:
+        return jsonify({'success': False, 'error': str(e)}), 500
+
+@app.route('/api/reports/movements')
+def get_movement_report():
+    try:
+        granularity = request.args.get('granularity', 'day')
+        if granularity not in GRANULARITIES:
+            return jsonify({'success': False, 'error': f"granularity must be one of: {', '.join(GRANULARITIES)}"}), 400
+        try:
+            start = parse_report_date(request.args.get('from'))
+            end = parse_report_date(request.args.get('to'))
+        except ValueError:
+            return jsonify({'success': False, 'error': 'Dates must be in YYYY-MM-DD format'}), 400
+        if start and end and start > end:
+            return jsonify({'success': False, 'error': 'from must not be after to'}), 400
+        
+        limit = request.args.get('limit', 20, type=int)
+        data = movement_report_manager.get_movement_report(start, end, granularity, limit)
+        if data is None:
+            return jsonify({'success': False, 'error': 'Unable to build movement report'}), 500
+        return jsonify({'success': True, 'data': data})
+    except Exception as e:
+        return jsonify({'success': False, 'error': str(e)}), 500
+
+@app.route('/api/movements')
+def get_stock_movements():
+    try:
+        try:
+            start = parse_report_date(request.args.get('from'))
+            end = parse_report_date(request.args.get('to'))
+        except ValueError:
+            return jsonify({'success': False, 'error': 'Dates must be in YYYY-MM-DD format'}), 400
+        if start and end and start > end:
+            return jsonify({'success': False, 'error': 'from must not be after to'}), 400
+        limit = request.args.get('limit', 500, type=int)
+        movements = movement_report_manager.get_movements(start, end, request.args.get('item_id'), limit)
+        if movements is None:
+            return jsonify({'success': False, 'error': 'Unable to load stock movements'}), 500
+        return jsonify({'success': True, 'data': movements})
+    except Exception as e:
+        return jsonify({'success': False, 'error': str(e)}), 500
+
+@app.route('/api/admin/movements/partitions')
+@login_required
+def get_movement_partitions():
+    try:
+        return jsonify({'success': True, 'data': sheets_manager.movement_partitions()})
+    except Exception as e:
+        return jsonify({'success': False, 'error': str(e)}), 500
+
+@app.route('/api/admin/movements/archive', methods=['POST'])
+@login_required
+def archive_stock_movements():
+    """Move closed months of Stock_Movements into per-month partition sheets"""
+    try:
+        if run_as_job():
+            return job_accepted(job_manager.submit('movement_archive', lambda progress: sheets_manager.archive_movements()))
+        
+        result = sheets_manager.archive_movements()
+        if not result['success']:
+            return jsonify({'success': False, 'error': result['error']}), 500
+        return jsonify({'success': True, 'data': result})
+    except Exception as e:
+        return jsonify({'success': False, 'error': str(e)}), 500
+
+@app.route('/api/jobs/<job_id>')
+def get_job(job_id):
+    try:
+        job = job_manager.get_job(job_id)
+        if not job:
+            return jsonify({'success': False, 'error': 'Job not found'}), 404
+        return jsonify({'success': True, 'data': job})
+    except Exception as e:
+        return jsonify({'success': False, 'error': str(e)}), 500
+
+@app.route('/api/cache-stats')
+@login_required
+def cache_stats():
+    try:
+        return jsonify({'success': True, 'data': sheets_manager.cache_stats()})
+    except Exception as e:
+        return jsonify({'success': False, 'error': str(e)}), 500
+
+@app.route('/api/scheduler-stats')
+@login_required
+def scheduler_stats():
+    try:
+        return jsonify({'success': True, 'data': sheets_manager.scheduler_stats()})
+    except Exception as e:
+        return jsonify({'success': False, 'error': str(e)}), 500
+
 if __name__ == '__main__':
     app.run(debug=True, host='0.0.0.0', port=5000)
\ No newline at end of file
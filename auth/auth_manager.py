@@ -1,20 +1,18 @@
 from datetime import datetime
 from config.settings import Config
+from storage.base import StorageQuotaError
 
 class AuthManager:
     def __init__(self, sheets_manager):
         self.sheets_manager = sheets_manager
         self.users_sheet = Config.USERS_SHEET
+        self._default_admin_checked = False
     
     def validate_user(self, username, password):
-        """Validate user credentials against Google Sheets"""
+        """Validate user credentials against the users sheet"""
         try:
-            worksheet = self.sheets_manager.get_worksheet(self.users_sheet)
-            if not worksheet:
-                return None
-            
             # Get all users data
-            users_data = worksheet.get_all_records()
+            users_data = self.sheets_manager.get_all_records(self.users_sheet)
             
             # Find user with matching username and password
             for user in users_data:
@@ -32,6 +30,8 @@ class AuthManager:
                     }
             
             return None
+        except StorageQuotaError:
+            raise
         except Exception as e:
             print(f"Error validating user: {e}")
             return None
@@ -39,39 +39,23 @@ class AuthManager:
     def update_last_login(self, username):
         """Update the last login timestamp for a user"""
         try:
-            worksheet = self.sheets_manager.get_worksheet(self.users_sheet)
-            if not worksheet:
-                return False
-            
-            # Get all data including headers
-            all_data = worksheet.get_all_values()
-            if not all_data:
-                return False
-            
-            headers = all_data[0]
-            
-            # Find username and last login columns
-            username_col = None
-            last_login_col = None
-            
-            for i, header in enumerate(headers):
-                if header.lower() == 'username':
-                    username_col = i + 1  # gspread uses 1-based indexing
-                elif header.lower() == 'last login':
-                    last_login_col = i + 1
-            
-            if username_col is None or last_login_col is None:
-                return False
+            users_data = self.sheets_manager.get_all_records(self.users_sheet)
             
-            # Find the user row
-            for row_idx, row_data in enumerate(all_data[1:], start=2):  # Start from row 2 (skip header)
-                if username_col <= len(row_data) and row_data[username_col-1].lower() == username.lower():
-                    # Update last login
-                    current_time = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
-                    worksheet.update_cell(row_idx, last_login_col, current_time)
-                    return True
+            # Find the user row (usernames match case-insensitively)
+            for user in users_data:
+                if str(user.get('Username', '')).lower() == username.lower():
+                    row_number = self.sheets_manager.find_row_by_id(self.users_sheet, 'Username', user.get('Username'))
+                    if not row_number:
+                        return False
+                    
+                    # Write only the Last Login cell, leaving the credentials untouched
+                    return self.sheets_manager.update_cells(self.users_sheet, row_number, {
+                        'Last Login': datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+                    })
             
             return False
+        except StorageQuotaError:
+            raise
         except Exception as e:
             print(f"Error updating last login: {e}")
             return False
@@ -79,11 +63,7 @@ class AuthManager:
     def get_user_by_username(self, username):
         """Get user information by username"""
         try:
-            worksheet = self.sheets_manager.get_worksheet(self.users_sheet)
-            if not worksheet:
-                return None
-            
-            users_data = worksheet.get_all_records()
+            users_data = self.sheets_manager.get_all_records(self.users_sheet)
             
             for user in users_data:
                 if user.get('Username', '').lower() == username.lower():
@@ -96,33 +76,25 @@ class AuthManager:
                     }
             
             return None
+        except StorageQuotaError:
+            raise
         except Exception as e:
             print(f"Error getting user: {e}")
             return None
     
+    def ensure_default_admin(self):
+        """Create the default admin on first use instead of at import time"""
+        if not self._default_admin_checked:
+            self._default_admin_checked = self.create_default_admin()
+    
     def create_default_admin(self):
         """Create a default admin user if no users exist"""
         try:
-            worksheet = self.sheets_manager.get_worksheet(self.users_sheet)
-            if not worksheet:
-                print("Users sheet not found. Please ensure Google Sheets is properly configured.")
-                return False
-            
-            # Check if any users exist (handle empty sheet)
-            try:
-                users_data = worksheet.get_all_records()
-                if users_data:
-                    print("Users already exist in the system.")
-                    return True  # Users already exist
-            except Exception:
-                # Sheet might be empty or have no data, that's okay
-                pass
-            
-            # Check if sheet has any data at all
-            all_values = worksheet.get_all_values()
-            if len(all_values) > 1:  # More than just headers
-                print("Users sheet has data, skipping default admin creation.")
-                return True
+            # Check if any users exist
+            users_data = self.sheets_manager.get_all_records(self.users_sheet)
+            if users_data:
+                print("Users already exist in the system.")
+                return True  # Users already exist
             
             # Create default admin user
             admin_data = [
@@ -134,7 +106,9 @@ class AuthManager:
                 datetime.now().strftime('%Y-%m-%d %H:%M:%S')  # Created Date
             ]
             
-            worksheet.append_row(admin_data)
+            if not self.sheets_manager.append_row(self.users_sheet, admin_data):
+                print("Users sheet not found. Please ensure storage is properly configured.")
+                return False
             print("✅ Default admin user created successfully!")
             print("📋 Login Details:")
             print("   Username: admin")
@@ -142,6 +116,8 @@ class AuthManager:
             print("⚠️  IMPORTANT: Please change the default password after first login!")
             return True
             
+        except StorageQuotaError:
+            raise
         except Exception as e:
             print(f"Error creating default admin: {e}")
             return False
\ No newline at end of file
@@ -0,0 +1,226 @@
+"""Sheets API benchmark for the Flask routes in app.py
+
+Runs each route against the in-memory FakeClient at several sheet sizes and
+reports wall time, API round-trips and quota units per request. Every request
+starts with a cold table cache, as on a fresh serverless worker.
+
+Usage:
+    python benchmarks/bench_routes.py [--sizes 100,1000,10000,50000]
+                                      [--latency-ms 0] [--check-time]
+                                      [--update-baseline]
+
+Exits with status 1 when a route makes more round-trips or uses more quota
+units than recorded in benchmarks/baseline.json (or, with --check-time, runs
+slower than the baseline by more than --time-tolerance).
+"""
+import argparse
+import importlib
+import json
+import os
+import sys
+import time
+from datetime import date
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+os.environ['STORAGE_BACKEND'] = 'fake'
+
+from config.settings import Config
+from sheets_api.fake_sheets import FakeClient
+from sheets_api.google_sheets import SheetsManager
+from sheets_api.scheduler import RequestScheduler
+from storage import factory
+from storage.base import SHEET_SCHEMAS, movement_partition_name
+
+SIZES = [100, 1000, 10000, 50000]
+BASELINE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'baseline.json')
+SPREADSHEET_ID = 'benchmark-spreadsheet'
+RECEIVED_LINES = 5
+LARGE_DELIVERY_LINES = 50
+BATCH_TRANSFERS = 50
+BULK_ITEMS = 2500
+COUNTED_ITEMS = 200
+ARCHIVED_MONTH = '2026-01'
+
+def seed_spreadsheet(client, size):
+    """Fill a fake spreadsheet with size inventory rows and related history
+    
+    The live movements are dated this month; a month from earlier in the year
+    is already archived to its own partition.
+    """
+    spreadsheet = client.open_by_key(SPREADSHEET_ID)
+    timestamp = date.today().replace(day=1).strftime('%Y-%m-%d 09:00:00')
+    tables = {name: [list(headers)] for name, headers in SHEET_SCHEMAS.items()}
+    archived = [list(SHEET_SCHEMAS[Config.STOCK_MOVEMENTS_SHEET])]
+    
+    for index in range(size):
+        item_id = f"ITM-{index:08d}"
+        tables[Config.INVENTORY_SHEET].append([
+            item_id, f"Item {index}", f"Category {index % 12}", 10 + index % 50, 'lbs',
+            1.5 + index % 20, 20, f"Supplier {index % 30}", timestamp
+        ])
+        tables[Config.STOCK_MOVEMENTS_SHEET].append([
+            timestamp, item_id, f"Item {index}", 'Initial Stock', 10 + index % 50, 10 + index % 50, '', ''
+        ])
+        archived.append([
+            f"{ARCHIVED_MONTH}-{1 + index % 28:02d} 12:00:00", item_id, f"Item {index}", 'Stock In', 1, 1, '', ''
+        ])
+    
+    for index in range(max(1, size // 10)):
+        tables[Config.SHIPMENTS_SHEET].append([
+            f"SHP-{index:08d}", timestamp, f"Supplier {index % 30}", 'Pending', RECEIVED_LINES, 100, '', ''
+        ])
+        tables[Config.TRANSFERS_SHEET].append([
+            f"TRF-{index:08d}", timestamp, Config.DEFAULT_LOCATION, 'Bar', f"ITM-{index % size:08d}",
+            f"Item {index % size}", 2, 'Pending', ''
+        ])
+    
+    tables[Config.USERS_SHEET].append(['admin', 'admin123', 'admin', 'TRUE', '', timestamp])
+    partition = movement_partition_name(ARCHIVED_MONTH)
+    tables[partition] = archived
+    tables[Config.MOVEMENT_PARTITIONS_SHEET].append([
+        partition, ARCHIVED_MONTH, archived[1][0], archived[-1][0], size, timestamp
+    ])
+    
+    for name, rows in tables.items():
+        spreadsheet.seed_worksheet(name, rows)
+
+def scenarios(size):
+    """(name, method, path, json body) for every route under test"""
+    middle = f"ITM-{size // 2:08d}"
+    last = f"ITM-{size - 1:08d}"
+    received = [{'item_id': f"ITM-{index:08d}", 'quantity': 3} for index in range(min(RECEIVED_LINES, size))]
+    return [
+        ('inventory_list', 'GET', '/api/inventory', None),
+        ('inventory_add', 'POST', '/api/inventory', {
+            'name': 'Benchmark Item', 'category': 'Bench', 'current_stock': 5, 'unit': 'pcs',
+            'cost_per_unit': 2, 'reorder_level': 1, 'supplier': 'Bench Supply'
+        }),
+        ('inventory_bulk', 'POST', '/api/inventory/bulk', [
+            {'name': f"Bulk Item {index}", 'category': 'Bulk', 'current_stock': index % 40, 'unit': 'pcs',
+             'cost_per_unit': 1.25, 'reorder_level': 10, 'supplier': 'Bulk Supply'}
+            for index in range(BULK_ITEMS)
+        ]),
+        ('cycle_count', 'POST', '/api/inventory/cycle-count', {
+            'counts': [{'item_id': f"ITM-{index:08d}", 'counted_quantity': index % 7}
+                       for index in range(min(COUNTED_ITEMS, size))],
+            'counted_by': 'bench'
+        }),
+        ('inventory_update', 'PUT', f"/api/inventory/{middle}", {'current_stock': 99, 'name': 'Renamed'}),
+        ('inventory_adjust', 'PUT', f"/api/inventory/{middle}", {'current_stock': 7}),
+        ('inventory_delete', 'DELETE', f"/api/inventory/{last}", None),
+        ('inventory_search', 'GET', '/api/inventory/search?q=item+4&limit=20', None),
+        ('stock_check', 'GET', '/api/stock-check', None),
+        ('dashboard', 'GET', '/api/dashboard', None),
+        ('inventory_analytics', 'GET', '/api/analytics/inventory', None),
+        ('demand_forecast', 'GET', '/api/forecast?limit=50', None),
+        ('movement_report', 'GET', '/api/reports/movements?from=2026-01-01&granularity=week', None),
+        ('movements_recent', 'GET', f"/api/movements?from={date.today().replace(day=1).isoformat()}&limit=50", None),
+        ('shipments_by_status', 'GET', '/api/shipments?status=Pending&supplier=Supplier+3', None),
+        ('transfers_by_location', 'GET', '/api/transfers?status=Pending&to_location=Bar', None),
+        ('shipment_receive', 'POST', '/api/shipments/SHP-00000000/receive', {
+            'items_received': received, 'received_by': 'bench'
+        }),
+        ('shipment_receive_large', 'POST', '/api/shipments/SHP-00000001/receive', {
+            'items_received': [{'item_id': f"ITM-{index % size:08d}", 'quantity': 1} for index in range(LARGE_DELIVERY_LINES)],
+            'received_by': 'bench'
+        }),
+        ('transfer_complete', 'POST', '/api/transfers/TRF-00000000/complete', None),
+        ('transfer_complete_batch', 'POST', '/api/transfers/complete', {
+            'transfer_ids': [f"TRF-{index:08d}" for index in range(min(BATCH_TRANSFERS, max(1, size // 10)))]
+        }),
+    ]
+
+def load_app(backend):
+    """Import app.py wired to the given storage backend"""
+    factory.create_storage_backend = lambda backend_name=None: backend
+    if 'app' in sys.modules:
+        return importlib.reload(sys.modules['app'])
+    return importlib.import_module('app')
+
+def run_scenario(size, latency_ms, scenario):
+    """Run one request on a freshly seeded, connected backend with a cold cache"""
+    name, method, path, body = scenario
+    client = FakeClient()
+    seed_spreadsheet(client, size)
+    
+    backend = SheetsManager(client=client, spreadsheet_id=SPREADSHEET_ID)
+    backend.scheduler = RequestScheduler(reads_per_minute=10 ** 9, writes_per_minute=10 ** 9)
+    backend.spreadsheet  # connect before measuring
+    app_module = load_app(backend)
+    test_client = app_module.app.test_client()
+    
+    client.latency_ms = latency_ms
+    client.stats.reset()
+    started = time.perf_counter()
+    response = test_client.open(path, method=method, json=body)
+    backend.flush_movements()
+    wall_ms = (time.perf_counter() - started) * 1000
+    
+    stats = client.stats.snapshot()
+    return {
+        'status': response.status_code,
+        'wall_ms': round(wall_ms, 2),
+        'round_trips': stats['round_trips'],
+        'read_units': stats['read_units'],
+        'write_units': stats['write_units'],
+        'calls': stats['calls']
+    }
+
+def find_regressions(results, baseline, check_time, time_tolerance):
+    regressions = []
+    for key, result in results.items():
+        previous = baseline.get(key)
+        if not previous:
+            continue
+        for metric in ('round_trips', 'read_units', 'write_units'):
+            if result[metric] > previous[metric]:
+                regressions.append(f"{key}: {metric} {previous[metric]} -> {result[metric]}")
+        if check_time and result['wall_ms'] > previous['wall_ms'] * (1 + time_tolerance):
+            regressions.append(f"{key}: wall_ms {previous['wall_ms']} -> {result['wall_ms']}")
+    return regressions
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--sizes', default=','.join(str(size) for size in SIZES))
+    parser.add_argument('--latency-ms', type=float, default=0, help='simulated latency per API call')
+    parser.add_argument('--check-time', action='store_true', help='also fail on wall time regressions')
+    parser.add_argument('--time-tolerance', type=float, default=0.5)
+    parser.add_argument('--update-baseline', action='store_true')
+    args = parser.parse_args()
+    
+    sizes = [int(size) for size in args.sizes.split(',')]
+    results = {}
+    print(f"{'scenario':<20}{'rows':>8}{'status':>8}{'wall ms':>11}{'trips':>8}{'reads':>8}{'writes':>8}")
+    for size in sizes:
+        for scenario in scenarios(size):
+            result = run_scenario(size, args.latency_ms, scenario)
+            results[f"{scenario[0]}@{size}"] = result
+            print(f"{scenario[0]:<20}{size:>8}{result['status']:>8}{result['wall_ms']:>11.1f}"
+                  f"{result['round_trips']:>8}{result['read_units']:>8}{result['write_units']:>8}")
+    
+    baseline = {}
+    if os.path.exists(BASELINE_PATH):
+        with open(BASELINE_PATH) as baseline_file:
+            baseline = json.load(baseline_file)
+    
+    if args.update_baseline:
+        baseline.update({
+            key: {metric: result[metric] for metric in ('wall_ms', 'round_trips', 'read_units', 'write_units')}
+            for key, result in results.items()
+        })
+        with open(BASELINE_PATH, 'w') as baseline_file:
+            json.dump(baseline, baseline_file, indent=2, sort_keys=True)
+        print(f"Baseline written to {BASELINE_PATH}")
+        return 0
+    
+    regressions = find_regressions(results, baseline, args.check_time, args.time_tolerance)
+    failed = [key for key, result in results.items() if result['status'] >= 500]
+    for key in failed:
+        print(f"FAILED: {key} returned {results[key]['status']}")
+    for regression in regressions:
+        print(f"REGRESSION: {regression}")
+    return 1 if regressions or failed else 0
+
+if __name__ == '__main__':
+    sys.exit(main())
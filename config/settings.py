@@ -1,4 +1,5 @@
 import os
+import tempfile
 from dotenv import load_dotenv
 
 load_dotenv()
@@ -8,6 +9,14 @@ class Config:
     GOOGLE_CREDENTIALS_FILE = os.environ.get('GOOGLE_CREDENTIALS_FILE') or 'credentials.json'
     SPREADSHEET_ID = os.environ.get('SPREADSHEET_ID')
     
+    # Storage backend: 'sheets' (Google Sheets), 'sqlite' (local database) or 'fake' (in-memory Sheets stand-in)
+    STORAGE_BACKEND = os.environ.get('STORAGE_BACKEND', 'sheets')
+    SQLITE_DATABASE_PATH = os.environ.get('SQLITE_DATABASE_PATH', 'inventory.db')
+    FAKE_SHEETS_LATENCY_MS = float(os.environ.get('FAKE_SHEETS_LATENCY_MS', 0))
+    
+    # Per-instance copy of the verified-schema marker kept in the spreadsheet's developer metadata
+    SCHEMA_MARKER_PATH = os.environ.get('SCHEMA_MARKER_PATH') or os.path.join(tempfile.gettempdir(), 'invmanagement_schema_verified')
+    
     # Sheet names
     INVENTORY_SHEET = 'Inventory'
     SHIPMENTS_SHEET = 'Shipments'
@@ -15,6 +24,56 @@ class Config:
     STOCK_MOVEMENTS_SHEET = 'Stock_Movements'
     SUPPLIERS_SHEET = 'Suppliers'
     USERS_SHEET = 'Users'
+    STOCK_LOCATIONS_SHEET = 'Stock_Locations'
+    MOVEMENT_PARTITIONS_SHEET = 'Movement_Partitions'
+    
+    # Location holding any stock not assigned elsewhere (receipts and adjustments land here)
+    DEFAULT_LOCATION = os.environ.get('DEFAULT_LOCATION', 'Main Storage')
+    
+    # Sheets cache settings (TTL in seconds, 0 disables caching)
+    SHEETS_CACHE_TTL = float(os.environ.get('SHEETS_CACHE_TTL', 30))
+    SHEETS_CACHE_MAX_TABLES = int(os.environ.get('SHEETS_CACHE_MAX_TABLES', 16))
+    
+    # Sheets API quota scheduler (per-minute token buckets and retry backoff in seconds)
+    SHEETS_READS_PER_MINUTE = int(os.environ.get('SHEETS_READS_PER_MINUTE', 60))
+    SHEETS_WRITES_PER_MINUTE = int(os.environ.get('SHEETS_WRITES_PER_MINUTE', 60))
+    SHEETS_MAX_RETRIES = int(os.environ.get('SHEETS_MAX_RETRIES', 5))
+    SHEETS_BACKOFF_BASE = float(os.environ.get('SHEETS_BACKOFF_BASE', 1.0))
+    SHEETS_BACKOFF_MAX = float(os.environ.get('SHEETS_BACKOFF_MAX', 32.0))
+    
+    # Times a write re-locates its target rows after another worker shifted them
+    SHEETS_WRITE_ATTEMPTS = int(os.environ.get('SHEETS_WRITE_ATTEMPTS', 3))
+    
+    # Rows per append_rows request, keeping bulk writes under the API payload limit
+    SHEETS_APPEND_CHUNK_ROWS = int(os.environ.get('SHEETS_APPEND_CHUNK_ROWS', 1000))
+    
+    # Stock movement write-behind buffer (flush after N rows or T milliseconds)
+    MOVEMENT_FLUSH_ROWS = int(os.environ.get('MOVEMENT_FLUSH_ROWS', 50))
+    MOVEMENT_FLUSH_INTERVAL_MS = int(os.environ.get('MOVEMENT_FLUSH_INTERVAL_MS', 2000))
+    
+    # Background jobs (worker threads, queue limit and the SQLite file holding job status). Jobs need
+    # one long-lived process, so they are off by default on Vercel and ?async=1 runs inline there
+    JOBS_ENABLED = os.environ.get('JOBS_ENABLED', 'false' if os.environ.get('VERCEL') else 'true').lower() == 'true'
+    JOB_MAX_WORKERS = int(os.environ.get('JOB_MAX_WORKERS', 2))
+    JOB_MAX_QUEUED = int(os.environ.get('JOB_MAX_QUEUED', 50))
+    JOBS_DATABASE_PATH = os.environ.get('JOBS_DATABASE_PATH') or os.path.join(tempfile.gettempdir(), 'invmanagement_jobs.db')
+    
+    # Stock_Movements archival (months kept in the live sheet, current one included, and how
+    # often each worker checks whether older months are waiting to be moved out)
+    MOVEMENT_OPEN_MONTHS = max(1, int(os.environ.get('MOVEMENT_OPEN_MONTHS', 2)))
+    MOVEMENT_ARCHIVE_CHECK_SECONDS = int(os.environ.get('MOVEMENT_ARCHIVE_CHECK_SECONDS', 3600))
+    
+    # Stock ledger checkpoints (SQLite file, movements between checkpoints, checkpoints kept)
+    LEDGER_CHECKPOINT_PATH = os.environ.get('LEDGER_CHECKPOINT_PATH') or os.path.join(tempfile.gettempdir(), 'invmanagement_checkpoints.db')
+    LEDGER_CHECKPOINT_INTERVAL = int(os.environ.get('LEDGER_CHECKPOINT_INTERVAL', 5000))
+    LEDGER_CHECKPOINTS_KEPT = int(os.environ.get('LEDGER_CHECKPOINTS_KEPT', 3))
+    
+    # Demand forecasting (days of usage history, supplier lead time, days one order should
+    # cover, and safety stock in standard deviations of lead-time usage; 1.65 is ~95% service)
+    FORECAST_WINDOW_DAYS = int(os.environ.get('FORECAST_WINDOW_DAYS', 28))
+    FORECAST_LEAD_TIME_DAYS = float(os.environ.get('FORECAST_LEAD_TIME_DAYS', 3))
+    FORECAST_REVIEW_DAYS = float(os.environ.get('FORECAST_REVIEW_DAYS', 7))
+    FORECAST_SAFETY_FACTOR = float(os.environ.get('FORECAST_SAFETY_FACTOR', 1.65))
     
     # Application settings
     DEBUG = os.environ.get('DEBUG', 'True').lower() == 'true'
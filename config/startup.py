@@ -0,0 +1,38 @@
+import threading
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
+
+class StartupTimer:
+    """Collects a timing breakdown from import to the first response"""
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.phases = OrderedDict()
+        self.reported = False
+        self._lock = threading.Lock()
+    
+    def mark(self, name):
+        """Record the time elapsed since import under name"""
+        self.phases[name] = time.perf_counter() - self.started
+    
+    @contextmanager
+    def phase(self, name):
+        """Record how long the wrapped block takes under name"""
+        phase_started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.phases[name] = time.perf_counter() - phase_started
+    
+    def report_first_response(self):
+        """Log the breakdown once, when the first response goes out"""
+        with self._lock:
+            if self.reported:
+                return
+            self.reported = True
+            self.mark('first_response')
+        breakdown = ', '.join(f"{name}={seconds * 1000:.1f}ms" for name, seconds in self.phases.items())
+        print(f"Startup timings: {breakdown}")
+
+# Module level so the timer starts as soon as the entry point imports it
+startup_timer = StartupTimer()
@@ -0,0 +1,208 @@
+import os
+import sqlite3
+import threading
+from datetime import datetime
+from config.settings import Config
+from storage.base import SHEET_SCHEMAS, StorageQuotaError, to_float
+
+def movement_key(record):
+    """Identify a movement row by all of its cells"""
+    return '\x1f'.join(str(record.get(header, '')) for header in SHEET_SCHEMAS[Config.STOCK_MOVEMENTS_SHEET])
+
+def replay_movements(movements, balances=None):
+    """Fold movements into {item_id: [balance, last logged stock level]}, starting from balances"""
+    balances = {item_id: list(state) for item_id, state in (balances or {}).items()}
+    for movement in movements:
+        item_id = str(movement.get('Item ID', ''))
+        if not item_id:
+            continue
+        state = balances.setdefault(item_id, [0.0, None])
+        state[0] += to_float(movement.get('Quantity Change'))
+        if movement.get('New Stock Level') not in (None, ''):
+            state[1] = to_float(movement.get('New Stock Level'))
+    return balances
+
+class CheckpointStore:
+    """Replayed stock balances saved in a small SQLite file
+    
+    A checkpoint holds every item's balance after the first movement_rows
+    rows of Stock_Movements, plus the last of those rows so a later replay
+    can confirm the log still starts the same way. Checkpoints are derived
+    data: losing the file only means the next check replays everything.
+    """
+    def __init__(self, database_path=None, keep=None):
+        self.database_path = database_path or Config.LEDGER_CHECKPOINT_PATH
+        self.keep = keep or Config.LEDGER_CHECKPOINTS_KEPT
+        self._lock = threading.RLock()
+        directory = os.path.dirname(self.database_path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self.connection = sqlite3.connect(self.database_path, check_same_thread=False)
+        self.connection.execute('PRAGMA journal_mode=WAL')
+        with self._lock, self.connection:
+            self.connection.execute(
+                "CREATE TABLE IF NOT EXISTS checkpoints ("
+                "checkpoint_id INTEGER PRIMARY KEY AUTOINCREMENT, created_at TEXT, "
+                "movement_rows INTEGER, last_movement TEXT, items INTEGER)"
+            )
+            self.connection.execute(
+                "CREATE TABLE IF NOT EXISTS checkpoint_balances ("
+                "checkpoint_id INTEGER, item_id TEXT, balance REAL, last_level REAL, "
+                "PRIMARY KEY (checkpoint_id, item_id))"
+            )
+    
+    def latest(self):
+        """The newest checkpoint with its balances, or None"""
+        with self._lock:
+            row = self.connection.execute(
+                "SELECT checkpoint_id, created_at, movement_rows, last_movement FROM checkpoints "
+                "ORDER BY checkpoint_id DESC LIMIT 1"
+            ).fetchone()
+            if row is None:
+                return None
+            balances = self.connection.execute(
+                "SELECT item_id, balance, last_level FROM checkpoint_balances WHERE checkpoint_id = ?", (row[0],)
+            ).fetchall()
+        return {
+            'checkpoint_id': row[0],
+            'created_at': row[1],
+            'movement_rows': row[2],
+            'last_movement': row[3],
+            'balances': {item_id: [balance, last_level] for item_id, balance, last_level in balances}
+        }
+    
+    def save(self, movement_rows, last_movement, balances):
+        """Store a checkpoint and drop all but the newest self.keep; returns its ID"""
+        created_at = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+        with self._lock, self.connection:
+            checkpoint_id = self.connection.execute(
+                "INSERT INTO checkpoints (created_at, movement_rows, last_movement, items) VALUES (?, ?, ?, ?)",
+                (created_at, movement_rows, last_movement, len(balances))
+            ).lastrowid
+            self.connection.executemany(
+                "INSERT INTO checkpoint_balances (checkpoint_id, item_id, balance, last_level) VALUES (?, ?, ?, ?)",
+                [(checkpoint_id, item_id, state[0], state[1]) for item_id, state in balances.items()]
+            )
+            expired = [row[0] for row in self.connection.execute(
+                "SELECT checkpoint_id FROM checkpoints ORDER BY checkpoint_id DESC LIMIT -1 OFFSET ?", (self.keep,)
+            ).fetchall()]
+            for expired_id in expired:
+                self.connection.execute("DELETE FROM checkpoint_balances WHERE checkpoint_id = ?", (expired_id,))
+                self.connection.execute("DELETE FROM checkpoints WHERE checkpoint_id = ?", (expired_id,))
+        return checkpoint_id
+
+class StockReconciler:
+    """Checks Inventory Current Stock against a replay of Stock_Movements
+    
+    The log is the archived movement partitions followed by the live sheet.
+    Replay starts from the newest checkpoint whose last row still sits at
+    the same position in the log, so only later movements are folded. A new
+    checkpoint is written once LEDGER_CHECKPOINT_INTERVAL movements have
+    been replayed past the one used.
+    """
+    def __init__(self, sheets_manager, store=None, interval=None):
+        self.sheets = sheets_manager
+        self._store = store
+        self.interval = Config.LEDGER_CHECKPOINT_INTERVAL if interval is None else interval
+    
+    @property
+    def store(self):
+        # Opened on first use so app start-up does not touch the file
+        if self._store is None:
+            self._store = CheckpointStore()
+        return self._store
+    
+    def _latest_checkpoint(self):
+        try:
+            return self.store.latest()
+        except sqlite3.Error as e:
+            print(f"Error reading ledger checkpoint: {e}")
+            return None
+    
+    def _covers(self, checkpoint, movements, offset):
+        """Whether movements (the log from position offset on) still hold the checkpoint's last row where it left it"""
+        rows = checkpoint['movement_rows'] - offset
+        return 0 < rows <= len(movements) and movement_key(movements[rows - 1]) == checkpoint['last_movement']
+    
+    def _history(self, latest):
+        """(items, movements, offset, checkpoint used) with movements read from position offset of the log
+        
+        Archived partitions come before the live sheet in the log, so they
+        are only read when the checkpoint does not reach past them.
+        """
+        partitions = self.sheets.movement_partitions()
+        archived = sum(partition['rows'] for partition in partitions)
+        if (latest and latest['movement_rows'] > archived) or not partitions:
+            records = self.sheets.batch_get_records([Config.INVENTORY_SHEET, Config.STOCK_MOVEMENTS_SHEET])
+            items = records[Config.INVENTORY_SHEET]
+            movements = records[Config.STOCK_MOVEMENTS_SHEET]
+            if latest and self._covers(latest, movements, archived):
+                return items, movements, archived, latest
+            if not partitions:
+                return items, movements, 0, None
+        else:
+            items = self.sheets.get_all_records(Config.INVENTORY_SHEET)
+        movements = self.sheets.get_movements()
+        return items, movements, 0, latest if latest and self._covers(latest, movements, 0) else None
+    
+    def reconcile(self, checkpoint=None):
+        """Report items whose Current Stock differs from their replayed balance
+        
+        checkpoint=True always writes a new checkpoint, False never does and
+        None writes one when the interval has been reached.
+        """
+        try:
+            items, movements, offset, used = self._history(self._latest_checkpoint())
+            start = used['movement_rows'] - offset if used else 0
+            total = offset + len(movements)
+            balances = replay_movements(movements[start:], used['balances'] if used else None)
+            
+            mismatches = []
+            item_ids = set()
+            for item in items:
+                item_id = str(item.get('Item ID', ''))
+                item_ids.add(item_id)
+                current_stock = to_float(item.get('Current Stock'))
+                balance, last_level = balances.get(item_id, (0.0, None))
+                if abs(current_stock - balance) > 1e-6:
+                    mismatches.append({
+                        'item_id': item_id,
+                        'name': item.get('Name', ''),
+                        'current_stock': current_stock,
+                        'ledger_balance': round(balance, 6),
+                        'difference': round(current_stock - balance, 6),
+                        'last_logged_level': last_level
+                    })
+            # Balances left on items that are no longer in the inventory
+            orphaned = [
+                {'item_id': item_id, 'ledger_balance': round(state[0], 6)}
+                for item_id, state in sorted(balances.items())
+                if item_id not in item_ids and abs(state[0]) > 1e-6
+            ]
+            
+            written = None
+            due = len(movements) - start >= self.interval
+            if movements and (checkpoint or (checkpoint is None and due)):
+                try:
+                    written = self.store.save(total, movement_key(movements[-1]), balances)
+                except sqlite3.Error as e:
+                    print(f"Error writing ledger checkpoint: {e}")
+            
+            return {
+                'checked': len(items),
+                'movement_rows': total,
+                'replayed': len(movements) - start,
+                'checkpoint_used': {
+                    'checkpoint_id': used['checkpoint_id'],
+                    'created_at': used['created_at'],
+                    'movement_rows': used['movement_rows']
+                } if used else None,
+                'checkpoint_written': written,
+                'mismatches': mismatches,
+                'orphaned_balances': orphaned
+            }
+        except StorageQuotaError:
+            raise
+        except Exception as e:
+            print(f"Error reconciling stock: {e}")
+            return None
@@ -0,0 +1,228 @@
+import json
+from datetime import datetime
+from config.settings import Config
+from storage.base import StorageQuotaError, to_float
+
+def _number(value):
+    value = round(float(value), 6)
+    return int(value) if value.is_integer() else value
+
+def parse_locations(value):
+    """Decode a Locations cell into {location: quantity}"""
+    if not value:
+        return {}
+    try:
+        data = json.loads(value) if isinstance(value, str) else value
+    except ValueError:
+        return {}
+    if not isinstance(data, dict):
+        return {}
+    return {str(location): to_float(quantity) for location, quantity in data.items()}
+
+def format_locations(balances):
+    """Encode {location: quantity} for the Locations cell, dropping empty balances"""
+    return json.dumps(
+        {location: _number(quantity) for location, quantity in sorted(balances.items()) if round(quantity, 6)},
+        separators=(',', ':')
+    )
+
+class LocationLedger:
+    """Per-(item, location) stock balances kept in the Stock_Locations sheet
+    
+    Each item has at most one row whose Locations cell maps named locations
+    to quantities. Stock not assigned to a named location is at
+    DEFAULT_LOCATION, so that balance is always Current Stock minus the
+    assigned quantities; receipts change it without any ledger write. When
+    stock falls below the assigned total, reconcile() trims the assigned
+    balances so the default location never goes negative.
+    """
+    def __init__(self, sheets_manager):
+        self.sheets = sheets_manager
+        self.sheet_name = Config.STOCK_LOCATIONS_SHEET
+        self.default_location = Config.DEFAULT_LOCATION
+    
+    def balances(self, item, ledger_record):
+        """{location: quantity} for an item, including its default location balance"""
+        assigned = parse_locations(ledger_record.get('Locations') if ledger_record else None)
+        assigned.pop(self.default_location, None)
+        balances = {self.default_location: max(0.0, to_float(item.get('Current Stock')) - sum(assigned.values()))}
+        balances.update(assigned)
+        return balances
+    
+    def available(self, item, assigned, location):
+        """Quantity of an item held at one location"""
+        if location == self.default_location:
+            others = sum(quantity for name, quantity in assigned.items() if name != self.default_location)
+            return max(0.0, to_float(item.get('Current Stock')) - others)
+        return assigned.get(location, 0)
+    
+    def clamp(self, stock, assigned):
+        """Assigned balances trimmed to fit within stock, largest balances first"""
+        excess = sum(assigned.values()) - stock
+        if excess <= 1e-9:
+            return assigned
+        assigned = dict(assigned)
+        for location in sorted(assigned, key=lambda name: (-assigned[name], name)):
+            taken = min(max(assigned[location], 0), excess)
+            assigned[location] -= taken
+            excess -= taken
+            if excess <= 1e-9:
+                break
+        return assigned
+    
+    def reconcile(self, stock_by_id):
+        """Trim the ledger rows of items whose stock dropped below their assigned total
+        
+        stock_by_id maps Item ID to the new Current Stock. Returns False if the
+        ledger could not be written.
+        """
+        try:
+            ledger = self.sheets.find_records_by_ids(self.sheet_name, 'Item ID', list(stock_by_id))
+            states = {}
+            for item_id, (row_number, record) in ledger.items():
+                assigned = parse_locations(record.get('Locations'))
+                assigned.pop(self.default_location, None)
+                clamped = self.clamp(to_float(stock_by_id[item_id]), assigned)
+                if clamped is not assigned:
+                    states[item_id] = (row_number, clamped)
+            if not states:
+                return True
+            updates, _ = self.ledger_writes(states)
+            return bool(self.sheets.batch_update_cells(self.sheet_name, updates))
+        except StorageQuotaError:
+            raise
+        except Exception as e:
+            print(f"Error reconciling stock locations: {e}")
+            return False
+    
+    def move(self, item, assigned, from_location, to_location, quantity):
+        """Assigned balances after moving quantity between locations
+        
+        Returns (assigned, error); error is set when the source location does
+        not hold enough stock, in which case nothing is moved.
+        """
+        available = self.available(item, assigned, from_location)
+        if quantity > available + 1e-9:
+            return assigned, f"Insufficient stock at {from_location} ({_number(available)} available)"
+        assigned = dict(assigned)
+        for location, change in ((from_location, -quantity), (to_location, quantity)):
+            if location != self.default_location:
+                assigned[location] = assigned.get(location, 0) + change
+        return assigned, None
+    
+    def ledger_writes(self, states):
+        """Split {item_id: (row_number, assigned)} into row updates and new rows"""
+        current_time = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+        updates = {}
+        new_rows = []
+        for item_id, (row_number, assigned) in states.items():
+            if row_number:
+                updates[row_number] = {'Locations': format_locations(assigned), 'Last Updated': current_time}
+            else:
+                new_rows.append([item_id, format_locations(assigned), current_time])
+        return updates, new_rows
+    
+    def drop_rows(self, item_ids):
+        """Delete the ledger rows of item_ids, bottom row first; returns False if one is left"""
+        found = self.sheets.find_records_by_ids(self.sheet_name, 'Item ID', list(item_ids))
+        for row_number in sorted((row_number for row_number, _ in found.values()), reverse=True):
+            if not self.sheets.delete_row(self.sheet_name, row_number):
+                return False
+        return True
+    
+    def get_item_locations(self, item_id):
+        """Stock of one item at each location, served from the cached ID indexes"""
+        try:
+            self.sheets.prefetch([Config.INVENTORY_SHEET, self.sheet_name])
+            _, item = self.sheets.find_record_by_id(Config.INVENTORY_SHEET, 'Item ID', item_id)
+            if not item:
+                return None
+            _, ledger_record = self.sheets.find_record_by_id(self.sheet_name, 'Item ID', item_id)
+            balances = self.balances(item, ledger_record)
+            locations = [{'location': self.default_location, 'quantity': _number(balances.pop(self.default_location))}]
+            locations.extend(
+                {'location': location, 'quantity': _number(quantity)}
+                for location, quantity in sorted(balances.items(), key=lambda entry: (-entry[1], entry[0]))
+                if round(quantity, 6)
+            )
+            return {
+                'item_id': item.get('Item ID', item_id),
+                'name': item.get('Name', ''),
+                'total_stock': item.get('Current Stock', 0),
+                'default_location': self.default_location,
+                'locations': locations
+            }
+        except StorageQuotaError:
+            raise
+        except Exception as e:
+            print(f"Error getting locations for {item_id}: {e}")
+            return None
+    
+    def replay(self, movements, transfers):
+        """Assigned balances per item rebuilt from Stock_Movements
+        
+        Each transfer is applied once, using the From/To/Quantity of the
+        transfer its movement references. Other movements clamp the item's
+        balances to their New Stock Level, as reconcile() does live.
+        """
+        transfers = {str(transfer.get('Transfer ID', '')): transfer for transfer in transfers}
+        rebuilt = {}
+        applied = set()
+        for movement in movements:
+            reference = str(movement.get('Reference ID', ''))
+            if movement.get('Action Type') != 'Transfer':
+                item_id = str(movement.get('Item ID', ''))
+                if item_id in rebuilt:
+                    rebuilt[item_id] = self.clamp(to_float(movement.get('New Stock Level')), rebuilt[item_id])
+                continue
+            if reference in applied or reference not in transfers:
+                continue
+            applied.add(reference)
+            transfer = transfers[reference]
+            quantity = to_float(transfer.get('Quantity'))
+            assigned = rebuilt.setdefault(str(movement.get('Item ID', '')), {})
+            for location, change in ((transfer.get('From Location', ''), -quantity), (transfer.get('To Location', ''), quantity)):
+                if location != self.default_location:
+                    assigned[location] = assigned.get(location, 0) + change
+        return rebuilt
+    
+    def rebuild(self, apply=False):
+        """Compare the ledger with a replay of Stock_Movements, optionally rewriting it
+        
+        Returns {'checked', 'mismatches', 'applied'}; each mismatch lists the
+        stored and rebuilt assigned balances of one item.
+        """
+        try:
+            self.sheets.prefetch([Config.STOCK_MOVEMENTS_SHEET, Config.TRANSFERS_SHEET, self.sheet_name])
+            records = self.sheets.batch_get_records([Config.TRANSFERS_SHEET, self.sheet_name])
+            # Transfers from archived months live in the movement partitions
+            rebuilt = self.replay(self.sheets.get_movements(), records[Config.TRANSFERS_SHEET])
+            stored = {
+                str(record.get('Item ID', '')): parse_locations(record.get('Locations'))
+                for record in records[self.sheet_name]
+            }
+            
+            item_ids = sorted(set(stored) | set(rebuilt))
+            mismatches = []
+            for item_id in item_ids:
+                expected = json.loads(format_locations(rebuilt.get(item_id, {})))
+                actual = json.loads(format_locations(stored.get(item_id, {})))
+                if expected != actual:
+                    mismatches.append({'item_id': item_id, 'stored': actual, 'rebuilt': expected})
+            
+            if apply and mismatches:
+                found = self.sheets.find_records_by_ids(self.sheet_name, 'Item ID', [m['item_id'] for m in mismatches])
+                updates, new_rows = self.ledger_writes({
+                    m['item_id']: (found.get(m['item_id'], (None, None))[0], m['rebuilt']) for m in mismatches
+                })
+                if updates and not self.sheets.batch_update_cells(self.sheet_name, updates):
+                    return {'checked': len(item_ids), 'mismatches': mismatches, 'applied': False}
+                if new_rows and not self.sheets.append_rows(self.sheet_name, new_rows):
+                    return {'checked': len(item_ids), 'mismatches': mismatches, 'applied': False}
+            
+            return {'checked': len(item_ids), 'mismatches': mismatches, 'applied': bool(apply and mismatches)}
+        except StorageQuotaError:
+            raise
+        except Exception as e:
+            print(f"Error rebuilding stock locations: {e}")
+            return None
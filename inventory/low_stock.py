@@ -0,0 +1,125 @@
+import bisect
+import threading
+from collections import deque
+from datetime import datetime
+from storage.base import TableView, to_float
+
+class LowStockView(TableView):
+    """Inventory items at or below their reorder level, kept up to date on writes
+    
+    Low items are held in a list sorted by deficit (reorder level minus
+    current stock, largest first), so reading the top k costs O(k). Each time
+    an item crosses its reorder level a 'low_stock' or 'restocked' event is
+    recorded and passed to every subscriber.
+    """
+    def __init__(self, max_events=100):
+        super().__init__()
+        self._lock = threading.RLock()
+        self.low = {}
+        self.ordered = []
+        self.loaded = False
+        self.listeners = []
+        self.events = deque(maxlen=max_events)
+    
+    def subscribe(self, callback):
+        """Call callback(event) whenever an item crosses its reorder level"""
+        with self._lock:
+            self.listeners.append(callback)
+    
+    def _entry(self, record):
+        """(sort key, record) if the record is low on stock, else None"""
+        current_stock = to_float(record.get('Current Stock', 0))
+        reorder_level = to_float(record.get('Reorder Level', 0))
+        if current_stock > reorder_level:
+            return None
+        key = (current_stock - reorder_level, str(record.get('Name', '')).lower(), str(record.get('Item ID', '')))
+        return key, dict(record)
+    
+    def reset(self, records):
+        with self._lock:
+            previous = self.low if self.loaded else None
+            self.low = {}
+            item_ids = set()
+            for record in records:
+                item_id = str(record.get('Item ID', ''))
+                if not item_id:
+                    continue
+                item_ids.add(item_id)
+                entry = self._entry(record)
+                if entry:
+                    self.low[item_id] = entry
+                else:
+                    self.low.pop(item_id, None)
+            self.ordered = sorted(key for key, _ in self.low.values())
+            
+            # Report crossings made outside this process (seen in a fresh snapshot)
+            if previous is not None:
+                for item_id, (_, record) in self.low.items():
+                    if item_id not in previous:
+                        self._emit('low_stock', record)
+                for item_id, (_, record) in previous.items():
+                    if item_id not in self.low and item_id in item_ids:
+                        self._emit('restocked', record)
+            self.loaded = True
+            self.stale = False
+    
+    def upsert(self, record):
+        with self._lock:
+            item_id = str(record.get('Item ID', ''))
+            if not item_id:
+                return
+            was_low = self._discard(item_id)
+            entry = self._entry(record)
+            if entry:
+                self.low[item_id] = entry
+                bisect.insort(self.ordered, entry[0])
+            if entry and not was_low:
+                self._emit('low_stock', record)
+            elif was_low and not entry:
+                self._emit('restocked', record)
+    
+    def remove(self, record):
+        with self._lock:
+            self._discard(str(record.get('Item ID', '')))
+    
+    def _discard(self, item_id):
+        """Drop an item from the low set; returns whether it was there"""
+        entry = self.low.pop(item_id, None)
+        if entry is None:
+            return False
+        position = bisect.bisect_left(self.ordered, entry[0])
+        if position < len(self.ordered) and self.ordered[position] == entry[0]:
+            del self.ordered[position]
+        return True
+    
+    def _emit(self, event_type, record):
+        event = {
+            'type': event_type,
+            'item_id': record.get('Item ID', ''),
+            'name': record.get('Name', ''),
+            'current_stock': record.get('Current Stock', 0),
+            'reorder_level': record.get('Reorder Level', 0),
+            'timestamp': datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+        }
+        self.events.append(event)
+        for callback in list(self.listeners):
+            try:
+                callback(event)
+            except Exception as e:
+                print(f"Error in low stock listener: {e}")
+    
+    def items(self, limit=None):
+        """Low stock records, furthest below their reorder level first"""
+        with self._lock:
+            keys = self.ordered if limit is None else self.ordered[:limit]
+            return [dict(self.low[item_id][1]) for _, _, item_id in keys]
+    
+    def count(self):
+        with self._lock:
+            return len(self.ordered)
+    
+    def recent_events(self, limit=None):
+        """Most recent threshold crossings, newest first"""
+        with self._lock:
+            events = list(reversed(self.events))
+            return events if limit is None else events[:limit]
@@ -1,11 +1,31 @@
 from datetime import datetime
+import csv
+import io
 import uuid
 from config.settings import Config
+from inventory.ledger import StockReconciler
+from inventory.locations import LocationLedger
+from inventory.low_stock import LowStockView
+from inventory.search import InventorySearchIndex
+from storage.base import StorageQuotaError
+
+# Bulk import fields: (request key, sheet header, numeric)
+BULK_FIELDS = [
+    ('name', 'Name', False),
+    ('category', 'Category', False),
+    ('current_stock', 'Current Stock', True),
+    ('unit', 'Unit', False),
+    ('cost_per_unit', 'Cost Per Unit', True),
+    ('reorder_level', 'Reorder Level', True),
+    ('supplier', 'Supplier', False)
+]
 
 class InventoryManager:
     def __init__(self, sheets_manager):
         self.sheets = sheets_manager
         self.sheet_name = Config.INVENTORY_SHEET
+        self.locations = LocationLedger(sheets_manager)
+        self.reconciler = StockReconciler(sheets_manager)
     
     def generate_item_id(self):
         """Generate a unique item ID"""
@@ -43,14 +63,135 @@ class InventoryManager:
                 )
                 return item_id
             return None
+        except StorageQuotaError:
+            raise
         except Exception as e:
             print(f"Error adding item: {e}")
             return None
     
+    def parse_csv_items(self, csv_text):
+        """Parse CSV text with a header row into a list of item dicts"""
+        reader = csv.DictReader(io.StringIO(csv_text))
+        return [
+            {(key or '').strip(): (value or '').strip() for key, value in row.items() if key}
+            for row in reader
+        ]
+    
+    def validate_bulk_items(self, items):
+        """Validate and normalize items for a bulk import in one pass
+        
+        Items may use request keys (current_stock) or sheet headers (Current
+        Stock). Returns (rows, errors), where errors lists {'index', 'error'}.
+        """
+        rows = []
+        errors = []
+        for index, item in enumerate(items):
+            if not isinstance(item, dict):
+                errors.append({'index': index, 'error': 'Item must be an object'})
+                continue
+            
+            values = {}
+            problem = None
+            for key, header, numeric in BULK_FIELDS:
+                value = item.get(key, item.get(header, ''))
+                if numeric:
+                    try:
+                        value = float(value if value not in (None, '') else 0)
+                    except (TypeError, ValueError):
+                        problem = f"{header} must be a number"
+                        break
+                    if value < 0:
+                        problem = f"{header} cannot be negative"
+                        break
+                else:
+                    value = str(value if value is not None else '').strip()
+                values[header] = value
+            
+            if problem is None and not values['Name']:
+                problem = 'Name is required'
+            if problem:
+                errors.append({'index': index, 'error': problem})
+            else:
+                rows.append(values)
+        return rows, errors
+    
+    def add_items_bulk(self, items, progress=None):
+        """Add many inventory items with one chunked append per sheet
+        
+        Nothing is written unless every item validates. Returns a dict with
+        success, the new item_ids in input order and any errors by index. If
+        writing stops part way, item_ids holds the items that were stored
+        and every later index has an error.
+        progress(done, total, message), when given, is called between stages.
+        """
+        try:
+            if progress:
+                progress(0, len(items), 'Validating items')
+            rows, errors = self.validate_bulk_items(items)
+            if errors:
+                return {'success': False, 'item_ids': [], 'errors': errors}
+            if not rows:
+                return {'success': True, 'item_ids': [], 'errors': []}
+            
+            current_time = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+            item_ids = []
+            inventory_rows = []
+            movement_rows = []
+            for values in rows:
+                item_id = self.generate_item_id()
+                item_ids.append(item_id)
+                inventory_rows.append([
+                    item_id,
+                    values['Name'],
+                    values['Category'],
+                    values['Current Stock'],
+                    values['Unit'],
+                    values['Cost Per Unit'],
+                    values['Reorder Level'],
+                    values['Supplier'],
+                    current_time
+                ])
+                movement_rows.append(self.sheets.build_movement_row(
+                    item_id,
+                    values['Name'],
+                    'Initial Stock',
+                    values['Current Stock'],
+                    values['Current Stock'],
+                    notes="Item added by bulk import"
+                ))
+            
+            if progress:
+                progress(0, len(rows), 'Writing inventory rows')
+            written = self.sheets.append_rows_counted(self.sheet_name, inventory_rows)
+            
+            if progress:
+                progress(written, len(rows), 'Logging stock movements')
+            if written and not self.sheets.log_stock_movements(movement_rows[:written]):
+                print("Error logging initial stock movements for bulk import")
+            
+            if written < len(rows):
+                # Earlier chunks are stored; report their IDs so a retry only resends the rest
+                return {
+                    'success': False,
+                    'item_ids': item_ids[:written],
+                    'errors': [
+                        {'index': index, 'error': 'Not written, the import stopped part way'}
+                        for index in range(written, len(rows))
+                    ]
+                }
+            return {'success': True, 'item_ids': item_ids, 'errors': []}
+        except StorageQuotaError:
+            raise
+        except Exception as e:
+            print(f"Error adding items in bulk: {e}")
+            return {'success': False, 'item_ids': [], 'errors': [{'index': None, 'error': str(e)}]}
+    
     def get_all_items(self):
         """Get all inventory items"""
         try:
             return self.sheets.get_all_records(self.sheet_name)
+        except StorageQuotaError:
+            raise
         except Exception as e:
             print(f"Error getting all items: {e}")
             return []
@@ -58,11 +199,9 @@ class InventoryManager:
     def get_item_by_id(self, item_id):
         """Get a specific item by ID"""
         try:
-            records = self.get_all_items()
-            for record in records:
-                if record.get('Item ID') == item_id:
-                    return record
-            return None
+            return self.sheets.get_record_by_id(self.sheet_name, 'Item ID', item_id)
+        except StorageQuotaError:
+            raise
         except Exception as e:
             print(f"Error getting item by ID: {e}")
             return None
@@ -70,48 +209,34 @@ class InventoryManager:
     def update_item(self, item_id, update_data):
         """Update an existing inventory item"""
         try:
-            row_number = self.sheets.find_row_by_id(self.sheet_name, 'Item ID', item_id)
-            if not row_number:
-                return False
-            
-            # Get current item data
-            current_item = self.get_item_by_id(item_id)
-            if not current_item:
+            if 'current_stock' in update_data:
+                # A lower stock level may need the location ledger trimmed
+                self.sheets.prefetch([self.sheet_name, Config.STOCK_LOCATIONS_SHEET])
+            row_number, current_item = self.sheets.find_record_by_id(self.sheet_name, 'Item ID', item_id)
+            if not row_number or not current_item:
                 return False
             
             current_time = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
             
-            # Prepare updated data
-            updated_data = {
-                'Item ID': item_id,
-                'Name': update_data.get('name', current_item.get('Name', '')),
-                'Category': update_data.get('category', current_item.get('Category', '')),
-                'Current Stock': float(update_data.get('current_stock', current_item.get('Current Stock', 0))),
-                'Unit': update_data.get('unit', current_item.get('Unit', '')),
-                'Cost Per Unit': float(update_data.get('cost_per_unit', current_item.get('Cost Per Unit', 0))),
-                'Reorder Level': float(update_data.get('reorder_level', current_item.get('Reorder Level', 0))),
-                'Supplier': update_data.get('supplier', current_item.get('Supplier', '')),
-                'Last Updated': current_time
-            }
-            
-            success = self.sheets.update_row(self.sheet_name, row_number, updated_data)
-            
-            # Log stock movement if stock changed
+            # Only the fields sent are written, so other columns keep their live values
+            fields = {}
+            for key, header, numeric in BULK_FIELDS:
+                if key in update_data and key != 'current_stock':
+                    fields[header] = float(update_data[key]) if numeric else update_data[key]
+            fields['Last Updated'] = current_time
+            
+            # A new stock level is a manual adjustment applied to the live stock
             if 'current_stock' in update_data:
-                old_stock = float(current_item.get('Current Stock', 0))
-                new_stock = float(update_data['current_stock'])
-                if old_stock != new_stock:
-                    quantity_change = new_stock - old_stock
-                    self.sheets.log_stock_movement(
-                        item_id,
-                        updated_data['Name'],
-                        'Manual Adjustment',
-                        quantity_change,
-                        new_stock,
-                        notes="Stock manually updated"
+                quantity_change = float(update_data['current_stock']) - float(current_item.get('Current Stock', 0))
+                if quantity_change != 0:
+                    return self._apply_stock_delta(
+                        row_number, current_item, quantity_change, 'Manual Adjustment',
+                        notes="Stock manually updated", fields=fields
                     )
             
-            return success
+            return self.sheets.update_cells(self.sheet_name, row_number, fields)
+        except StorageQuotaError:
+            raise
         except Exception as e:
             print(f"Error updating item: {e}")
             return False
@@ -119,6 +244,7 @@ class InventoryManager:
     def delete_item(self, item_id):
         """Delete an inventory item"""
         try:
+            self.sheets.prefetch([self.sheet_name, Config.STOCK_LOCATIONS_SHEET])
             row_number = self.sheets.find_row_by_id(self.sheet_name, 'Item ID', item_id)
             if not row_number:
                 return False
@@ -135,86 +261,235 @@ class InventoryManager:
                     notes="Item removed from inventory"
                 )
             
-            return self.sheets.delete_row(self.sheet_name, row_number)
+            if not self.sheets.delete_row(self.sheet_name, row_number):
+                return False
+            self.locations.reconcile({item_id: 0})
+            return True
+        except StorageQuotaError:
+            raise
         except Exception as e:
             print(f"Error deleting item: {e}")
             return False
     
     def update_stock(self, item_id, quantity_change, action_type, reference_id="", notes=""):
-        """Update stock level for an item"""
+        """Update stock level for an item
+        
+        The row is resolved once, only Current Stock and Last Updated are
+        written (in one request) and exactly one movement is logged.
+        """
         try:
-            item = self.get_item_by_id(item_id)
-            if not item:
+            if quantity_change < 0:
+                self.sheets.prefetch([self.sheet_name, Config.STOCK_LOCATIONS_SHEET])
+            row_number, item = self.sheets.find_record_by_id(self.sheet_name, 'Item ID', item_id)
+            if not row_number or not item:
                 return False
             
-            current_stock = float(item.get('Current Stock', 0))
-            new_stock = current_stock + quantity_change
-            
-            if new_stock < 0:
-                new_stock = 0  # Don't allow negative stock
-            
-            # Update the item
-            success = self.update_item(item_id, {'current_stock': new_stock})
-            
-            if success:
-                # Log stock movement
-                self.sheets.log_stock_movement(
-                    item_id,
-                    item.get('Name', ''),
-                    action_type,
-                    quantity_change,
-                    new_stock,
-                    reference_id,
-                    notes
-                )
-            
-            return success
+            return self._apply_stock_delta(row_number, item, quantity_change, action_type, reference_id, notes)
+        except StorageQuotaError:
+            raise
         except Exception as e:
             print(f"Error updating stock: {e}")
             return False
     
-    def get_low_stock_items(self):
-        """Get items that are below their reorder level"""
+    def _apply_stock_delta(self, row_number, item, quantity_change, action_type, reference_id="", notes="", fields=None):
+        """Apply a stock change to an already resolved row and log it
+        
+        The new level is built on the Current Stock read back with the row
+        check rather than the cached record, so concurrent changes add up.
+        fields, when given, are other cells written in the same request.
+        """
+        current_time = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+        
+        def stock_cells(current_stock):
+            cells = dict(fields or {})
+            new_stock = max(0, current_stock + quantity_change)  # Don't allow negative stock
+            if new_stock != current_stock:
+                cells.update({'Current Stock': new_stock, 'Last Updated': current_time})
+            return cells
+        
+        current = self.sheets.update_from_current(self.sheet_name, 'Current Stock', {row_number: stock_cells})
+        if current is None:
+            return False
+        current_stock = current[row_number]
+        new_stock = max(0, current_stock + quantity_change)
+        
+        # Record the change actually applied, so movements add up to the stock level
+        applied_change = new_stock - current_stock
+        if applied_change < 0:
+            self.locations.reconcile({item.get('Item ID', ''): new_stock})
+        
+        self.sheets.log_stock_movement(
+            item.get('Item ID', ''),
+            (fields or {}).get('Name', item.get('Name', '')),
+            action_type,
+            applied_change,
+            new_stock,
+            reference_id,
+            notes
+        )
+        return True
+    
+    def generate_count_id(self):
+        """Generate a unique cycle count ID"""
+        return f"CNT-{str(uuid.uuid4())[:8].upper()}"
+    
+    def cycle_count(self, counts, counted_by=""):
+        """Apply a physical count of many items against one inventory snapshot
+        
+        counts is a list of {'item_id', 'counted_quantity'}. Nothing is written
+        unless every line validates; rows whose current stock differs from
+        the count are then written with one batch update and their variances
+        logged with one movements append.
+        """
         try:
-            items = self.get_all_items()
-            low_stock_items = []
+            errors = []
+            lines = []
+            seen = set()
+            for index, line in enumerate(counts):
+                if not isinstance(line, dict):
+                    errors.append({'index': index, 'error': 'Count must be an object'})
+                    continue
+                item_id = str(line.get('item_id', '')).strip()
+                try:
+                    counted = float(line.get('counted_quantity', line.get('quantity')))
+                except (TypeError, ValueError):
+                    errors.append({'index': index, 'item_id': item_id, 'error': 'Counted quantity must be a number'})
+                    continue
+                if not item_id:
+                    errors.append({'index': index, 'error': 'Item ID is required'})
+                elif counted < 0:
+                    errors.append({'index': index, 'item_id': item_id, 'error': 'Counted quantity cannot be negative'})
+                elif item_id in seen:
+                    errors.append({'index': index, 'item_id': item_id, 'error': 'Item counted more than once'})
+                else:
+                    seen.add(item_id)
+                    lines.append((index, item_id, counted))
+            
+            # One snapshot for every counted item, read with the location ledger
+            self.sheets.prefetch([self.sheet_name, Config.STOCK_LOCATIONS_SHEET])
+            found = self.sheets.find_records_by_ids(self.sheet_name, 'Item ID', [item_id for _, item_id, _ in lines])
+            for index, item_id, _ in lines:
+                if item_id not in found:
+                    errors.append({'index': index, 'item_id': item_id, 'error': 'Item not found'})
+            if errors:
+                return {'success': False, 'count_id': None, 'variances': [], 'errors': sorted(errors, key=lambda e: e['index'])}
             
-            for item in items:
-                current_stock = float(item.get('Current Stock', 0))
-                reorder_level = float(item.get('Reorder Level', 0))
-                
-                if current_stock <= reorder_level:
-                    low_stock_items.append(item)
+            count_id = self.generate_count_id()
+            current_time = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+            notes = f"Cycle count by {counted_by}" if counted_by else "Cycle count"
+            
+            def count_cells(counted):
+                # Only rows whose current stock differs from the count are written
+                return lambda current_stock: {} if current_stock == counted else {'Current Stock': counted, 'Last Updated': current_time}
+            
+            current = self.sheets.update_from_current(self.sheet_name, 'Current Stock', {
+                found[item_id][0]: count_cells(counted) for _, item_id, counted in lines
+            })
+            if current is None:
+                return {'success': False, 'count_id': None, 'variances': [], 'errors': [{'index': None, 'error': 'Failed to write counted quantities'}]}
+            
+            # Variances are against the stock the count replaced, not the cached one
+            variances = []
+            movement_rows = []
+            for _, item_id, counted in lines:
+                row_number, item = found[item_id]
+                system_quantity = current[row_number]
+                variance = counted - system_quantity
+                variances.append({
+                    'item_id': item_id,
+                    'name': item.get('Name', ''),
+                    'system_quantity': system_quantity,
+                    'counted_quantity': counted,
+                    'variance': variance
+                })
+                if variance != 0:
+                    movement_rows.append(self.sheets.build_movement_row(
+                        item_id, item.get('Name', ''), 'Cycle Count', variance, counted, count_id, notes
+                    ))
             
-            return low_stock_items
+            lowered = {line['item_id']: line['counted_quantity'] for line in variances if line['variance'] < 0}
+            if lowered:
+                self.locations.reconcile(lowered)
+            if movement_rows and not self.sheets.log_stock_movements(movement_rows):
+                print(f"Error logging variance movements for cycle count {count_id}")
+            
+            return {'success': True, 'count_id': count_id, 'variances': variances, 'errors': []}
+        except StorageQuotaError:
+            raise
+        except Exception as e:
+            print(f"Error applying cycle count: {e}")
+            return {'success': False, 'count_id': None, 'variances': [], 'errors': [{'index': None, 'error': str(e)}]}
+    
+    def get_item_locations(self, item_id):
+        """Stock of an item at each location"""
+        return self.locations.get_item_locations(item_id)
+    
+    def rebuild_locations(self, apply=False):
+        """Verify (and with apply, rewrite) the location ledger from Stock_Movements"""
+        return self.locations.rebuild(apply)
+    
+    def reconcile_stock(self, checkpoint=None):
+        """Compare Current Stock with the Stock_Movements replay, from the last checkpoint"""
+        return self.reconciler.reconcile(checkpoint)
+    
+    def get_low_stock_view(self):
+        """Shared low stock view over the inventory, kept current on every write"""
+        return self.sheets.get_view(self.sheet_name, 'low_stock', LowStockView)
+    
+    def get_low_stock_items(self, limit=None):
+        """Get items at or below their reorder level, furthest below first"""
+        try:
+            return self.get_low_stock_view().items(limit)
+        except StorageQuotaError:
+            raise
         except Exception as e:
             print(f"Error getting low stock items: {e}")
             return []
     
-    def search_items(self, search_term, category=None):
-        """Search items by name or category"""
+    def get_stock_alerts(self, limit=None):
+        """Get recent reorder level crossings seen by this process, newest first"""
         try:
-            items = self.get_all_items()
-            filtered_items = []
-            
-            for item in items:
-                name_match = search_term.lower() in item.get('Name', '').lower()
-                category_match = category is None or item.get('Category', '') == category
-                
-                if name_match and category_match:
-                    filtered_items.append(item)
-            
-            return filtered_items
+            return self.get_low_stock_view().recent_events(limit)
+        except StorageQuotaError:
+            raise
+        except Exception as e:
+            print(f"Error getting stock alerts: {e}")
+            return []
+    
+    def get_search_index(self):
+        """Shared search index over the inventory, kept current on every write"""
+        return self.sheets.get_view(self.sheet_name, 'search', InventorySearchIndex)
+    
+    def search_items(self, search_term, category=None, limit=None):
+        """Search items by name, category, supplier or ID, best matches first"""
+        try:
+            results = self.get_search_index().search(search_term, limit=limit, category=category)
+            return [item for _, item in results]
+        except StorageQuotaError:
+            raise
         except Exception as e:
             print(f"Error searching items: {e}")
             return []
     
+    def search_items_ranked(self, search_term, category=None, limit=20):
+        """Search items and return (score, item) pairs plus name suggestions"""
+        try:
+            index = self.get_search_index()
+            return index.search(search_term, limit=limit, category=category), index.suggest(search_term)
+        except StorageQuotaError:
+            raise
+        except Exception as e:
+            print(f"Error searching items: {e}")
+            return [], []
+    
     def get_categories(self):
         """Get all unique categories"""
         try:
             items = self.get_all_items()
             categories = list(set(item.get('Category', '') for item in items))
             return [cat for cat in categories if cat]  # Remove empty categories
+        except StorageQuotaError:
+            raise
         except Exception as e:
             print(f"Error getting categories: {e}")
             return []
\ No newline at end of file
@@ -0,0 +1,202 @@
+import bisect
+import heapq
+import re
+import threading
+from collections import defaultdict
+from storage.base import TableView
+
+# Searchable columns and how much a match in each counts towards the rank
+SEARCH_FIELDS = {
+    'Item ID': 4.0,
+    'Name': 3.0,
+    'Category': 1.5,
+    'Supplier': 1.0
+}
+
+# Minimum share of a query token's trigrams an indexed token must contain
+FUZZY_THRESHOLD = 0.6
+
+_TOKEN_PATTERN = re.compile(r'[a-z0-9]+')
+
+def tokenize(text):
+    """Lowercase alphanumeric tokens of a cell value"""
+    return _TOKEN_PATTERN.findall(str(text or '').lower())
+
+def trigrams(token):
+    """Character trigrams of a token (the token itself when shorter)"""
+    if len(token) < 3:
+        return {token}
+    return {token[i:i + 3] for i in range(len(token) - 2)}
+
+class InventorySearchIndex(TableView):
+    """In-memory search index over the Inventory sheet
+    
+    Token postings map each word to the items containing it (with the best
+    field weight it appears in), a trigram index maps character trigrams to
+    the distinct tokens containing them for substring and typo-tolerant
+    matches, and a sorted token list serves prefix (autocomplete) lookups.
+    """
+    def __init__(self):
+        super().__init__()
+        self._lock = threading.RLock()
+        self.items = {}
+        self.item_terms = {}
+        self.tokens = {}
+        self.trigrams = defaultdict(set)
+        self.sorted_tokens = []
+    
+    def reset(self, records):
+        with self._lock:
+            self.items = {}
+            self.item_terms = {}
+            self.tokens = {}
+            self.trigrams = defaultdict(set)
+            for record in records:
+                self._add(record)
+            self.sorted_tokens = sorted(self.tokens)
+            self.stale = False
+    
+    def upsert(self, record):
+        with self._lock:
+            item_id = str(record.get('Item ID', ''))
+            if item_id in self.items:
+                self._remove(item_id)
+            for token in self._add(record):
+                bisect.insort(self.sorted_tokens, token)
+    
+    def remove(self, record):
+        with self._lock:
+            self._remove(str(record.get('Item ID', '')))
+    
+    def _terms(self, record):
+        """{token: best field weight} for one record"""
+        terms = {}
+        for field, weight in SEARCH_FIELDS.items():
+            for token in tokenize(record.get(field, '')):
+                terms[token] = max(weight, terms.get(token, 0))
+        return terms
+    
+    def _add(self, record):
+        """Index a record; returns tokens that were not indexed before"""
+        item_id = str(record.get('Item ID', ''))
+        if not item_id:
+            return []
+        terms = self._terms(record)
+        self.items[item_id] = dict(record)
+        self.item_terms[item_id] = terms
+        new_tokens = []
+        for token, weight in terms.items():
+            postings = self.tokens.get(token)
+            if postings is None:
+                postings = self.tokens[token] = {}
+                new_tokens.append(token)
+                for gram in trigrams(token):
+                    self.trigrams[gram].add(token)
+            postings[item_id] = weight
+        return new_tokens
+    
+    def _remove(self, item_id):
+        terms = self.item_terms.pop(item_id, None)
+        self.items.pop(item_id, None)
+        for token in terms or ():
+            postings = self.tokens.get(token)
+            if postings is None:
+                continue
+            postings.pop(item_id, None)
+            if postings:
+                continue
+            # Last item using this token: drop it from every index
+            del self.tokens[token]
+            position = bisect.bisect_left(self.sorted_tokens, token)
+            if position < len(self.sorted_tokens) and self.sorted_tokens[position] == token:
+                del self.sorted_tokens[position]
+            for gram in trigrams(token):
+                tokens = self.trigrams.get(gram)
+                if tokens is not None:
+                    tokens.discard(token)
+                    if not tokens:
+                        del self.trigrams[gram]
+    
+    def _prefix_tokens(self, prefix):
+        """Indexed tokens starting with prefix, using the sorted token list"""
+        start = bisect.bisect_left(self.sorted_tokens, prefix)
+        matches = []
+        for token in self.sorted_tokens[start:]:
+            if not token.startswith(prefix):
+                break
+            matches.append(token)
+        return matches
+    
+    def _matching_tokens(self, query_token):
+        """{indexed token: score multiplier} for one query token
+        
+        Exact matches score highest, then prefix matches, then substring or
+        fuzzy matches sharing enough trigrams with the query token.
+        """
+        matches = {}
+        if len(query_token) >= 3:
+            grams = trigrams(query_token)
+            shared = defaultdict(int)
+            for gram in grams:
+                for token in self.trigrams.get(gram, ()):
+                    shared[token] += 1
+            for token, count in shared.items():
+                similarity = count / len(grams)
+                if similarity >= FUZZY_THRESHOLD:
+                    matches[token] = similarity
+        for token in self._prefix_tokens(query_token):
+            matches[token] = 2.0
+        if query_token in self.tokens:
+            matches[query_token] = 3.0
+        return matches
+    
+    def search(self, query, limit=20, category=None):
+        """Ranked (score, record) pairs matching every token of query"""
+        with self._lock:
+            matched = [self._matching_tokens(query_token) for query_token in tokenize(query)]
+            if not matched or not all(matched):
+                return []
+            
+            # Start from the most selective query token and narrow from there
+            matched.sort(key=lambda tokens: sum(len(self.tokens[token]) for token in tokens))
+            totals = {}
+            for token, multiplier in matched[0].items():
+                for item_id, weight in self.tokens[token].items():
+                    totals[item_id] = max(totals.get(item_id, 0), weight * multiplier)
+            
+            for tokens in matched[1:]:
+                narrowed = {}
+                for item_id, total in totals.items():
+                    best = 0
+                    for token, weight in self.item_terms[item_id].items():
+                        if token in tokens:
+                            best = max(best, weight * tokens[token])
+                    if best:
+                        narrowed[item_id] = total + best
+                totals = narrowed
+                if not totals:
+                    return []
+            
+            results = []
+            for item_id, score in totals.items():
+                record = self.items[item_id]
+                if category is not None and record.get('Category', '') != category:
+                    continue
+                results.append((-round(score, 3), str(record.get('Name', '')).lower(), item_id))
+            if limit is not None:
+                results = heapq.nsmallest(limit, results)
+            else:
+                results.sort()
+            return [(-score, dict(self.items[item_id])) for score, _, item_id in results]
+    
+    def suggest(self, prefix, limit=10):
+        """Item names with a word starting with the last token of prefix"""
+        with self._lock:
+            query_tokens = tokenize(prefix)
+            if not query_tokens:
+                return []
+            names = set()
+            for token in self._prefix_tokens(query_tokens[-1]):
+                for item_id in self.tokens[token]:
+                    names.add(str(self.items[item_id].get('Name', '')))
+            return sorted(name for name in names if name)[:limit]
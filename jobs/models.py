@@ -0,0 +1,160 @@
+import json
+import os
+import sqlite3
+import threading
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from config.settings import Config
+
+def _process_alive(pid):
+    """Whether a process with this ID is still running"""
+    if not pid:
+        return False
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+class JobStore:
+    """Job records persisted in a small SQLite table
+    
+    Any worker process on the same machine can read a job's status. Jobs
+    left queued or running by a process that has since exited are marked
+    failed the next time a store is opened. Both rely on the processes
+    sharing one filesystem and PID namespace, so separate serverless
+    instances cannot see each other's jobs (see Config.JOBS_ENABLED).
+    """
+    def __init__(self, database_path=None):
+        self.database_path = database_path or Config.JOBS_DATABASE_PATH
+        self._lock = threading.RLock()
+        directory = os.path.dirname(self.database_path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self.connection = sqlite3.connect(self.database_path, check_same_thread=False)
+        self.connection.row_factory = sqlite3.Row
+        self.connection.execute('PRAGMA journal_mode=WAL')
+        with self._lock, self.connection:
+            self.connection.execute(
+                "CREATE TABLE IF NOT EXISTS jobs ("
+                "job_id TEXT PRIMARY KEY, job_type TEXT, status TEXT, progress TEXT, result TEXT, "
+                "error TEXT, owner_pid INTEGER, created_at TEXT, started_at TEXT, finished_at TEXT)"
+            )
+            self.connection.execute("CREATE INDEX IF NOT EXISTS idx_jobs_status ON jobs (status)")
+            unfinished = self.connection.execute(
+                "SELECT job_id, owner_pid FROM jobs WHERE status IN ('queued', 'running')"
+            ).fetchall()
+            for job_id, owner_pid in unfinished:
+                if not _process_alive(owner_pid):
+                    self.connection.execute(
+                        "UPDATE jobs SET status = 'failed', error = 'Interrupted by a restart', finished_at = ? "
+                        "WHERE job_id = ?",
+                        (self._now(), job_id)
+                    )
+    
+    def _now(self):
+        return datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+    
+    def create(self, job_id, job_type):
+        with self._lock, self.connection:
+            self.connection.execute(
+                "INSERT INTO jobs (job_id, job_type, status, progress, owner_pid, created_at) "
+                "VALUES (?, ?, 'queued', ?, ?, ?)",
+                (job_id, job_type, json.dumps({'done': 0, 'total': None, 'message': 'Queued'}), os.getpid(), self._now())
+            )
+    
+    def update(self, job_id, **fields):
+        """Set columns of a job; progress and result are stored as JSON"""
+        for name in ('progress', 'result'):
+            if name in fields:
+                fields[name] = json.dumps(fields[name], default=str)
+        if fields.get('status') == 'running':
+            fields['started_at'] = self._now()
+        elif fields.get('status') in ('completed', 'failed'):
+            fields['finished_at'] = self._now()
+        assignments = ', '.join(f"{name} = ?" for name in fields)
+        with self._lock, self.connection:
+            self.connection.execute(f"UPDATE jobs SET {assignments} WHERE job_id = ?", list(fields.values()) + [job_id])
+    
+    def get(self, job_id):
+        with self._lock:
+            row = self.connection.execute("SELECT * FROM jobs WHERE job_id = ?", (job_id,)).fetchone()
+        if row is None:
+            return None
+        job = dict(row)
+        job.pop('owner_pid', None)
+        for name in ('progress', 'result'):
+            job[name] = json.loads(job[name]) if job[name] else None
+        return job
+    
+    def count(self, statuses):
+        placeholders = ', '.join('?' for _ in statuses)
+        with self._lock:
+            return self.connection.execute(
+                f"SELECT COUNT(*) FROM jobs WHERE status IN ({placeholders})", list(statuses)
+            ).fetchone()[0]
+
+class JobManager:
+    """Runs long operations on a small worker pool and records their progress
+    
+    Work is submitted as a function taking a progress callback,
+    progress(done, total, message). At most JOB_MAX_WORKERS jobs run at once
+    and their Sheets calls are scheduled behind interactive requests.
+    """
+    def __init__(self, sheets_manager, store=None, max_workers=None, max_queued=None):
+        self.sheets = sheets_manager
+        self.store = store or JobStore()
+        self.max_queued = max_queued or Config.JOB_MAX_QUEUED
+        self.executor = ThreadPoolExecutor(
+            max_workers=max_workers or Config.JOB_MAX_WORKERS,
+            thread_name_prefix='job-worker'
+        )
+    
+    def generate_job_id(self):
+        """Generate a unique job ID"""
+        return f"JOB-{str(uuid.uuid4())[:8].upper()}"
+    
+    def submit(self, job_type, work):
+        """Queue work(progress) and return its job ID, or None when the queue is full"""
+        try:
+            if self.store.count(('queued', 'running')) >= self.max_queued:
+                return None
+            job_id = self.generate_job_id()
+            self.store.create(job_id, job_type)
+            self.executor.submit(self._run, job_id, work)
+            return job_id
+        except Exception as e:
+            print(f"Error submitting {job_type} job: {e}")
+            return None
+    
+    def _run(self, job_id, work):
+        def progress(done, total=None, message=None):
+            self.store.update(job_id, progress={'done': done, 'total': total, 'message': message})
+        
+        self.store.update(job_id, status='running', progress={'done': 0, 'total': None, 'message': 'Running'})
+        try:
+            with self.sheets.background():
+                result = work(progress)
+            # Background threads are not covered by the per-request flush
+            self.sheets.flush_movements()
+            # Managers return None when an operation fails
+            if result is None:
+                self.store.update(job_id, status='failed', error='Job failed without a result')
+            elif isinstance(result, dict) and result.get('success') is False:
+                self.store.update(job_id, status='failed', result=result, error=result.get('error') or 'Job failed')
+            else:
+                self.store.update(job_id, status='completed', result=result)
+        except Exception as e:
+            print(f"Error running job {job_id}: {e}")
+            self.store.update(job_id, status='failed', error=str(e))
+    
+    def get_job(self, job_id):
+        """Get a job's status, progress and result"""
+        try:
+            return self.store.get(job_id)
+        except Exception as e:
+            print(f"Error getting job {job_id}: {e}")
+            return None
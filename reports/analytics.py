@@ -0,0 +1,132 @@
+import numpy as np
+from config.settings import Config
+from storage.base import StorageQuotaError, to_float
+
+PERCENTILES = [10, 25, 50, 75, 90, 95, 99]
+
+def load_inventory_columns(records):
+    """Convert inventory records into columnar NumPy arrays
+    
+    Text columns are encoded as integer codes into a sorted array of their
+    distinct values, so group-bys are bincounts over the codes.
+    """
+    count = len(records)
+    columns = {
+        'current_stock': np.fromiter((to_float(r.get('Current Stock')) for r in records), dtype=np.float64, count=count),
+        'cost_per_unit': np.fromiter((to_float(r.get('Cost Per Unit')) for r in records), dtype=np.float64, count=count),
+        'reorder_level': np.fromiter((to_float(r.get('Reorder Level')) for r in records), dtype=np.float64, count=count)
+    }
+    for name, header, default in (('category', 'Category', 'Uncategorized'), ('supplier', 'Supplier', 'Unknown')):
+        labels = np.array([str(r.get(header) or default) for r in records], dtype=object)
+        if count:
+            values, codes = np.unique(labels, return_inverse=True)
+        else:
+            values, codes = np.array([], dtype=object), np.array([], dtype=np.int64)
+        columns[name] = values
+        columns[f"{name}_codes"] = codes.astype(np.int64)
+    return columns
+
+def _percentiles(values):
+    if values.size == 0:
+        return {}
+    return {f"p{p}": round(float(v), 4) for p, v in zip(PERCENTILES, np.percentile(values, PERCENTILES))}
+
+def inventory_analytics(records):
+    """Valuation, category/supplier breakdowns, reorder ratios and percentiles"""
+    columns = load_inventory_columns(records)
+    stock = columns['current_stock']
+    cost = columns['cost_per_unit']
+    reorder = columns['reorder_level']
+    value = stock * cost
+    low = stock <= reorder
+    total_value = float(value.sum())
+    
+    categories = columns['category']
+    category_codes = columns['category_codes']
+    size = len(categories)
+    category_items = np.bincount(category_codes, minlength=size)
+    category_value = np.bincount(category_codes, weights=value, minlength=size)
+    category_units = np.bincount(category_codes, weights=stock, minlength=size)
+    category_cost = np.bincount(category_codes, weights=cost, minlength=size)
+    category_low = np.bincount(category_codes, weights=low, minlength=size)
+    category_rows = [
+        {
+            'category': str(categories[i]),
+            'items': int(category_items[i]),
+            'units': round(float(category_units[i]), 4),
+            'value': round(float(category_value[i]), 2),
+            'average_cost': round(float(category_cost[i] / category_items[i]), 4) if category_items[i] else 0.0,
+            'low_stock_items': int(category_low[i]),
+            'value_share': round(float(category_value[i] / total_value), 4) if total_value else 0.0
+        }
+        for i in np.argsort(-category_value, kind='stable')
+    ]
+    
+    suppliers = columns['supplier']
+    supplier_codes = columns['supplier_codes']
+    size = len(suppliers)
+    supplier_items = np.bincount(supplier_codes, minlength=size)
+    supplier_value = np.bincount(supplier_codes, weights=value, minlength=size)
+    supplier_units = np.bincount(supplier_codes, weights=stock, minlength=size)
+    supplier_low = np.bincount(supplier_codes, weights=low, minlength=size)
+    # Distinct (supplier, category) pairs, grouped by supplier
+    width = max(len(categories), 1)
+    pairs = np.unique(supplier_codes * width + category_codes)
+    pair_suppliers = pairs // width
+    pair_categories = categories[pairs % width] if len(categories) else categories
+    boundaries = np.searchsorted(pair_suppliers, np.arange(size + 1))
+    supplier_rows = [
+        {
+            'supplier': str(suppliers[i]),
+            'items': int(supplier_items[i]),
+            'units': round(float(supplier_units[i]), 4),
+            'value': round(float(supplier_value[i]), 2),
+            'low_stock_items': int(supplier_low[i]),
+            'categories': [str(c) for c in pair_categories[boundaries[i]:boundaries[i + 1]]],
+            'value_share': round(float(supplier_value[i] / total_value), 4) if total_value else 0.0
+        }
+        for i in np.argsort(-supplier_value, kind='stable')
+    ]
+    
+    # Stock-to-reorder ratio, only defined where a reorder level is set
+    has_reorder = reorder > 0
+    ratios = stock[has_reorder] / reorder[has_reorder]
+    
+    return {
+        'item_count': int(stock.size),
+        'total_value': round(total_value, 2),
+        'total_units': round(float(stock.sum()), 4),
+        'low_stock_items': int(low.sum()),
+        'categories': category_rows,
+        'suppliers': supplier_rows,
+        'stock_ratios': {
+            'items_with_reorder_level': int(ratios.size),
+            'mean': round(float(ratios.mean()), 4) if ratios.size else None,
+            'percentiles': _percentiles(ratios),
+            'distribution': {
+                'out_of_stock': int((stock <= 0).sum()),
+                'at_or_below_reorder': int((has_reorder & (stock > 0) & low).sum()),
+                'under_2x_reorder': int((has_reorder & ~low & (stock < 2 * reorder)).sum()),
+                'healthy': int((has_reorder & (stock >= 2 * reorder)).sum())
+            }
+        },
+        'percentiles': {
+            'current_stock': _percentiles(stock),
+            'cost_per_unit': _percentiles(cost),
+            'item_value': _percentiles(value)
+        }
+    }
+
+class AnalyticsManager:
+    def __init__(self, sheets_manager):
+        self.sheets = sheets_manager
+    
+    def get_inventory_analytics(self):
+        """Compute inventory analytics from one read of the Inventory sheet"""
+        try:
+            return inventory_analytics(self.sheets.get_all_records(Config.INVENTORY_SHEET))
+        except StorageQuotaError:
+            raise
+        except Exception as e:
+            print(f"Error computing inventory analytics: {e}")
+            return None
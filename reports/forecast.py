@@ -0,0 +1,195 @@
+import numpy as np
+from datetime import date, datetime, timedelta
+from config.settings import Config
+from storage.base import StorageQuotaError, to_float
+
+# Negative changes from these actions remove stock without it being used
+NON_DEMAND_ACTIONS = ('Item Deleted', 'Transfer')
+
+def _round(values, digits=4):
+    return [round(float(v), digits) for v in values]
+
+def usage_matrix(item_ids, movements, start, days):
+    """Daily usage per item as an (items, days) array, plus each item's first day in the window
+    
+    Usage is the stock removed by negative Quantity Change rows. An item
+    whose Initial Stock row falls inside the window has no history before
+    it, so its first day is that row's day rather than day 0.
+    """
+    index = {item_id: i for i, item_id in enumerate(item_ids)}
+    offsets = {}
+    
+    def day_offset(timestamp):
+        # Memoized since many rows share a day
+        text = str(timestamp)[:10]
+        offset = offsets.get(text)
+        if offset is None:
+            try:
+                offset = (date.fromisoformat(text) - start).days
+            except ValueError:
+                offset = -1
+            if not 0 <= offset < days:
+                offset = -1
+            offsets[text] = offset
+        return offset
+    
+    count = len(movements)
+    codes = np.fromiter((index.get(str(m.get('Item ID', '')), -1) for m in movements), dtype=np.int64, count=count)
+    day = np.fromiter((day_offset(m.get('Timestamp', '')) for m in movements), dtype=np.int64, count=count)
+    change = np.fromiter((to_float(m.get('Quantity Change')) for m in movements), dtype=np.float64, count=count)
+    actions = np.array([str(m.get('Action Type', '')) for m in movements], dtype=object)
+    valid = (codes >= 0) & (day >= 0)
+    
+    used = valid & (change < 0) & ~np.isin(actions, NON_DEMAND_ACTIONS)
+    usage = np.bincount(
+        codes[used] * days + day[used], weights=-change[used], minlength=len(item_ids) * days
+    ).reshape(len(item_ids), days)
+    
+    first_day = np.zeros(len(item_ids), dtype=np.int64)
+    created = valid & (actions == 'Initial Stock')
+    np.maximum.at(first_day, codes[created], day[created])
+    return usage, first_day
+
+def demand_forecast(items, movements, today=None, window_days=None, lead_time_days=None,
+                    review_days=None, safety_factor=None):
+    """Usage rate, variability, days of cover and suggested reorder points for every item
+    
+    Daily usage over the window gives each item's mean rate and standard
+    deviation. The suggested reorder level covers usage over the lead time
+    plus safety stock of safety_factor deviations of lead-time usage; an
+    item at or below it should order enough to last review_days past the
+    lead time.
+    """
+    today = today or date.today()
+    window_days = window_days or Config.FORECAST_WINDOW_DAYS
+    lead_time_days = Config.FORECAST_LEAD_TIME_DAYS if lead_time_days is None else lead_time_days
+    review_days = Config.FORECAST_REVIEW_DAYS if review_days is None else review_days
+    safety_factor = Config.FORECAST_SAFETY_FACTOR if safety_factor is None else safety_factor
+    start = today - timedelta(days=window_days - 1)
+    
+    count = len(items)
+    item_ids = [str(item.get('Item ID', '')) for item in items]
+    stock = np.fromiter((to_float(item.get('Current Stock')) for item in items), dtype=np.float64, count=count)
+    reorder = np.fromiter((to_float(item.get('Reorder Level')) for item in items), dtype=np.float64, count=count)
+    cost = np.fromiter((to_float(item.get('Cost Per Unit')) for item in items), dtype=np.float64, count=count)
+    usage, first_day = usage_matrix(item_ids, movements, start, window_days)
+    
+    # Statistics over the days each item existed
+    observed = window_days - first_day
+    in_history = np.arange(window_days) >= first_day[:, None]
+    usage = np.where(in_history, usage, 0.0)
+    rate = usage.sum(axis=1) / observed
+    deviations = np.where(in_history, usage - rate[:, None], 0.0)
+    std = np.sqrt((deviations ** 2).sum(axis=1) / np.maximum(observed - 1, 1))
+    
+    has_demand = rate > 0
+    safety_stock = safety_factor * std * np.sqrt(lead_time_days)
+    suggested_level = np.ceil(rate * lead_time_days + safety_stock)
+    order_up_to = rate * (lead_time_days + review_days) + safety_stock
+    needs_reorder = has_demand & (stock <= suggested_level)
+    order_quantity = np.where(needs_reorder, np.ceil(np.maximum(order_up_to - stock, 0.0)), 0.0)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        cover = np.where(has_demand, np.maximum(stock, 0.0) / rate, np.inf)
+    
+    # Items to reorder first, then by days of cover; items without usage last
+    order = np.lexsort((np.array(item_ids, dtype=str), cover, ~needs_reorder))
+    rows = [
+        {
+            'item_id': item_ids[i],
+            'name': items[i].get('Name', ''),
+            'unit': items[i].get('Unit', ''),
+            'supplier': items[i].get('Supplier', ''),
+            'current_stock': float(stock[i]),
+            'reorder_level': float(reorder[i]),
+            'daily_usage': daily,
+            'usage_std': deviation,
+            'days_of_cover': round(float(cover[i]), 1) if has_demand[i] else None,
+            'suggested_reorder_level': float(suggested_level[i]),
+            'suggested_order_quantity': float(order_quantity[i]),
+            'order_value': round(float(order_quantity[i] * cost[i]), 2),
+            'needs_reorder': bool(needs_reorder[i])
+        }
+        for i, daily, deviation in zip(order, _round(rate[order]), _round(std[order]))
+    ]
+    
+    return {
+        'as_of': today.isoformat(),
+        'window_start': start.isoformat(),
+        'window_days': window_days,
+        'lead_time_days': lead_time_days,
+        'review_days': review_days,
+        'safety_factor': safety_factor,
+        'item_count': count,
+        'items_with_demand': int(has_demand.sum()),
+        'items_to_reorder': int(needs_reorder.sum()),
+        'levels_to_change': int((has_demand & (suggested_level != reorder)).sum()),
+        'total_order_value': round(float((order_quantity * cost).sum()), 2),
+        'items': rows
+    }
+
+class ForecastManager:
+    def __init__(self, sheets_manager):
+        self.sheets = sheets_manager
+    
+    def _history(self, window_days):
+        """Inventory and the movements inside the window, read together where the backend caches sheets"""
+        window_days = window_days or Config.FORECAST_WINDOW_DAYS
+        self.sheets.flush_movements()
+        self.sheets.prefetch([Config.INVENTORY_SHEET, Config.STOCK_MOVEMENTS_SHEET, Config.MOVEMENT_PARTITIONS_SHEET])
+        items = self.sheets.get_all_records(Config.INVENTORY_SHEET)
+        movements = self.sheets.get_movements(date.today() - timedelta(days=window_days - 1))
+        return items, movements
+    
+    def get_forecast(self, window_days=None, lead_time_days=None, review_days=None, limit=None):
+        """Demand forecast for the whole catalog from one pass over recent movements"""
+        try:
+            items, movements = self._history(window_days)
+            forecast = demand_forecast(
+                items, movements, window_days=window_days, lead_time_days=lead_time_days, review_days=review_days
+            )
+            if limit is not None:
+                forecast['items'] = forecast['items'][:limit]
+            return forecast
+        except StorageQuotaError:
+            raise
+        except Exception as e:
+            print(f"Error computing demand forecast: {e}")
+            return None
+    
+    def apply_reorder_levels(self, window_days=None, lead_time_days=None):
+        """Write the suggested reorder level of every item with usage whose level differs
+        
+        Items without usage in the window keep their level. Returns
+        {'success', 'updated', 'items'} or None on error.
+        """
+        try:
+            items, movements = self._history(window_days)
+            forecast = demand_forecast(items, movements, window_days=window_days, lead_time_days=lead_time_days)
+            changes = {
+                row['item_id']: row['suggested_reorder_level']
+                for row in forecast['items']
+                if row['days_of_cover'] is not None and row['suggested_reorder_level'] != row['reorder_level']
+            }
+            if not changes:
+                return {'success': True, 'updated': 0, 'items': []}
+            
+            current_time = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+            found = self.sheets.find_records_by_ids(Config.INVENTORY_SHEET, 'Item ID', list(changes))
+            updates = {
+                row_number: {'Reorder Level': changes[item_id], 'Last Updated': current_time}
+                for item_id, (row_number, _) in found.items()
+            }
+            success = self.sheets.batch_update_cells(Config.INVENTORY_SHEET, updates)
+            return {
+                'success': bool(success),
+                'updated': len(updates) if success else 0,
+                'items': [
+                    {'item_id': item_id, 'reorder_level': record.get('Reorder Level'), 'suggested_reorder_level': changes[item_id]}
+                    for item_id, (_, record) in sorted(found.items())
+                ]
+            }
+        except StorageQuotaError:
+            raise
+        except Exception as e:
+            print(f"Error applying reorder levels: {e}")
+            return None
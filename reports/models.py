@@ -0,0 +1,70 @@
+from config.settings import Config
+from inventory.low_stock import LowStockView
+from storage.base import StorageQuotaError, to_float
+
+class DashboardManager:
+    def __init__(self, sheets_manager):
+        self.sheets = sheets_manager
+        self.sheet_names = [
+            Config.INVENTORY_SHEET,
+            Config.SHIPMENTS_SHEET,
+            Config.TRANSFERS_SHEET,
+            Config.STOCK_MOVEMENTS_SHEET
+        ]
+    
+    def get_dashboard(self, recent_limit=10):
+        """Get summary counts, low stock items, recent activity and chart data
+        
+        All sheets are read with a single batch call and aggregated here, so the
+        page needs one request instead of one per sheet.
+        """
+        try:
+            records = self.sheets.batch_get_records(self.sheet_names)
+            items = records[Config.INVENTORY_SHEET]
+            shipments = records[Config.SHIPMENTS_SHEET]
+            transfers = records[Config.TRANSFERS_SHEET]
+            movements = records[Config.STOCK_MOVEMENTS_SHEET]
+            
+            stock_value = 0.0
+            category_stock = {}
+            stock_status = {'healthy': 0, 'low': 0, 'critical': 0}
+            
+            for item in items:
+                current_stock = to_float(item.get('Current Stock', 0))
+                reorder_level = to_float(item.get('Reorder Level', 0))
+                stock_value += current_stock * to_float(item.get('Cost Per Unit', 0))
+                
+                category = item.get('Category') or 'Uncategorized'
+                category_stock[category] = category_stock.get(category, 0) + current_stock
+                
+                if current_stock <= 0:
+                    stock_status['critical'] += 1
+                elif current_stock <= reorder_level:
+                    stock_status['low'] += 1
+                else:
+                    stock_status['healthy'] += 1
+            
+            categories = [item.get('Category') for item in items if item.get('Category')]
+            
+            # Served from the maintained view, ordered by deficit
+            low_stock_items = self.sheets.get_view(Config.INVENTORY_SHEET, 'low_stock', LowStockView).items()
+            
+            return {
+                'summary': {
+                    'total_items': len(items),
+                    'stock_value': round(stock_value, 2),
+                    'total_categories': len(set(categories)),
+                    'low_stock_items': len(low_stock_items),
+                    'pending_shipments': sum(1 for s in shipments if s.get('Status') == 'Pending'),
+                    'pending_transfers': sum(1 for t in transfers if t.get('Status') == 'Pending')
+                },
+                'low_stock': low_stock_items,
+                'recent_activity': list(reversed(movements[-recent_limit:])) if recent_limit > 0 else [],
+                'category_stock': category_stock,
+                'stock_status': stock_status
+            }
+        except StorageQuotaError:
+            raise
+        except Exception as e:
+            print(f"Error building dashboard: {e}")
+            return None
@@ -0,0 +1,254 @@
+import bisect
+import threading
+from datetime import date, timedelta
+from config.settings import Config
+from storage.base import StorageQuotaError, TableView, partitions_in_range, to_float
+
+GRANULARITIES = ('day', 'week')
+
+def parse_report_date(value):
+    """Parse a YYYY-MM-DD query value; blank means unbounded"""
+    if not value:
+        return None
+    return date.fromisoformat(value)
+
+def _totals(count=0, quantity_in=0.0, quantity_out=0.0):
+    return {
+        'movements': count,
+        'quantity_in': round(quantity_in, 4),
+        'quantity_out': round(quantity_out, 4),
+        'net': round(quantity_in - quantity_out, 4)
+    }
+
+class MovementRollupView(TableView):
+    """Daily and weekly movement totals per (item, action type)
+    
+    Each bucket maps (item ID, action type) to [movements, quantity in,
+    quantity out]; bucket dates are kept sorted so a date range is two
+    bisections. Stock_Movements is append-only, so a fresh snapshot that
+    still ends with the last row folded in only has its new rows applied;
+    anything else (a deleted or rewritten row) rebuilds from scratch.
+    """
+    def __init__(self):
+        super().__init__()
+        self._lock = threading.RLock()
+        self._clear()
+    
+    def _clear(self):
+        self.buckets = {granularity: {} for granularity in GRANULARITIES}
+        self.periods = {granularity: [] for granularity in GRANULARITIES}
+        self.item_names = {}
+        self.folded = 0
+        self.last_row = None
+        self.unparsed = 0
+        self._dates = {}
+    
+    def _row_key(self, record):
+        return tuple(str(record.get(header, '')) for header in ('Timestamp', 'Item ID', 'Action Type', 'Quantity Change', 'Reference ID'))
+    
+    def _day(self, timestamp):
+        """Date of a Timestamp cell, memoized since many rows share a day"""
+        text = str(timestamp)[:10]
+        day = self._dates.get(text)
+        if day is None:
+            try:
+                day = date.fromisoformat(text)
+            except ValueError:
+                day = False
+            self._dates[text] = day
+        return day
+    
+    def _apply(self, record, sign):
+        day = self._day(record.get('Timestamp', ''))
+        if not day:
+            self.unparsed += sign
+            return
+        item_id = str(record.get('Item ID', ''))
+        if record.get('Item Name'):
+            self.item_names[item_id] = record.get('Item Name')
+        change = to_float(record.get('Quantity Change'))
+        key = (item_id, str(record.get('Action Type', '')))
+        for granularity, period in (('day', day), ('week', day - timedelta(days=day.weekday()))):
+            buckets = self.buckets[granularity]
+            bucket = buckets.get(period)
+            if bucket is None:
+                bucket = buckets[period] = {}
+                bisect.insort(self.periods[granularity], period)
+            totals = bucket.setdefault(key, [0, 0.0, 0.0])
+            totals[0] += sign
+            totals[1 if change > 0 else 2] += sign * abs(change)
+            if totals[0] <= 0:
+                del bucket[key]
+                if not bucket:
+                    del buckets[period]
+                    periods = self.periods[granularity]
+                    del periods[bisect.bisect_left(periods, period)]
+    
+    def reset(self, records):
+        with self._lock:
+            extends = (
+                self.folded and len(records) >= self.folded
+                and self._row_key(records[self.folded - 1]) == self.last_row
+            )
+            if not extends:
+                self._clear()
+            for record in records[self.folded:]:
+                self._apply(record, 1)
+            self.folded = len(records)
+            self.last_row = self._row_key(records[-1]) if records else None
+            self.stale = False
+    
+    def upsert(self, record):
+        # Movements are only ever appended
+        with self._lock:
+            self._apply(record, 1)
+            self.folded += 1
+            self.last_row = self._row_key(record)
+    
+    def remove(self, record):
+        with self._lock:
+            self._apply(record, -1)
+            # Positions shifted, so the next snapshot is folded from scratch
+            self.folded = 0
+            self.last_row = None
+    
+    def report(self, start=None, end=None, granularity='day', item_limit=20):
+        """Totals per period, action type and item for buckets within [start, end]"""
+        return build_report([self], start, end, granularity, item_limit)
+    
+    def buckets_between(self, start, end, granularity):
+        """Copies of the buckets dated within [start, end], as [(period, [(key, totals)])]"""
+        with self._lock:
+            periods = self.periods[granularity]
+            low = bisect.bisect_left(periods, start) if start else 0
+            high = bisect.bisect_right(periods, end) if end else len(periods)
+            return [
+                (period, [(key, list(totals)) for key, totals in self.buckets[granularity][period].items()])
+                for period in periods[low:high]
+            ]
+    
+    def labels(self):
+        """Latest name of each item and the count of rows without a readable date"""
+        with self._lock:
+            return dict(self.item_names), self.unparsed
+
+def build_report(views, start=None, end=None, granularity='day', item_limit=20):
+    """Totals per period, action type and item across several rollup views
+    
+    Weekly buckets start on Monday and are included whole when they
+    overlap the range; a week split across views is merged.
+    """
+    if start and granularity == 'week':
+        start = start - timedelta(days=start.weekday())
+    periods = {}
+    item_names = {}
+    unparsed = 0
+    for view in views:
+        for period, entries in view.buckets_between(start, end, granularity):
+            periods.setdefault(period, []).extend(entries)
+        names, view_unparsed = view.labels()
+        item_names.update(names)
+        unparsed += view_unparsed
+    
+    rows = []
+    actions = {}
+    items = {}
+    overall = [0, 0.0, 0.0]
+    for period in sorted(periods):
+        period_totals = [0, 0.0, 0.0]
+        period_actions = {}
+        for (item_id, action), totals in periods[period]:
+            for target in (period_totals, period_actions.setdefault(action, [0, 0.0, 0.0]),
+                           actions.setdefault(action, [0, 0.0, 0.0]), items.setdefault(item_id, [0, 0.0, 0.0]),
+                           overall):
+                target[0] += totals[0]
+                target[1] += totals[1]
+                target[2] += totals[2]
+        row = {'period': period.isoformat()}
+        row.update(_totals(*period_totals))
+        row['actions'] = {action: _totals(*totals) for action, totals in sorted(period_actions.items())}
+        rows.append(row)
+    
+    top_items = sorted(items.items(), key=lambda entry: (-entry[1][0], entry[0]))
+    if item_limit is not None:
+        top_items = top_items[:item_limit]
+    return {
+        'granularity': granularity,
+        'from': start.isoformat() if start else None,
+        'to': end.isoformat() if end else None,
+        'totals': _totals(*overall),
+        'periods': rows,
+        'actions': {action: _totals(*totals) for action, totals in sorted(actions.items())},
+        'items': [
+            dict({'item_id': item_id, 'item_name': item_names.get(item_id, '')}, **_totals(*totals))
+            for item_id, totals in top_items
+        ],
+        'item_count': len(items),
+        'unparsed_rows': unparsed
+    }
+
+class MovementReportManager:
+    """Movement reports over the live sheet's rollups and those of archived months
+    
+    Archived partitions only change when an archive run adds rows, so the
+    rollups of each one are built once per committed row count and kept.
+    """
+    def __init__(self, sheets_manager):
+        self.sheets = sheets_manager
+        self.sheet_name = Config.STOCK_MOVEMENTS_SHEET
+        self._partition_views = {}
+        self._lock = threading.Lock()
+    
+    def get_rollup_view(self):
+        """The shared movement rollups, folded from Stock_Movements on first use"""
+        # Queued movements reach the view through the append they are written with
+        self.sheets.flush_movements()
+        return self.sheets.get_view(self.sheet_name, 'rollups', MovementRollupView)
+    
+    def get_partition_views(self, start=None, end=None, granularity='day'):
+        """Rollups of the archived partitions overlapping [start, end], loading new ones in one read"""
+        if granularity == 'week':
+            # Weekly buckets are reported whole, so cover the full weeks at both ends
+            start = start - timedelta(days=start.weekday()) if start else None
+            end = end + timedelta(days=6 - end.weekday()) if end else None
+        partitions = partitions_in_range(self.sheets.movement_partitions(), start, end)
+        with self._lock:
+            missing = [p for p in partitions if (p['partition'], p['rows']) not in self._partition_views]
+            if missing:
+                # Fetch the live sheet in the same read as the partitions
+                self.sheets.prefetch([p['partition'] for p in missing] + [self.sheet_name])
+            records = self.sheets.get_partition_records(missing)
+            for partition in missing:
+                view = MovementRollupView()
+                view.reset(records.get(partition['partition'], []))
+                # A new row count supersedes the partition's earlier rollups
+                self._partition_views = {
+                    key: cached for key, cached in self._partition_views.items() if key[0] != partition['partition']
+                }
+                self._partition_views[(partition['partition'], partition['rows'])] = view
+            return [self._partition_views[(p['partition'], p['rows'])] for p in partitions]
+    
+    def get_movement_report(self, start=None, end=None, granularity='day', item_limit=20):
+        """Movement totals for a date range, reading only partitions that overlap it"""
+        try:
+            views = self.get_partition_views(start, end, granularity) + [self.get_rollup_view()]
+            return build_report(views, start, end, granularity, item_limit)
+        except StorageQuotaError:
+            raise
+        except Exception as e:
+            print(f"Error building movement report: {e}")
+            return None
+    
+    def get_movements(self, start=None, end=None, item_id=None, limit=None):
+        """Movement rows within [start, end], newest first, reading only the overlapping partitions"""
+        try:
+            movements = self.sheets.get_movements(start, end)
+            if item_id:
+                movements = [m for m in movements if str(m.get('Item ID', '')) == item_id]
+            movements.reverse()
+            return movements if limit is None else movements[:limit]
+        except StorageQuotaError:
+            raise
+        except Exception as e:
+            print(f"Error getting stock movements: {e}")
+            return None
@@ -0,0 +1,240 @@
+import threading
+import time
+from collections import Counter
+from gspread.exceptions import WorksheetNotFound
+from gspread.utils import a1_to_rowcol
+
+def _render(value):
+    """Render a cell the way the Sheets API returns formatted values"""
+    if value is None:
+        return ''
+    if isinstance(value, bool):
+        return 'TRUE' if value else 'FALSE'
+    if isinstance(value, float) and value.is_integer():
+        return str(int(value))
+    return str(value)
+
+class CallStats:
+    """Counts API round-trips and quota units for a fake client"""
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.calls = Counter()
+        self.read_units = 0
+        self.write_units = 0
+    
+    def record(self, method, kind):
+        with self._lock:
+            self.calls[method] += 1
+            if kind == 'read':
+                self.read_units += 1
+            else:
+                self.write_units += 1
+    
+    @property
+    def round_trips(self):
+        return self.read_units + self.write_units
+    
+    def snapshot(self):
+        with self._lock:
+            return {
+                'round_trips': self.read_units + self.write_units,
+                'read_units': self.read_units,
+                'write_units': self.write_units,
+                'calls': dict(self.calls)
+            }
+    
+    def reset(self):
+        with self._lock:
+            self.calls.clear()
+            self.read_units = 0
+            self.write_units = 0
+
+class FakeClient:
+    """In-memory stand-in for a gspread client
+    
+    Every method that would be an HTTP request sleeps for latency_ms and is
+    counted in stats, so code paths can be measured without touching Google.
+    """
+    def __init__(self, latency_ms=0):
+        self.latency_ms = latency_ms
+        self.stats = CallStats()
+        self._spreadsheets = {}
+    
+    def request(self, method, kind):
+        """Account for one simulated API round-trip"""
+        self.stats.record(method, kind)
+        if self.latency_ms:
+            time.sleep(self.latency_ms / 1000.0)
+    
+    def open_by_key(self, key):
+        self.request('open_by_key', 'read')
+        if key not in self._spreadsheets:
+            self._spreadsheets[key] = FakeSpreadsheet(self, key)
+        return self._spreadsheets[key]
+
+class FakeSpreadsheet:
+    def __init__(self, client, key):
+        self.client = client
+        self.id = key
+        self._worksheets = {}
+        self.developer_metadata = []
+    
+    def worksheets(self):
+        self.client.request('worksheets', 'read')
+        return list(self._worksheets.values())
+    
+    def worksheet(self, title):
+        self.client.request('worksheet', 'read')
+        if title not in self._worksheets:
+            raise WorksheetNotFound(title)
+        return self._worksheets[title]
+    
+    def add_worksheet(self, title, rows=1000, cols=26):
+        self.client.request('add_worksheet', 'write')
+        worksheet = FakeWorksheet(self, title)
+        self._worksheets[title] = worksheet
+        return worksheet
+    
+    def values_batch_get(self, ranges, params=None):
+        """Read whole worksheets, or A1 cell ranges of them, in a single round-trip"""
+        self.client.request('values_batch_get', 'read')
+        value_ranges = []
+        for range_name in ranges:
+            title, _, cells = range_name.rpartition('!') if '!' in range_name else (range_name, '', '')
+            title = title.strip("'").replace("''", "'")
+            if title not in self._worksheets:
+                raise WorksheetNotFound(title)
+            sheet_rows = self._worksheets[title].rows
+            if cells:
+                first, _, last = cells.partition(':')
+                top, left = a1_to_rowcol(first)
+                bottom, right = a1_to_rowcol(last) if last else (top, left)
+                sheet_rows = [row[left - 1:right] for row in sheet_rows[top - 1:bottom]]
+            rows = []
+            for row in sheet_rows:
+                values = list(row)
+                while values and values[-1] == '':
+                    values.pop()
+                rows.append(values)
+            while rows and not rows[-1]:
+                rows.pop()
+            value_ranges.append({'range': range_name, 'values': rows})
+        return {'spreadsheetId': self.id, 'valueRanges': value_ranges}
+    
+    def values_batch_update(self, params=None, body=None):
+        """Write cell ranges of any worksheets in a single round-trip"""
+        self.client.request('values_batch_update', 'write')
+        for entry in body['data']:
+            title, cell = entry['range'].rsplit('!', 1)
+            title = title.strip("'").replace("''", "'")
+            if title not in self._worksheets:
+                raise WorksheetNotFound(title)
+            row, col = a1_to_rowcol(cell.split(':')[0])
+            self._worksheets[title]._write(row, col, entry['values'])
+        return {'spreadsheetId': self.id, 'totalUpdatedCells': sum(len(entry['values']) for entry in body['data'])}
+    
+    def fetch_sheet_metadata(self, params=None):
+        """Spreadsheet-level developer metadata; the API omits the key when there is none"""
+        self.client.request('fetch_sheet_metadata', 'read')
+        if not self.developer_metadata:
+            return {}
+        return {'developerMetadata': [dict(entry) for entry in self.developer_metadata]}
+    
+    def batch_update(self, body):
+        """Apply create/update/delete developer metadata requests in a single round-trip"""
+        self.client.request('batch_update', 'write')
+        for request in body['requests']:
+            if 'createDeveloperMetadata' in request:
+                entry = dict(request['createDeveloperMetadata']['developerMetadata'])
+                entry['metadataId'] = max([e['metadataId'] for e in self.developer_metadata], default=0) + 1
+                self.developer_metadata.append(entry)
+            elif 'updateDeveloperMetadata' in request:
+                update = request['updateDeveloperMetadata']
+                for entry in self._matching_metadata(update['dataFilters']):
+                    entry['metadataValue'] = update['developerMetadata']['metadataValue']
+            elif 'deleteDeveloperMetadata' in request:
+                deleted = self._matching_metadata([request['deleteDeveloperMetadata']['dataFilter']])
+                self.developer_metadata = [e for e in self.developer_metadata if e not in deleted]
+        return {'spreadsheetId': self.id, 'replies': [{} for _ in body['requests']]}
+    
+    def _matching_metadata(self, data_filters):
+        matches = []
+        for data_filter in data_filters:
+            lookup = data_filter['developerMetadataLookup']
+            matches.extend(
+                entry for entry in self.developer_metadata
+                if all(entry.get(field) == value for field, value in lookup.items())
+            )
+        return matches
+    
+    def seed_worksheet(self, title, rows):
+        """Create or replace a worksheet's contents without counting API calls"""
+        worksheet = self._worksheets.get(title) or FakeWorksheet(self, title)
+        worksheet.rows = [[_render(value) for value in row] for row in rows]
+        self._worksheets[title] = worksheet
+        return worksheet
+
+class FakeWorksheet:
+    def __init__(self, spreadsheet, title):
+        self.spreadsheet = spreadsheet
+        self.client = spreadsheet.client
+        self.title = title
+        self.rows = []
+    
+    @property
+    def row_count(self):
+        return len(self.rows)
+    
+    def get_all_values(self, **kwargs):
+        self.client.request('get_all_values', 'read')
+        return self._values()
+    
+    def _values(self):
+        width = max((len(row) for row in self.rows), default=0)
+        return [row + [''] * (width - len(row)) for row in self.rows]
+    
+    def row_values(self, row, **kwargs):
+        self.client.request('row_values', 'read')
+        if row > len(self.rows):
+            return []
+        values = list(self.rows[row - 1])
+        while values and values[-1] == '':
+            values.pop()
+        return values
+    
+    def append_row(self, values, **kwargs):
+        self.client.request('append_row', 'write')
+        self.rows.append([_render(value) for value in values])
+    
+    def append_rows(self, values, **kwargs):
+        self.client.request('append_rows', 'write')
+        self.rows.extend([_render(value) for value in row] for row in values)
+    
+    def update_cell(self, row, col, value):
+        self.client.request('update_cell', 'write')
+        self._write(row, col, [[value]])
+    
+    def update(self, range_name, values=None, **kwargs):
+        self.client.request('update', 'write')
+        row, col = a1_to_rowcol(range_name.split(':')[0])
+        self._write(row, col, values)
+    
+    def batch_update(self, data, **kwargs):
+        self.client.request('batch_update', 'write')
+        for entry in data:
+            row, col = a1_to_rowcol(entry['range'].split(':')[0])
+            self._write(row, col, entry['values'])
+    
+    def delete_rows(self, start_index, end_index=None):
+        self.client.request('delete_rows', 'write')
+        del self.rows[start_index - 1:(end_index or start_index)]
+    
+    def _write(self, row, col, values):
+        for offset, row_values in enumerate(values):
+            while len(self.rows) < row + offset:
+                self.rows.append([])
+            target = self.rows[row + offset - 1]
+            end = col - 1 + len(row_values)
+            if len(target) < end:
+                target.extend([''] * (end - len(target)))
+            target[col - 1:end] = [_render(value) for value in row_values]
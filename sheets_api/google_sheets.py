@@ -1,17 +1,300 @@
 import gspread
+from gspread.utils import ValueInputOption, numericise_all, rowcol_to_a1
 from google.oauth2.service_account import Credentials
-from datetime import datetime
+from collections import OrderedDict
+import hashlib
 import json
 import os
+import threading
+import time
 from config.settings import Config
+from config.startup import startup_timer
+from sheets_api.movement_archive import MovementArchive
+from sheets_api.movement_writer import MovementWriter
+from sheets_api.scheduler import RequestScheduler
+from storage.base import ID_COLUMNS, SECONDARY_INDEXES, SHEET_SCHEMAS, StorageBackend, StorageQuotaError, build_record, normalize_cell, to_float
 
-class SheetsManager:
-    def __init__(self):
+# Developer metadata key holding the fingerprint of the last verified schema
+SCHEMA_METADATA_KEY = 'invmanagement_schema_verified'
+
+class CachedTable:
+    """Snapshot of a single sheet held in memory
+    
+    Besides the ID index, each column in indexed_columns gets a hash index
+    (value -> set of positions) the first time it is filtered on; built
+    indexes are kept current on appends and updates and dropped on deletes,
+    which shift positions.
+    """
+    def __init__(self, headers, records, version, id_column=None, indexed_columns=()):
+        self.headers = headers
+        self.records = records
+        self.version = version
+        self.id_column = id_column
+        self.indexed_columns = set(indexed_columns)
+        self.loaded_at = time.monotonic()
+        self.index = {}
+        self.secondary = {}
+        self.reindex()
+    
+    def build_record(self, data):
+        """Build a record dict the way get_all_records would return it"""
+        return build_record(self.headers, data)
+    
+    def reindex(self):
+        """Rebuild the ID -> position index from the records"""
+        self.index = {}
+        if self.id_column:
+            for position, record in enumerate(self.records):
+                self.index.setdefault(str(record.get(self.id_column, '')), position)
+    
+    def lookup(self, id_value):
+        """Return the list position of a record by ID, or None"""
+        return self.index.get(str(id_value))
+    
+    def filter(self, filters):
+        """Positions of records matching every {column: value} filter, in sheet order
+        
+        The most selective indexed column narrows the candidates; any
+        remaining filters are checked on those records only.
+        """
+        wanted = {column: str(value) for column, value in filters.items()}
+        candidates = None
+        for column, value in wanted.items():
+            if column in self.indexed_columns:
+                positions = self._secondary_index(column).get(value, ())
+                if candidates is None or len(positions) < len(candidates):
+                    candidates = positions
+        if candidates is None:
+            candidates = range(len(self.records))
+        return sorted(
+            position for position in candidates
+            if all(str(self.records[position].get(column, '')) == value for column, value in wanted.items())
+        )
+    
+    def _secondary_index(self, column):
+        index = self.secondary.get(column)
+        if index is None:
+            index = {}
+            for position, record in enumerate(self.records):
+                index.setdefault(str(record.get(column, '')), set()).add(position)
+            self.secondary[column] = index
+        return index
+    
+    def append_record(self, record):
+        self.records.append(record)
+        position = len(self.records) - 1
+        if self.id_column:
+            self.index.setdefault(str(record.get(self.id_column, '')), position)
+        for column, index in self.secondary.items():
+            index.setdefault(str(record.get(column, '')), set()).add(position)
+    
+    def replace_record(self, position, record):
+        old_record = self.records[position]
+        self.records[position] = record
+        if self.id_column and str(old_record.get(self.id_column, '')) != str(record.get(self.id_column, '')):
+            self.reindex()
+        for column, index in self.secondary.items():
+            old_value = str(old_record.get(column, ''))
+            new_value = str(record.get(column, ''))
+            if old_value != new_value:
+                positions = index.get(old_value)
+                if positions is not None:
+                    positions.discard(position)
+                    if not positions:
+                        del index[old_value]
+                index.setdefault(new_value, set()).add(position)
+    
+    def remove_record(self, position):
+        # Every later position shifts; indexes are rebuilt on next use
+        self.secondary = {}
+        record = self.records.pop(position)
+        if self.id_column:
+            key = str(record.get(self.id_column, ''))
+            if self.index.get(key) == position:
+                del self.index[key]
+            # delete_rows shifts every following row up by one
+            for other_key, other_position in self.index.items():
+                if other_position > position:
+                    self.index[other_key] = other_position - 1
+
+class TableCache:
+    """Per-sheet cache of records with TTL expiry and LRU eviction"""
+    def __init__(self, ttl=None, max_tables=None, id_columns=None, indexed_columns=None):
+        self.ttl = Config.SHEETS_CACHE_TTL if ttl is None else ttl
+        self.id_columns = ID_COLUMNS if id_columns is None else id_columns
+        self.indexed_columns = SECONDARY_INDEXES if indexed_columns is None else indexed_columns
+        self.max_tables = Config.SHEETS_CACHE_MAX_TABLES if max_tables is None else max_tables
+        self._tables = OrderedDict()
+        self._versions = {}
+        self._lock = threading.RLock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+    
+    @property
+    def enabled(self):
+        return self.ttl > 0 and self.max_tables > 0
+    
+    def get(self, sheet_name):
+        """Return the cached table for a sheet, or None if missing or expired"""
+        with self._lock:
+            table = self._tables.get(sheet_name)
+            if table is not None and time.monotonic() - table.loaded_at > self.ttl:
+                del self._tables[sheet_name]
+                table = None
+            if table is None:
+                self.misses += 1
+                return None
+            self._tables.move_to_end(sheet_name)
+            self.hits += 1
+            return table
+    
+    def put(self, sheet_name, headers, records):
+        """Store a freshly loaded snapshot of a sheet"""
+        with self._lock:
+            table = CachedTable(
+                headers, records, self._next_version(sheet_name),
+                self.id_columns.get(sheet_name), self.indexed_columns.get(sheet_name, ())
+            )
+            if not self.enabled:
+                return table
+            self._tables[sheet_name] = table
+            self._tables.move_to_end(sheet_name)
+            while len(self._tables) > self.max_tables:
+                self._tables.popitem(last=False)
+                self.evictions += 1
+            return table
+    
+    def append(self, sheet_name, data):
+        """Apply an appended row to the cached snapshot"""
+        with self._lock:
+            table = self._tables.get(sheet_name)
+            if table is None:
+                return
+            table.append_record(table.build_record(data))
+            table.version = self._next_version(sheet_name)
+    
+    def update(self, sheet_name, row_number, data):
+        """Apply an updated row to the cached snapshot"""
+        with self._lock:
+            table = self._tables.get(sheet_name)
+            if table is None:
+                return
+            index = row_number - 2
+            if not 0 <= index < len(table.records):
+                self.invalidate(sheet_name)
+                return
+            table.replace_record(index, table.build_record(data))
+            table.version = self._next_version(sheet_name)
+    
+    def update_fields(self, sheet_name, row_number, values):
+        """Apply changed cells of one row to the cached snapshot"""
+        with self._lock:
+            table = self._tables.get(sheet_name)
+            if table is None:
+                return
+            index = row_number - 2
+            if not 0 <= index < len(table.records):
+                self.invalidate(sheet_name)
+                return
+            record = dict(table.records[index])
+            record.update({header: normalize_cell(value) for header, value in values.items()})
+            table.replace_record(index, record)
+            table.version = self._next_version(sheet_name)
+    
+    def delete(self, sheet_name, row_number):
+        """Apply a deleted row to the cached snapshot"""
+        with self._lock:
+            table = self._tables.get(sheet_name)
+            if table is None:
+                return
+            index = row_number - 2
+            if not 0 <= index < len(table.records):
+                self.invalidate(sheet_name)
+                return
+            table.remove_record(index)
+            table.version = self._next_version(sheet_name)
+    
+    def peek(self, sheet_name):
+        """The cached table for a sheet if it has not expired; not counted as a hit or miss"""
+        with self._lock:
+            table = self._tables.get(sheet_name)
+            if table is None or time.monotonic() - table.loaded_at > self.ttl:
+                return None
+            return table
+    
+    def record(self, sheet_name, row_number):
+        """Copy of one cached record, or None; not counted as a hit or miss"""
+        with self._lock:
+            table = self._tables.get(sheet_name)
+            index = row_number - 2
+            if table is None or not 0 <= index < len(table.records):
+                return None
+            return dict(table.records[index])
+    
+    def invalidate(self, sheet_name=None):
+        """Drop one sheet, or every sheet, from the cache"""
+        with self._lock:
+            if sheet_name is None:
+                self._tables.clear()
+            else:
+                self._tables.pop(sheet_name, None)
+    
+    def version(self, sheet_name):
+        """Current version number of a sheet (bumped on every load and write)"""
+        return self._versions.get(sheet_name, 0)
+    
+    def stats(self):
+        """Hit/miss counters and the sheets currently held"""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'enabled': self.enabled,
+                'ttl': self.ttl,
+                'max_tables': self.max_tables,
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'hit_rate': round(self.hits / lookups, 4) if lookups else 0.0,
+                'tables': {
+                    name: {'rows': len(table.records), 'version': table.version}
+                    for name, table in self._tables.items()
+                }
+            }
+    
+    def _next_version(self, sheet_name):
+        self._versions[sheet_name] = self._versions.get(sheet_name, 0) + 1
+        return self._versions[sheet_name]
+
+class SheetsManager(StorageBackend):
+    def __init__(self, client=None, spreadsheet_id=None):
+        super().__init__()
         self.credentials_file = Config.GOOGLE_CREDENTIALS_FILE
-        self.spreadsheet_id = Config.SPREADSHEET_ID
-        self.gc = None
-        self.spreadsheet = None
-        self._initialize_connection()
+        self.spreadsheet_id = spreadsheet_id or Config.SPREADSHEET_ID
+        # An injected client (e.g. FakeClient) skips credential loading
+        self.gc = client
+        self._use_schema_marker = client is None
+        self._schema_metadata_id = None
+        self._schema_marked = False
+        self._spreadsheet = None
+        self._connect_lock = threading.Lock()
+        self.cache = TableCache()
+        self._worksheets = {}
+        self._headers = {}
+        self.scheduler = RequestScheduler()
+        self.movement_writer = MovementWriter(self)
+        self.movement_archive = MovementArchive(self)
+        # IDs each thread's lookups found at the row numbers they returned
+        self._resolved = threading.local()
+    
+    @property
+    def spreadsheet(self):
+        """The opened spreadsheet; the connection is made on first use"""
+        if self._spreadsheet is None:
+            with self._connect_lock:
+                if self._spreadsheet is None:
+                    self._initialize_connection()
+        return self._spreadsheet
     
     def _initialize_connection(self):
         """Initialize connection to Google Sheets"""
@@ -25,158 +308,863 @@ class SheetsManager:
             # Load credentials from environment variables (for Vercel) or file (for local development)
             google_credentials_json = os.getenv('GOOGLE_CREDENTIALS_JSON')
             
-            if google_credentials_json:
-                # For Vercel deployment - credentials from environment variable
-                credentials_info = json.loads(google_credentials_json)
-                creds = Credentials.from_service_account_info(credentials_info, scopes=scope)
-                self.gc = gspread.authorize(creds)
-            elif os.path.exists(self.credentials_file):
-                # For local development - credentials from file
-                creds = Credentials.from_service_account_file(self.credentials_file, scopes=scope)
-                self.gc = gspread.authorize(creds)
-            else:
-                raise Exception("No Google credentials found. Set GOOGLE_CREDENTIALS_JSON environment variable or provide credentials.json file.")
+            with startup_timer.phase('sheets_auth'):
+                if self.gc is not None:
+                    # Client was injected (e.g. FakeClient), nothing to authorize
+                    pass
+                elif google_credentials_json:
+                    # For Vercel deployment - credentials from environment variable
+                    credentials_info = json.loads(google_credentials_json)
+                    creds = Credentials.from_service_account_info(credentials_info, scopes=scope)
+                    self.gc = gspread.authorize(creds)
+                elif os.path.exists(self.credentials_file):
+                    # For local development - credentials from file
+                    creds = Credentials.from_service_account_file(self.credentials_file, scopes=scope)
+                    self.gc = gspread.authorize(creds)
+                else:
+                    raise Exception("No Google credentials found. Set GOOGLE_CREDENTIALS_JSON environment variable or provide credentials.json file.")
                 
             if self.spreadsheet_id:
-                self.spreadsheet = self.gc.open_by_key(self.spreadsheet_id)
-                self._ensure_sheets_exist()
+                with startup_timer.phase('sheets_open'):
+                    spreadsheet = self.scheduler.call('read', self.gc.open_by_key, self.spreadsheet_id)
+                
+                # Warm boots skip the sheet/header walk once it has succeeded
+                if not (self._use_schema_marker and self._schema_marker_valid(spreadsheet)):
+                    with startup_timer.phase('schema_check'):
+                        if self._ensure_sheets_exist(spreadsheet) and self._use_schema_marker:
+                            self._write_schema_marker(spreadsheet)
+                self._spreadsheet = spreadsheet
             else:
                 print("Warning: SPREADSHEET_ID not set in environment variables")
                 
         except Exception as e:
             print(f"Error initializing Google Sheets connection: {e}")
     
-    def _ensure_sheets_exist(self):
+    def _ensure_sheets_exist(self, spreadsheet):
         """Ensure all required sheets exist with proper headers"""
-        sheets_config = {
-            Config.INVENTORY_SHEET: [
-                'Item ID', 'Name', 'Category', 'Current Stock', 'Unit', 
-                'Cost Per Unit', 'Reorder Level', 'Supplier', 'Last Updated'
-            ],
-            Config.SHIPMENTS_SHEET: [
-                'Shipment ID', 'Date', 'Supplier', 'Status', 'Total Items', 
-                'Total Cost', 'Received By', 'Notes'
-            ],
-            Config.TRANSFERS_SHEET: [
-                'Transfer ID', 'Date', 'From Location', 'To Location', 
-                'Item ID', 'Item Name', 'Quantity', 'Status', 'Notes'
-            ],
-            Config.STOCK_MOVEMENTS_SHEET: [
-                'Timestamp', 'Item ID', 'Item Name', 'Action Type', 
-                'Quantity Change', 'New Stock Level', 'Reference ID', 'Notes'
-            ],
-            Config.SUPPLIERS_SHEET: [
-                'Supplier ID', 'Name', 'Contact Person', 'Phone', 
-                'Email', 'Address', 'Payment Terms', 'Active'
-            ],
-            Config.USERS_SHEET: [
-                'Username', 'Password', 'Role', 'Active', 'Last Login', 'Created Date'
-            ]
-        }
-        
         try:
-            existing_sheets = [sheet.title for sheet in self.spreadsheet.worksheets()]
+            existing_sheets = {sheet.title: sheet for sheet in self.scheduler.call('read', spreadsheet.worksheets)}
             
-            for sheet_name, headers in sheets_config.items():
+            for sheet_name, headers in SHEET_SCHEMAS.items():
                 if sheet_name not in existing_sheets:
                     # Create the sheet
-                    worksheet = self.spreadsheet.add_worksheet(title=sheet_name, rows=1000, cols=len(headers))
+                    worksheet = self.scheduler.call('write', spreadsheet.add_worksheet, title=sheet_name, rows=1000, cols=len(headers))
                     # Add headers
-                    worksheet.append_row(headers)
+                    self.scheduler.call('write', worksheet.append_row, headers)
                     print(f"Created sheet: {sheet_name}")
                 else:
                     # Check if headers exist, if not add them
-                    worksheet = self.spreadsheet.worksheet(sheet_name)
-                    if worksheet.row_count == 0 or not worksheet.row_values(1):
-                        worksheet.append_row(headers)
+                    worksheet = existing_sheets[sheet_name]
+                    existing_headers = self.scheduler.call('read', worksheet.row_values, 1) if worksheet.row_count else []
+                    if not existing_headers:
+                        self.scheduler.call('write', worksheet.append_row, headers)
                         print(f"Added headers to existing sheet: {sheet_name}")
+                    else:
+                        headers = existing_headers
+                self._worksheets[sheet_name] = worksheet
+                self._headers[sheet_name] = headers
+            return True
         except Exception as e:
             print(f"Error ensuring sheets exist: {e}")
+            return False
+    
+    def _schema_fingerprint(self):
+        """Identify the spreadsheet and expected headers the marker was written for"""
+        schema = json.dumps(SHEET_SCHEMAS, sort_keys=True)
+        return f"{self.spreadsheet_id}:{hashlib.sha1(schema.encode('utf-8')).hexdigest()}"
+    
+    def _schema_marker_valid(self, spreadsheet):
+        """Check whether an earlier boot already verified this spreadsheet's schema
+        
+        The marker file only lives as long as the instance's temp directory,
+        so a miss falls back to the developer metadata stored on the
+        spreadsheet, which every instance shares.
+        """
+        fingerprint = self._schema_fingerprint()
+        try:
+            with open(Config.SCHEMA_MARKER_PATH) as marker:
+                if marker.read().strip() == fingerprint:
+                    self._schema_marked = True
+                    return True
+        except OSError:
+            pass
+        try:
+            metadata = self.scheduler.call('read', spreadsheet.fetch_sheet_metadata, {'fields': 'developerMetadata'})
+        except Exception as e:
+            print(f"Could not read schema marker: {e}")
+            return False
+        for entry in metadata.get('developerMetadata', []):
+            if entry.get('metadataKey') == SCHEMA_METADATA_KEY:
+                self._schema_metadata_id = entry.get('metadataId')
+                if entry.get('metadataValue') == fingerprint:
+                    self._schema_marked = True
+                    self._write_schema_marker_file()
+                    return True
+        return False
+    
+    def _write_schema_marker(self, spreadsheet):
+        """Record the verified schema on the spreadsheet and in the local marker file
+        
+        Failures only cost the next boot a schema check, so nothing is raised.
+        """
+        fingerprint = self._schema_fingerprint()
+        if self._schema_metadata_id is not None:
+            request = {'updateDeveloperMetadata': {
+                'dataFilters': [{'developerMetadataLookup': {'metadataId': self._schema_metadata_id}}],
+                'developerMetadata': {'metadataValue': fingerprint},
+                'fields': 'metadataValue'
+            }}
+        else:
+            request = {'createDeveloperMetadata': {'developerMetadata': {
+                'metadataKey': SCHEMA_METADATA_KEY,
+                'metadataValue': fingerprint,
+                'location': {'spreadsheet': True},
+                'visibility': 'DOCUMENT'
+            }}}
+        try:
+            self.scheduler.call('write', spreadsheet.batch_update, {'requests': [request]})
+            self._schema_marked = True
+        except Exception as e:
+            print(f"Could not write schema marker: {e}")
+        self._write_schema_marker_file()
+    
+    def _write_schema_marker_file(self):
+        try:
+            with open(Config.SCHEMA_MARKER_PATH, 'w') as marker:
+                marker.write(self._schema_fingerprint())
+        except OSError as e:
+            print(f"Could not write schema marker: {e}")
+    
+    def _clear_schema_marker(self):
+        try:
+            os.remove(Config.SCHEMA_MARKER_PATH)
+        except OSError:
+            pass
+        # Only the first structural error after marking needs to unmark the spreadsheet
+        if not self._schema_marked or self._spreadsheet is None:
+            return
+        try:
+            self.scheduler.call('write', self._spreadsheet.batch_update, {'requests': [{'deleteDeveloperMetadata': {
+                'dataFilter': {'developerMetadataLookup': {'metadataKey': SCHEMA_METADATA_KEY}}
+            }}]})
+            self._schema_metadata_id = None
+            self._schema_marked = False
+        except Exception as e:
+            print(f"Could not clear schema marker: {e}")
     
     def get_worksheet(self, sheet_name):
-        """Get a specific worksheet"""
+        """Get a specific worksheet, reusing the handle resolved earlier"""
+        worksheet = self._worksheets.get(sheet_name)
+        if worksheet is not None:
+            return worksheet
         try:
-            return self.spreadsheet.worksheet(sheet_name)
+            # Connecting may seed the handles while verifying the schema
+            spreadsheet = self.spreadsheet
+            worksheet = self._worksheets.get(sheet_name) or self.scheduler.call('read', spreadsheet.worksheet, sheet_name)
+            self._worksheets[sheet_name] = worksheet
+            return worksheet
+        except StorageQuotaError:
+            raise
         except Exception as e:
             print(f"Error getting worksheet {sheet_name}: {e}")
             return None
     
+    def ensure_worksheet(self, sheet_name, headers):
+        """Get a worksheet, first creating it with a header row if it does not exist"""
+        worksheet = self._worksheets.get(sheet_name)
+        if worksheet is not None:
+            return worksheet
+        try:
+            spreadsheet = self.spreadsheet
+            try:
+                worksheet = self.scheduler.call('read', spreadsheet.worksheet, sheet_name)
+            except gspread.exceptions.WorksheetNotFound:
+                worksheet = self.scheduler.call('write', spreadsheet.add_worksheet, title=sheet_name, rows=1000, cols=len(headers))
+                self.scheduler.call('write', worksheet.append_row, headers)
+                self._headers[sheet_name] = list(headers)
+                print(f"Created sheet: {sheet_name}")
+            self._worksheets[sheet_name] = worksheet
+            return worksheet
+        except StorageQuotaError:
+            raise
+        except Exception as e:
+            print(f"Error ensuring worksheet {sheet_name}: {e}")
+            return None
+    
+    def get_headers(self, sheet_name):
+        """Get the header row of a sheet, reading it only the first time"""
+        headers = self._headers.get(sheet_name)
+        if headers:
+            return headers
+        worksheet = self.get_worksheet(sheet_name)
+        if not worksheet:
+            return []
+        headers = self.scheduler.call('read', worksheet.row_values, 1)
+        self._headers[sheet_name] = headers
+        return headers
+    
+    def _handle_error(self, sheet_name, error):
+        """Drop cached state for a sheet after a failed call
+        
+        The worksheet handle, header map and schema marker are only discarded
+        for structural errors (missing sheet, bad range), which mean they have
+        gone stale.
+        """
+        self.cache.invalidate(sheet_name)
+        self._notify_views(sheet_name, 'invalidate')
+        status = getattr(getattr(error, 'response', None), 'status_code', None)
+        if isinstance(error, gspread.exceptions.WorksheetNotFound) or status in (400, 404):
+            self._worksheets.pop(sheet_name, None)
+            self._headers.pop(sheet_name, None)
+            # Re-verify the sheets and headers on the next boot
+            self._clear_schema_marker()
+    
     def append_row(self, sheet_name, data):
         """Append a row to a specific sheet"""
         try:
             worksheet = self.get_worksheet(sheet_name)
             if worksheet:
-                worksheet.append_row(data)
+                self.scheduler.call('write', worksheet.append_row, data)
+                self.cache.append(sheet_name, data)
+                if self._has_views(sheet_name):
+                    self._notify_views(sheet_name, 'upsert', build_record(self.get_headers(sheet_name), data))
                 return True
             return False
+        except StorageQuotaError:
+            raise
         except Exception as e:
             print(f"Error appending row to {sheet_name}: {e}")
+            self._handle_error(sheet_name, e)
             return False
     
-    def get_all_records(self, sheet_name):
-        """Get all records from a sheet as list of dictionaries"""
+    def append_rows(self, sheet_name, rows):
+        """Append several rows to a specific sheet in as few calls as possible"""
+        return self.append_rows_counted(sheet_name, rows) == len(rows)
+    
+    def append_rows_counted(self, sheet_name, rows):
+        """Append rows in chunks and return how many were written
+        
+        Rows are sent in chunks of SHEETS_APPEND_CHUNK_ROWS so large imports
+        stay within the request payload limit. Each chunk is committed on its
+        own, so when one fails the rows before it stay written; the count
+        lets callers resume from the first row that was not. A quota error
+        is only raised when nothing was written.
+        """
+        written = 0
         try:
+            if not rows:
+                return 0
             worksheet = self.get_worksheet(sheet_name)
             if worksheet:
-                return worksheet.get_all_records()
+                chunk_size = max(1, Config.SHEETS_APPEND_CHUNK_ROWS)
+                for start in range(0, len(rows), chunk_size):
+                    chunk = rows[start:start + chunk_size]
+                    self.scheduler.call('write', worksheet.append_rows, chunk)
+                    written += len(chunk)
+                    for data in chunk:
+                        self.cache.append(sheet_name, data)
+                    if self._has_views(sheet_name):
+                        headers = self.get_headers(sheet_name)
+                        for data in chunk:
+                            self._notify_views(sheet_name, 'upsert', build_record(headers, data))
+            return written
+        except StorageQuotaError as e:
+            if not written:
+                raise
+            print(f"Appending rows to {sheet_name} stopped after {written} of {len(rows)}: {e}")
+            return written
+        except Exception as e:
+            print(f"Error appending rows to {sheet_name} after {written} of {len(rows)}: {e}")
+            self._handle_error(sheet_name, e)
+            return written
+    
+    def get_all_records(self, sheet_name):
+        """Get all records from a sheet as list of dictionaries"""
+        try:
+            if sheet_name == Config.STOCK_MOVEMENTS_SHEET:
+                # Make queued movements visible to the reader
+                self.flush_movements()
+            table = self._get_table(sheet_name)
+            if table:
+                return [dict(record) for record in table.records]
             return []
+        except StorageQuotaError:
+            raise
         except Exception as e:
             print(f"Error getting records from {sheet_name}: {e}")
+            self._handle_error(sheet_name, e)
             return []
     
-    def update_row(self, sheet_name, row_number, data):
-        """Update a specific row in a sheet"""
+    def _get_table(self, sheet_name):
+        """Return the cached snapshot of a sheet, loading it on a miss"""
+        table = self.cache.get(sheet_name)
+        if table is not None:
+            return table
+        
+        worksheet = self.get_worksheet(sheet_name)
+        if not worksheet:
+            return None
+        
+        # One values read; records are built the same way get_all_records does
+        values = self.scheduler.call('read', worksheet.get_all_values)
+        return self._store_values(sheet_name, values)
+    
+    def _store_values(self, sheet_name, values):
+        """Build records from raw sheet values and cache them"""
+        headers = values[0] if values else []
+        width = len(headers)
+        # values_batch_get trims trailing empty cells, so pad rows to the header width
+        records = [
+            dict(zip(headers, numericise_all(row + [''] * (width - len(row)))))
+            for row in values[1:]
+        ]
+        if headers:
+            self._headers[sheet_name] = headers
+        table = self.cache.put(sheet_name, headers, records)
+        scope = getattr(self._resolved, 'scope', None)
+        if scope is not None:
+            scope[sheet_name] = table
+        # Views rebuild from the new snapshot the next time they are used
+        self._notify_views(sheet_name, 'invalidate')
+        return table
+    
+    def _load_tables(self, sheet_names):
+        """Cached tables for several sheets, fetching the missing ones with one values_batch_get call"""
+        tables = {}
+        missing = []
+        for sheet_name in sheet_names:
+            table = self.cache.get(sheet_name)
+            if table is not None:
+                tables[sheet_name] = table
+            else:
+                missing.append(sheet_name)
+        
+        if missing:
+            ranges = ["'" + name.replace("'", "''") + "'" for name in missing]
+            response = self.scheduler.call('read', self.spreadsheet.values_batch_get, ranges)
+            value_ranges = response.get('valueRanges', [])
+            for sheet_name, value_range in zip(missing, value_ranges):
+                tables[sheet_name] = self._store_values(sheet_name, value_range.get('values', []))
+        return tables
+    
+    def batch_get_records(self, sheet_names):
+        """Get all records from several sheets with one values_batch_get call
+        
+        Sheets already in the table cache are served from it; the rest are
+        fetched together and cached. Returns {sheet_name: records}.
+        """
+        try:
+            if Config.STOCK_MOVEMENTS_SHEET in sheet_names:
+                # Make queued movements visible to the reader
+                self.flush_movements()
+            
+            tables = self._load_tables(sheet_names)
+            return {
+                sheet_name: [dict(record) for record in tables[sheet_name].records] if sheet_name in tables else []
+                for sheet_name in sheet_names
+            }
+        except StorageQuotaError:
+            raise
+        except Exception as e:
+            print(f"Error batch getting records from {', '.join(sheet_names)}: {e}")
+            for sheet_name in sheet_names:
+                self._handle_error(sheet_name, e)
+            return {sheet_name: [] for sheet_name in sheet_names}
+    
+    def prefetch(self, sheet_names):
+        """Load several sheets into the table cache with at most one read"""
         try:
+            self._load_tables(sheet_names)
+            return True
+        except StorageQuotaError:
+            raise
+        except Exception as e:
+            print(f"Error prefetching {', '.join(sheet_names)}: {e}")
+            for sheet_name in sheet_names:
+                self._handle_error(sheet_name, e)
+            return False
+    
+    def refresh_views(self, sheet_name):
+        """Reload the sheet if its cached snapshot expired, then rebuild stale views"""
+        try:
+            views = list(self._views.get(sheet_name, {}).values())
+            if not views:
+                return
+            table = self._get_table(sheet_name)
+            for view in views:
+                if view.stale:
+                    view.reset(table.records if table else [])
+        except StorageQuotaError:
+            raise
+        except Exception as e:
+            print(f"Error refreshing views of {sheet_name}: {e}")
+            self._handle_error(sheet_name, e)
+    
+    def cache_stats(self):
+        """Get hit/miss counters for the table cache"""
+        return self.cache.stats()
+    
+    def scheduler_stats(self):
+        """Get queue wait times and retry counters for Sheets API calls"""
+        return self.scheduler.stats()
+    
+    def background(self):
+        """Run the enclosed Sheets calls behind interactive requests"""
+        return self.scheduler.background()
+    
+    def begin_request(self):
+        """Start tracking the sheets this thread loads while serving one request
+        
+        A snapshot loaded during the request is as current as reading the
+        target rows back, so writes to it skip that read.
+        """
+        self._resolved.scope = {}
+    
+    def end_request(self):
+        """Stop trusting the snapshots loaded during the request"""
+        self._resolved.scope = None
+    
+    def update_rows(self, sheet_name, rows):
+        """Update several rows of a sheet in one batch_update call
+        
+        rows maps row numbers to either a dict keyed by header or a list of values.
+        """
+        try:
+            if not rows:
+                return True
             worksheet = self.get_worksheet(sheet_name)
             if worksheet:
-                # Convert data to list if it's a dictionary
-                if isinstance(data, dict):
-                    headers = worksheet.row_values(1)
-                    data_list = [data.get(header, '') for header in headers]
-                else:
-                    data_list = data
+                located, _ = self._locate_rows({sheet_name: list(rows)})
+                if located is None:
+                    return False
+                rows = {located[sheet_name][row_number]: data for row_number, data in rows.items()}
+                headers = None
+                batch = []
+                for row_number, data in rows.items():
+                    # Convert data to list if it's a dictionary
+                    if isinstance(data, dict):
+                        if headers is None:
+                            headers = self.get_headers(sheet_name)
+                        data_list = [data.get(header, '') for header in headers]
+                    else:
+                        data_list = list(data)
+                    batch.append({
+                        'range': f"{rowcol_to_a1(row_number, 1)}:{rowcol_to_a1(row_number, len(data_list))}",
+                        'values': [data_list]
+                    })
                 
-                # Update the row
-                for col, value in enumerate(data_list, 1):
-                    worksheet.update_cell(row_number, col, value)
+                # Update every row in one request
+                self.scheduler.call('write', worksheet.batch_update, batch, value_input_option=ValueInputOption.user_entered)
+                for row_number, data in rows.items():
+                    self.cache.update(sheet_name, row_number, data)
+                if self._has_views(sheet_name):
+                    headers = headers or self.get_headers(sheet_name)
+                    for data in rows.values():
+                        self._notify_views(sheet_name, 'upsert', build_record(headers, data))
                 return True
             return False
+        except StorageQuotaError:
+            raise
         except Exception as e:
-            print(f"Error updating row in {sheet_name}: {e}")
+            print(f"Error updating rows in {sheet_name}: {e}")
+            self._handle_error(sheet_name, e)
             return False
     
+    def update_cells(self, sheet_name, row_number, values):
+        """Write only the given cells of one row in a single request"""
+        return self.batch_update_cells(sheet_name, {row_number: values})
+    
+    def batch_update_cells(self, sheet_name, rows):
+        """Write only the given cells of several rows in a single request
+        
+        rows maps row numbers to {header: value}; other cells are left untouched.
+        """
+        return self.batch_update_sheets({sheet_name: rows})
+    
+    def batch_update_sheets(self, updates):
+        """Write cells of several sheets with one values_batch_update call
+        
+        updates maps sheet names to {row_number: {header: value}}.
+        """
+        return self._write_located(updates) is not None
+    
+    def update_from_current(self, sheet_name, column, changes, updates=None):
+        """Write cells computed from the current value of one column
+        
+        changes maps row numbers of sheet_name to functions taking the row's
+        current value of column, as a number, and returning the {header:
+        value} cells to write (empty for none). The values are read back
+        with the row check, so a change another worker made after the
+        snapshot was taken is built on rather than overwritten. updates holds
+        other cells, as for batch_update_sheets, sent in the same request.
+        Returns {row_number: value the change was computed from}, or None
+        when nothing was written.
+        """
+        return self._write_located(updates or {}, sheet_name, column, changes)
+    
+    def _write_located(self, updates, sheet_name=None, column=None, changes=None):
+        """Check the target rows, then write updates and any derived changes in one request"""
+        changes = changes or {}
+        updates = {
+            name: {row_number: values for row_number, values in rows.items() if values}
+            for name, rows in updates.items()
+        }
+        updates = {name: rows for name, rows in updates.items() if rows}
+        if not updates and not changes:
+            return {}
+        targets = {name: list(rows) for name, rows in updates.items()}
+        if changes:
+            targets[sheet_name] = list(dict.fromkeys(targets.get(sheet_name, []) + list(changes)))
+        try:
+            located, current = self._locate_rows(targets, {sheet_name: [column]} if changes else None)
+            if located is None:
+                return None
+            values_now = {row_number: to_float(current[sheet_name][row_number].get(column)) for row_number in changes}
+            writes = {}
+            for name, rows in updates.items():
+                for row_number, values in rows.items():
+                    writes.setdefault(name, {}).setdefault(located[name][row_number], {}).update(values)
+            for row_number, change in changes.items():
+                values = change(values_now[row_number])
+                if values:
+                    writes.setdefault(sheet_name, {}).setdefault(located[sheet_name][row_number], {}).update(values)
+            if not writes:
+                return values_now
+            
+            data = []
+            for name, rows in writes.items():
+                headers = self.get_headers(name)
+                if not headers:
+                    return None
+                prefix = "'" + name.replace("'", "''") + "'!"
+                for row_number, values in rows.items():
+                    for header, value in values.items():
+                        if header not in headers:
+                            print(f"Unknown column {header} in {name}")
+                            return None
+                        data.append({
+                            'range': prefix + rowcol_to_a1(row_number, headers.index(header) + 1),
+                            'values': [[value]]
+                        })
+            
+            self.scheduler.call('write', self.spreadsheet.values_batch_update, body={
+                'valueInputOption': ValueInputOption.user_entered,
+                'data': data
+            })
+            for name, rows in writes.items():
+                for row_number, values in rows.items():
+                    self.cache.update_fields(name, row_number, values)
+                    if self._has_views(name):
+                        record = self.cache.record(name, row_number)
+                        if record is not None:
+                            self._notify_views(name, 'upsert', record)
+                        else:
+                            self._notify_views(name, 'invalidate')
+            return values_now
+        except StorageQuotaError:
+            raise
+        except Exception as e:
+            print(f"Error updating cells in {', '.join(targets)}: {e}")
+            for name in targets:
+                self._handle_error(name, e)
+            return None
+    
     def delete_row(self, sheet_name, row_number):
         """Delete a specific row from a sheet"""
         try:
             worksheet = self.get_worksheet(sheet_name)
             if worksheet:
-                worksheet.delete_rows(row_number)
+                located, _ = self._locate_rows({sheet_name: [row_number]})
+                if located is None:
+                    return False
+                row_number = located[sheet_name][row_number]
+                record = self.cache.record(sheet_name, row_number)
+                self.scheduler.call('write', worksheet.delete_rows, row_number)
+                self.cache.delete(sheet_name, row_number)
+                if record is not None:
+                    self._notify_views(sheet_name, 'remove', record)
+                else:
+                    self._notify_views(sheet_name, 'invalidate')
                 return True
             return False
+        except StorageQuotaError:
+            raise
         except Exception as e:
             print(f"Error deleting row from {sheet_name}: {e}")
+            self._handle_error(sheet_name, e)
             return False
     
-    def find_row_by_id(self, sheet_name, id_column, id_value):
-        """Find a row by ID and return row number"""
+    def delete_rows(self, sheet_name, start_row, end_row):
+        """Delete rows start_row to end_row (inclusive) with one request"""
         try:
             worksheet = self.get_worksheet(sheet_name)
             if worksheet:
-                records = worksheet.get_all_records()
-                for index, record in enumerate(records, 2):  # Start from 2 (accounting for header)
-                    if str(record.get(id_column, '')) == str(id_value):
-                        return index
-            return None
+                self.scheduler.call('write', worksheet.delete_rows, start_row, end_row)
+                # Every later row moved up, so the snapshot is reloaded on next use
+                self.cache.invalidate(sheet_name)
+                self._notify_views(sheet_name, 'invalidate')
+                return True
+            return False
+        except StorageQuotaError:
+            raise
+        except Exception as e:
+            print(f"Error deleting rows from {sheet_name}: {e}")
+            self._handle_error(sheet_name, e)
+            return False
+    
+    def find_row_by_id(self, sheet_name, id_column, id_value):
+        """Find a row by ID and return row number"""
+        try:
+            row_number, _ = self._find_record(sheet_name, id_column, id_value)
+            return row_number
+        except StorageQuotaError:
+            raise
         except Exception as e:
             print(f"Error finding row in {sheet_name}: {e}")
+            self._handle_error(sheet_name, e)
+            return None
+    
+    def get_record_by_id(self, sheet_name, id_column, id_value):
+        """Find a row by ID and return its record"""
+        try:
+            _, record = self._find_record(sheet_name, id_column, id_value)
+            return dict(record) if record is not None else None
+        except StorageQuotaError:
+            raise
+        except Exception as e:
+            print(f"Error getting record from {sheet_name}: {e}")
+            self._handle_error(sheet_name, e)
             return None
     
+    def find_record_by_id(self, sheet_name, id_column, id_value):
+        """Find a row by ID and return (row number, record) from one lookup"""
+        try:
+            row_number, record = self._find_record(sheet_name, id_column, id_value)
+            if record is None:
+                return None, None
+            return row_number, dict(record)
+        except StorageQuotaError:
+            raise
+        except Exception as e:
+            print(f"Error finding record in {sheet_name}: {e}")
+            self._handle_error(sheet_name, e)
+            return None, None
+    
+    def find_records(self, sheet_name, filters):
+        """Records whose columns equal every value in filters, via the cached hash indexes"""
+        try:
+            if sheet_name == Config.STOCK_MOVEMENTS_SHEET:
+                # Make queued movements visible to the reader
+                self.flush_movements()
+            table = self._get_table(sheet_name)
+            if not table:
+                return []
+            return [dict(table.records[position]) for position in table.filter(filters)]
+        except StorageQuotaError:
+            raise
+        except Exception as e:
+            print(f"Error finding records in {sheet_name}: {e}")
+            self._handle_error(sheet_name, e)
+            return []
+    
+    def find_records_by_ids(self, sheet_name, id_column, id_values):
+        """Find several rows from one snapshot, returned as {id: (row number, record)}
+        
+        IDs that are not found are left out of the result.
+        """
+        try:
+            table = self._get_table(sheet_name)
+            if not table:
+                return {}
+            
+            if id_column == table.id_column:
+                positions = {str(id_value): table.lookup(id_value) for id_value in id_values}
+            else:
+                wanted = {str(id_value) for id_value in id_values}
+                positions = {}
+                for position, record in enumerate(table.records):
+                    key = str(record.get(id_column, ''))
+                    if key in wanted:
+                        positions.setdefault(key, position)
+            
+            found = {
+                key: (position + 2, dict(table.records[position]))  # Row 1 is the header
+                for key, position in positions.items() if position is not None
+            }
+            if table.id_column:
+                self._remember_rows(sheet_name, [(row_number, record.get(table.id_column, '')) for row_number, record in found.values()])
+            return found
+        except StorageQuotaError:
+            raise
+        except Exception as e:
+            print(f"Error finding records in {sheet_name}: {e}")
+            self._handle_error(sheet_name, e)
+            return {}
+    
+    def _find_record(self, sheet_name, id_column, id_value):
+        """Return (row number, record) for an ID, using the index when possible"""
+        table = self._get_table(sheet_name)
+        if not table:
+            return None, None
+        
+        if id_column == table.id_column:
+            position = table.lookup(id_value)
+            if position is None:
+                return None, None
+            row_number, record = position + 2, table.records[position]  # Row 1 is the header
+        else:
+            row_number, record = next(
+                ((index, record) for index, record in enumerate(table.records, 2)  # Start from 2 (accounting for header)
+                 if str(record.get(id_column, '')) == str(id_value)),
+                (None, None)
+            )
+            if record is None:
+                return None, None
+        if table.id_column:
+            self._remember_rows(sheet_name, [(row_number, record.get(table.id_column, ''))])
+        return row_number, record
+    
+    def _remember_rows(self, sheet_name, placements):
+        """Record the ID found at each (row number, ID) a lookup handed out
+        
+        Writes check the sheet against these rather than the cached
+        snapshot, which may have been reloaded since the lookup.
+        """
+        rows = getattr(self._resolved, 'rows', None)
+        if rows is None or len(rows) > 10000:
+            rows = self._resolved.rows = {}
+        for row_number, id_value in placements:
+            rows[(sheet_name, row_number)] = str(id_value)
+    
+    def _expected_id(self, sheet_name, row_number, id_column):
+        id_value = getattr(self._resolved, 'rows', {}).get((sheet_name, row_number))
+        if id_value is None:
+            record = self.cache.record(sheet_name, row_number)
+            id_value = str(record.get(id_column, '')) if record is not None else None
+        return id_value
+    
+    def _locate_rows(self, targets, columns=None):
+        """Current row numbers of the records at the target rows, checked before a write
+        
+        targets maps sheet names to row numbers taken from the cached
+        snapshot, which a delete by another worker shifts. A snapshot loaded
+        during the current request is checked in memory. Otherwise the ID
+        cell of every target row, plus the cells of any headers listed for
+        its sheet in columns, is read back in one request; if a row no
+        longer holds the expected ID, that sheet is reloaded and the IDs
+        looked up again, up to SHEETS_WRITE_ATTEMPTS times.
+        
+        Returns (located, current): located maps {sheet_name: {row_number:
+        current row number}} and current maps {sheet_name: {row_number:
+        {header: value}}} for the requested columns. Both are None when a
+        record has been deleted or keeps moving.
+        """
+        columns = columns or {}
+        located = {sheet_name: {row_number: row_number for row_number in rows} for sheet_name, rows in targets.items()}
+        current = {sheet_name: {} for sheet_name in targets}
+        scope = getattr(self._resolved, 'scope', None) or {}
+        # Cells to read back: ((sheet, row number), header, expected value or None)
+        cells = []
+        for sheet_name, rows in targets.items():
+            wanted = columns.get(sheet_name, [])
+            id_column = self.cache.id_columns.get(sheet_name)
+            headers = self.get_headers(sheet_name) if id_column or wanted else []
+            if id_column not in headers:
+                id_column = None
+            table = self.cache.peek(sheet_name)
+            fresh = table is not None and scope.get(sheet_name) is table
+            for row_number in rows:
+                id_value = self._expected_id(sheet_name, row_number, id_column) if id_column else None
+                if not fresh:
+                    if id_value is not None:
+                        cells.append(((sheet_name, row_number), id_column, id_value))
+                    cells.extend(((sheet_name, row_number), header, None) for header in wanted)
+                    continue
+                record = table.records[row_number - 2] if 0 <= row_number - 2 < len(table.records) else None
+                if id_value is not None and (record is None or str(record.get(id_column, '')) != id_value):
+                    position = table.lookup(id_value)
+                    if position is None:
+                        print(f"{id_value} is no longer in {sheet_name}")
+                        return None, None
+                    located[sheet_name][row_number] = position + 2
+                    record = table.records[position]
+                current[sheet_name][row_number] = {header: record.get(header, '') if record else '' for header in wanted}
+        if not cells:
+            return located, current
+        
+        for _ in range(max(1, Config.SHEETS_WRITE_ATTEMPTS)):
+            ranges = [
+                "'" + sheet_name.replace("'", "''") + "'!" + rowcol_to_a1(
+                    located[sheet_name][row_number], self.get_headers(sheet_name).index(header) + 1
+                )
+                for (sheet_name, row_number), header, _ in cells
+            ]
+            response = self.scheduler.call('read', self.spreadsheet.values_batch_get, ranges)
+            moved = set()
+            for ((sheet_name, row_number), header, id_value), value_range in zip(cells, response.get('valueRanges', [])):
+                values = value_range.get('values') or [[]]
+                value = numericise_all([values[0][0] if values[0] else ''])[0]
+                if id_value is None:
+                    current[sheet_name].setdefault(row_number, {})[header] = value
+                elif str(value) != id_value:
+                    moved.add(sheet_name)
+            if not moved:
+                return located, current
+            
+            for sheet_name in moved:
+                print(f"Rows of {sheet_name} moved since they were read, reloading")
+                self.cache.invalidate(sheet_name)
+                self._notify_views(sheet_name, 'invalidate')
+                table = self._get_table(sheet_name)
+                for (key_sheet, row_number), _, id_value in cells:
+                    if key_sheet != sheet_name or id_value is None:
+                        continue
+                    position = table.lookup(id_value) if table else None
+                    if position is None:
+                        print(f"{id_value} is no longer in {sheet_name}")
+                        return None, None
+                    located[sheet_name][row_number] = position + 2
+                    self._remember_rows(sheet_name, [(position + 2, id_value)])
+        print(f"Rows of {', '.join(targets)} kept moving, giving up")
+        return None, None
+    
     def log_stock_movement(self, item_id, item_name, action_type, quantity_change, new_stock_level, reference_id="", notes=""):
         """Log a stock movement to the stock movements sheet"""
         try:
-            timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-            data = [timestamp, item_id, item_name, action_type, quantity_change, new_stock_level, reference_id, notes]
-            return self.append_row(Config.STOCK_MOVEMENTS_SHEET, data)
+            data = self.build_movement_row(item_id, item_name, action_type, quantity_change, new_stock_level, reference_id, notes)
+            return self.movement_writer.enqueue(data)
         except Exception as e:
             print(f"Error logging stock movement: {e}")
-            return False
\ No newline at end of file
+            return False
+    
+    def log_stock_movements(self, rows):
+        """Write many movement rows at once, after any already queued"""
+        try:
+            if not self.flush_movements():
+                return False
+            return self.append_rows(Config.STOCK_MOVEMENTS_SHEET, rows)
+        except StorageQuotaError:
+            raise
+        except Exception as e:
+            print(f"Error logging stock movements: {e}")
+            return False
+    
+    def flush_movements(self):
+        """Write any queued stock movements to the sheet"""
+        return self.movement_writer.flush()
+    
+    def get_movements(self, start=None, end=None):
+        """Stock movements dated within [start, end], reading only the partitions that overlap it"""
+        return self.movement_archive.get_movements(start, end)
+    
+    def movement_partitions(self):
+        """Archived monthly partitions of Stock_Movements, oldest first"""
+        return self.movement_archive.partitions()
+    
+    def archive_movements(self):
+        """Move closed months of Stock_Movements into per-month partition sheets"""
+        return self.movement_archive.archive()
+    
+    def movement_archive_due(self):
+        """Whether closed months are waiting in Stock_Movements (checked from the cache only)"""
+        return self.movement_archive.due()
@@ -0,0 +1,196 @@
+import threading
+import time
+from datetime import date, datetime
+from config.settings import Config
+from storage.base import SHEET_SCHEMAS, StorageQuotaError, movement_partition_name, movements_in_range, partitions_in_range, to_float
+
+def movement_month(record):
+    """'YYYY-MM' of a movement's Timestamp, or None when it is not a date"""
+    try:
+        return date.fromisoformat(str(record.get('Timestamp', ''))[:10]).isoformat()[:7]
+    except ValueError:
+        return None
+
+def cutoff_month(today=None, open_months=None):
+    """Oldest month still kept in the live sheet; earlier months are closed"""
+    today = today or date.today()
+    open_months = open_months or Config.MOVEMENT_OPEN_MONTHS
+    index = today.year * 12 + today.month - 1 - (open_months - 1)
+    return f"{index // 12:04d}-{index % 12 + 1:02d}"
+
+class MovementArchive:
+    """Monthly partitioning of the Stock_Movements sheet
+    
+    Rows from closed months are moved, in log order, into one
+    Stock_Movements_YYYY_MM sheet per month, stopping at the first row of a
+    month still open. Movement_Partitions records each partition's time
+    bounds and committed row count, written after the copy and before the
+    rows leave the live sheet. Readers ignore rows past the committed count,
+    so a copy that fails part way is never seen and is redone on the next
+    run; if the rows cannot be removed from the live sheet, the commit is
+    rolled back.
+    """
+    def __init__(self, sheets_manager):
+        self.sheets = sheets_manager
+        self.sheet_name = Config.STOCK_MOVEMENTS_SHEET
+        self.index_name = Config.MOVEMENT_PARTITIONS_SHEET
+        self._lock = threading.Lock()
+        self._next_check = 0.0
+    
+    def partitions(self):
+        """Committed partitions from the index sheet, oldest month first"""
+        try:
+            partitions = [
+                {
+                    'partition': str(record.get('Partition', '')),
+                    'month': str(record.get('Month', '')),
+                    'first_timestamp': str(record.get('First Timestamp', '')),
+                    'last_timestamp': str(record.get('Last Timestamp', '')),
+                    'rows': int(to_float(record.get('Rows')))
+                }
+                for record in self.sheets.get_all_records(self.index_name)
+                if record.get('Partition')
+            ]
+            return sorted(partitions, key=lambda partition: partition['month'])
+        except StorageQuotaError:
+            raise
+        except Exception as e:
+            print(f"Error reading movement partitions: {e}")
+            return []
+    
+    def get_movements(self, start=None, end=None):
+        """Movements within [start, end] from the overlapping partitions and the live sheet"""
+        try:
+            selected = partitions_in_range(self.partitions(), start, end)
+            # The live sheet can hold rows of any month, so it is always read
+            records = self.sheets.batch_get_records([partition['partition'] for partition in selected] + [self.sheet_name])
+            movements = []
+            for partition in selected:
+                movements.extend(records.get(partition['partition'], [])[:partition['rows']])
+            movements.extend(records.get(self.sheet_name, []))
+            return movements_in_range(movements, start, end)
+        except StorageQuotaError:
+            raise
+        except Exception as e:
+            print(f"Error getting stock movements: {e}")
+            return []
+    
+    def due(self):
+        """Whether the oldest cached live row is from a closed month
+        
+        Only the table cache is consulted, never the API, and a positive
+        answer is given at most once per MOVEMENT_ARCHIVE_CHECK_SECONDS.
+        """
+        now = time.monotonic()
+        if now < self._next_check or self._lock.locked():
+            return False
+        oldest = self.sheets.cache.record(self.sheet_name, 2)
+        if oldest is None:
+            return False
+        self._next_check = now + Config.MOVEMENT_ARCHIVE_CHECK_SECONDS
+        month = movement_month(oldest)
+        return bool(month) and month < cutoff_month()
+    
+    def archive(self):
+        """Move closed months into their partitions
+        
+        Returns {'success', 'archived_rows', 'cutoff', 'partitions', 'error'}.
+        """
+        if not self._lock.acquire(blocking=False):
+            return {'success': False, 'archived_rows': 0, 'partitions': [], 'error': 'Archiving is already running'}
+        try:
+            return self._archive()
+        except StorageQuotaError:
+            raise
+        except Exception as e:
+            print(f"Error archiving stock movements: {e}")
+            return {'success': False, 'archived_rows': 0, 'partitions': [], 'error': str(e)}
+        finally:
+            self._lock.release()
+    
+    def _failed(self, error):
+        print(f"Error archiving stock movements: {error}")
+        return {'success': False, 'archived_rows': 0, 'partitions': [], 'error': error}
+    
+    def _archive(self):
+        cutoff = cutoff_month()
+        self.sheets.flush_movements()
+        live = self.sheets.get_all_records(self.sheet_name)
+        headers = self.sheets.get_headers(self.sheet_name) or SHEET_SCHEMAS[self.sheet_name]
+        
+        # The closed prefix of the log, grouped by month
+        months = {}
+        count = 0
+        for record in live:
+            month = movement_month(record)
+            if not month or month >= cutoff:
+                break
+            months.setdefault(month, []).append(record)
+            count += 1
+        if not count:
+            return {'success': True, 'archived_rows': 0, 'cutoff': cutoff, 'partitions': [], 'error': None}
+        
+        names = {month: movement_partition_name(month) for month in months}
+        for name in names.values():
+            if not self.sheets.ensure_worksheet(name, headers):
+                return self._failed(f"Could not create {name}")
+        index = self.sheets.find_records_by_ids(self.index_name, 'Partition', list(names.values()))
+        existing = self.sheets.batch_get_records(list(names.values()))
+        
+        # Copy each month after dropping rows an interrupted run left past the committed count
+        committed = {}
+        for month, records in sorted(months.items()):
+            name = names[month]
+            committed[name] = int(to_float(index[name][1].get('Rows'))) if name in index else 0
+            stored = len(existing.get(name, []))
+            if stored > committed[name] and not self.sheets.delete_rows(name, committed[name] + 2, stored + 1):
+                return self._failed(f"Could not clear unfinished rows from {name}")
+            rows = [[record.get(header, '') for header in headers] for record in records]
+            if not self.sheets.append_rows(name, rows):
+                return self._failed(f"Could not copy movements to {name}")
+        
+        # Commit the new row counts
+        archived_at = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+        updates = {}
+        previous = {}
+        new_rows = []
+        results = []
+        for month, records in sorted(months.items()):
+            name = names[month]
+            timestamps = [str(record.get('Timestamp', '')) for record in records]
+            total = committed[name] + len(records)
+            if name in index:
+                row_number, entry = index[name]
+                previous[row_number] = {header: entry.get(header, '') for header in ('First Timestamp', 'Last Timestamp', 'Rows', 'Archived At')}
+                updates[row_number] = {
+                    'First Timestamp': min(timestamps + [str(entry.get('First Timestamp') or timestamps[0])]),
+                    'Last Timestamp': max(timestamps + [str(entry.get('Last Timestamp') or timestamps[0])]),
+                    'Rows': total,
+                    'Archived At': archived_at
+                }
+            else:
+                new_rows.append([name, month, min(timestamps), max(timestamps), total, archived_at])
+            results.append({'partition': name, 'month': month, 'rows_added': len(records), 'rows': total})
+        if updates and not self.sheets.batch_update_cells(self.index_name, updates):
+            return self._failed("Could not update the partition index")
+        if new_rows and not self.sheets.append_rows(self.index_name, new_rows):
+            self._roll_back(previous, [])
+            return self._failed("Could not update the partition index")
+        
+        # Remove the copied rows, unless another writer changed the head of the log meanwhile
+        self.sheets.cache.invalidate(self.sheet_name)
+        current = self.sheets.get_all_records(self.sheet_name)
+        if current[:count] != live[:count] or not self.sheets.delete_rows(self.sheet_name, 2, count + 1):
+            self._roll_back(previous, [row[0] for row in new_rows])
+            return self._failed("Could not remove archived rows from the live sheet")
+        
+        return {'success': True, 'archived_rows': count, 'cutoff': cutoff, 'partitions': results, 'error': None}
+    
+    def _roll_back(self, previous, added):
+        """Restore index rows to their earlier counts; partitions added by this run drop to zero rows"""
+        updates = dict(previous)
+        if added:
+            for row_number, _ in self.sheets.find_records_by_ids(self.index_name, 'Partition', added).values():
+                updates[row_number] = {'Rows': 0}
+        if updates and not self.sheets.batch_update_cells(self.index_name, updates):
+            print("Error rolling back the movement partition index")
@@ -0,0 +1,75 @@
+import atexit
+import threading
+from config.settings import Config
+
+class MovementWriter:
+    """Write-behind buffer for Stock_Movements rows
+    
+    Rows are queued in memory and written with a single append_rows call once
+    max_rows are waiting or flush_interval_ms has passed since the first queued
+    row, whichever comes first. Rows a flush could not write stay queued in
+    order and the timer is re-armed to retry them. Call flush() at the end of
+    a request and on shutdown so nothing is left behind.
+    """
+    def __init__(self, sheets_manager, sheet_name=None, max_rows=None, flush_interval_ms=None):
+        self.sheets = sheets_manager
+        self.sheet_name = sheet_name or Config.STOCK_MOVEMENTS_SHEET
+        self.max_rows = Config.MOVEMENT_FLUSH_ROWS if max_rows is None else max_rows
+        self.flush_interval_ms = Config.MOVEMENT_FLUSH_INTERVAL_MS if flush_interval_ms is None else flush_interval_ms
+        self._buffer = []
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._timer = None
+        atexit.register(self.flush)
+    
+    def enqueue(self, row):
+        """Queue a movement row, flushing when the buffer is full"""
+        with self._lock:
+            self._buffer.append(row)
+            buffered = len(self._buffer)
+            if buffered < self.max_rows:
+                self._arm_timer()
+        
+        if buffered >= self.max_rows or self.flush_interval_ms <= 0:
+            return self.flush()
+        return True
+    
+    def _arm_timer(self):
+        # Called with self._lock held
+        if self.flush_interval_ms > 0 and self._timer is None:
+            self._timer = threading.Timer(self.flush_interval_ms / 1000.0, self.flush)
+            self._timer.daemon = True
+            self._timer.start()
+    
+    def flush(self):
+        """Write every queued row with one append_rows call"""
+        with self._flush_lock:
+            with self._lock:
+                rows, self._buffer = self._buffer, []
+                if self._timer is not None:
+                    self._timer.cancel()
+                    self._timer = None
+            
+            if not rows:
+                return True
+            
+            try:
+                # Audit writes yield to interactive requests for quota
+                with self.sheets.background():
+                    written = self.sheets.append_rows_counted(self.sheet_name, rows)
+            except Exception as e:
+                print(f"Error writing stock movements: {e}")
+                written = 0
+            if written < len(rows):
+                # Keep the unwritten rows, in order, and retry them when the timer fires
+                with self._lock:
+                    self._buffer = rows[written:] + self._buffer
+                    self._arm_timer()
+                print(f"Error flushing {len(rows) - written} of {len(rows)} stock movements, will retry")
+                return False
+            return True
+    
+    def pending(self):
+        """Number of rows waiting to be written"""
+        with self._lock:
+            return len(self._buffer)
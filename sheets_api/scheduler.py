@@ -0,0 +1,134 @@
+import random
+import threading
+import time
+from contextlib import contextmanager
+from gspread.exceptions import APIError
+from config.settings import Config
+from storage.base import StorageQuotaError
+
+INTERACTIVE = 'interactive'
+BACKGROUND = 'background'
+
+# HTTP statuses worth retrying: rate limiting and transient server errors
+RETRYABLE_STATUSES = {429, 500, 502, 503, 504}
+
+class TokenBucket:
+    """Token bucket refilled continuously at rate_per_minute"""
+    def __init__(self, rate_per_minute, capacity=None):
+        self.rate = rate_per_minute / 60.0
+        self.capacity = capacity or rate_per_minute
+        self.tokens = float(self.capacity)
+        self.updated = time.monotonic()
+    
+    def try_acquire(self):
+        """Take a token; return 0 on success or the seconds until one is available"""
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+        if self.tokens >= 1:
+            self.tokens -= 1
+            return 0
+        return (1 - self.tokens) / self.rate
+
+class RequestScheduler:
+    """Routes every Sheets API call through read/write quotas
+    
+    Calls wait for a token from the read or write bucket, interactive callers
+    are served before background ones, and 429/5xx responses are retried with
+    jittered exponential backoff before StorageQuotaError is raised.
+    """
+    def __init__(self, reads_per_minute=None, writes_per_minute=None, max_retries=None, backoff_base=None, backoff_max=None):
+        self.buckets = {
+            'read': TokenBucket(reads_per_minute or Config.SHEETS_READS_PER_MINUTE),
+            'write': TokenBucket(writes_per_minute or Config.SHEETS_WRITES_PER_MINUTE)
+        }
+        self.max_retries = Config.SHEETS_MAX_RETRIES if max_retries is None else max_retries
+        self.backoff_base = Config.SHEETS_BACKOFF_BASE if backoff_base is None else backoff_base
+        self.backoff_max = Config.SHEETS_BACKOFF_MAX if backoff_max is None else backoff_max
+        self._condition = threading.Condition()
+        self._waiting = {(kind, priority): 0 for kind in self.buckets for priority in (INTERACTIVE, BACKGROUND)}
+        self._local = threading.local()
+        self._metrics = {
+            (kind, priority): {'calls': 0, 'wait_total': 0.0, 'wait_max': 0.0}
+            for kind in self.buckets for priority in (INTERACTIVE, BACKGROUND)
+        }
+        self.retries = 0
+        self.failures = 0
+    
+    @contextmanager
+    def background(self):
+        """Mark calls made by the current thread as background work"""
+        previous = getattr(self._local, 'priority', INTERACTIVE)
+        self._local.priority = BACKGROUND
+        try:
+            yield
+        finally:
+            self._local.priority = previous
+    
+    def call(self, kind, function, *args, **kwargs):
+        """Run a gspread call of the given kind ('read' or 'write') under the quota"""
+        priority = getattr(self._local, 'priority', INTERACTIVE)
+        attempt = 0
+        while True:
+            self._acquire(kind, priority)
+            try:
+                return function(*args, **kwargs)
+            except APIError as e:
+                status = getattr(getattr(e, 'response', None), 'status_code', None)
+                if status not in RETRYABLE_STATUSES:
+                    raise
+                if attempt >= self.max_retries:
+                    with self._condition:
+                        self.failures += 1
+                    raise StorageQuotaError(f"Google Sheets {kind} failed after {attempt + 1} attempts (HTTP {status})") from e
+                delay = min(self.backoff_max, self.backoff_base * (2 ** attempt))
+                delay *= random.uniform(0.5, 1.0)
+                with self._condition:
+                    self.retries += 1
+                attempt += 1
+                time.sleep(delay)
+    
+    def _acquire(self, kind, priority):
+        """Block until a token is available, letting interactive callers go first"""
+        bucket = self.buckets[kind]
+        started = time.monotonic()
+        with self._condition:
+            self._waiting[(kind, priority)] += 1
+            try:
+                while True:
+                    if priority == BACKGROUND and self._waiting[(kind, INTERACTIVE)]:
+                        self._condition.wait(0.05)
+                        continue
+                    delay = bucket.try_acquire()
+                    if delay == 0:
+                        break
+                    self._condition.wait(delay)
+            finally:
+                self._waiting[(kind, priority)] -= 1
+                self._condition.notify_all()
+            
+            waited = time.monotonic() - started
+            metrics = self._metrics[(kind, priority)]
+            metrics['calls'] += 1
+            metrics['wait_total'] += waited
+            metrics['wait_max'] = max(metrics['wait_max'], waited)
+    
+    def stats(self):
+        """Queue wait times per call kind and priority, plus retry counters"""
+        with self._condition:
+            queues = {}
+            for (kind, priority), metrics in self._metrics.items():
+                calls = metrics['calls']
+                queues[f"{kind}_{priority}"] = {
+                    'calls': calls,
+                    'waiting': self._waiting[(kind, priority)],
+                    'avg_wait_ms': round(metrics['wait_total'] / calls * 1000, 2) if calls else 0.0,
+                    'max_wait_ms': round(metrics['wait_max'] * 1000, 2)
+                }
+            return {
+                'enabled': True,
+                'queues': queues,
+                'retries': self.retries,
+                'failures': self.failures,
+                'tokens': {kind: round(bucket.tokens, 2) for kind, bucket in self.buckets.items()}
+            }
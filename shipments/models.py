@@ -1,6 +1,7 @@
 from datetime import datetime
 import uuid
 from config.settings import Config
+from storage.base import StorageQuotaError
 
 class ShipmentManager:
     def __init__(self, sheets_manager):
@@ -33,6 +34,8 @@ class ShipmentManager:
             if success:
                 return shipment_id
             return None
+        except StorageQuotaError:
+            raise
         except Exception as e:
             print(f"Error adding shipment: {e}")
             return None
@@ -41,6 +44,8 @@ class ShipmentManager:
         """Get all shipments"""
         try:
             return self.sheets.get_all_records(self.sheet_name)
+        except StorageQuotaError:
+            raise
         except Exception as e:
             print(f"Error getting all shipments: {e}")
             return []
@@ -48,11 +53,9 @@ class ShipmentManager:
     def get_shipment_by_id(self, shipment_id):
         """Get a specific shipment by ID"""
         try:
-            records = self.get_all_shipments()
-            for record in records:
-                if record.get('Shipment ID') == shipment_id:
-                    return record
-            return None
+            return self.sheets.get_record_by_id(self.sheet_name, 'Shipment ID', shipment_id)
+        except StorageQuotaError:
+            raise
         except Exception as e:
             print(f"Error getting shipment by ID: {e}")
             return None
@@ -82,54 +85,122 @@ class ShipmentManager:
             }
             
             return self.sheets.update_row(self.sheet_name, row_number, updated_data)
+        except StorageQuotaError:
+            raise
         except Exception as e:
             print(f"Error updating shipment status: {e}")
             return False
     
-    def receive_shipment(self, shipment_id, items_received, received_by):
-        """Mark shipment as received and update inventory"""
+    def receive_shipment(self, shipment_id, items_received, received_by, progress=None):
+        """Mark a shipment as received and add its lines to inventory
+        
+        Inventory and Shipments are read once, then every changed item row and
+        the shipment status go out in one batched write, built on the stock
+        read back with the row check, and the movements in one append. Returns
+        {'success', 'shipment_id', 'results', 'error'} with one result per line.
+        progress(done, total, message), when given, is called between stages.
+        """
         try:
-            from inventory.models import InventoryManager
-            inventory_manager = InventoryManager(self.sheets)
+            if progress:
+                progress(0, len(items_received), 'Reading inventory')
+            self.sheets.prefetch([Config.INVENTORY_SHEET, self.sheet_name])
+            row_number, shipment = self.sheets.find_record_by_id(self.sheet_name, 'Shipment ID', shipment_id)
+            if not row_number or not shipment:
+                return {'success': False, 'shipment_id': shipment_id, 'results': [], 'error': 'Shipment not found'}
+            if shipment.get('Status') == 'Received':
+                return {'success': False, 'shipment_id': shipment_id, 'results': [], 'error': 'Shipment already received'}
             
-            # Update shipment status
-            success = self.update_shipment_status(shipment_id, 'Received', received_by)
-            if not success:
-                return False
+            lines = []
+            for index, line in enumerate(items_received):
+                line = line if isinstance(line, dict) else {}
+                item_id = str(line.get('item_id') or '').strip()
+                try:
+                    quantity = float(line.get('quantity', 0))
+                except (TypeError, ValueError):
+                    quantity = 0
+                lines.append((index, item_id, quantity))
+            
+            found = self.sheets.find_records_by_ids(
+                Config.INVENTORY_SHEET, 'Item ID', list({item_id for _, item_id, _ in lines if item_id})
+            )
+            
+            # Total received per item, so repeated lines for one item add up
+            received = {}
+            accepted = []
+            results = []
+            for index, item_id, quantity in lines:
+                result = {'index': index, 'item_id': item_id, 'quantity': quantity}
+                if not item_id:
+                    result.update(status='rejected', error='Item ID is required')
+                elif quantity <= 0:
+                    result.update(status='rejected', error='Quantity must be a positive number')
+                elif item_id not in found:
+                    result.update(status='rejected', error='Item not found')
+                else:
+                    received[item_id] = received.get(item_id, 0) + quantity
+                    accepted.append((result, item_id, quantity))
+                results.append(result)
+            
+            if progress:
+                progress(len(results), len(results), 'Writing stock levels')
+            current_time = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+            
+            def receipt_cells(quantity):
+                return lambda current_stock: {'Current Stock': current_stock + quantity, 'Last Updated': current_time}
+            
+            # Stock levels are built on the values read back with the row check
+            current = self.sheets.update_from_current(
+                Config.INVENTORY_SHEET,
+                'Current Stock',
+                {found[item_id][0]: receipt_cells(quantity) for item_id, quantity in received.items()},
+                {self.sheet_name: {
+                    row_number: {'Status': 'Received', 'Received By': received_by or shipment.get('Received By', '')}
+                }}
+            )
+            if current is None:
+                return {'success': False, 'shipment_id': shipment_id, 'results': [], 'error': 'Failed to write received stock'}
             
-            # Update inventory for each item received
-            for item in items_received:
-                item_id = item.get('item_id')
-                quantity = float(item.get('quantity', 0))
-                
-                if item_id and quantity > 0:
-                    inventory_manager.update_stock(
-                        item_id,
-                        quantity,
-                        'Shipment Received',
-                        shipment_id,
-                        f"Received from supplier via shipment {shipment_id}"
-                    )
+            stock = {item_id: current[found[item_id][0]] for item_id in received}
+            movement_rows = []
+            notes = f"Received from supplier via shipment {shipment_id}"
+            for result, item_id, quantity in accepted:
+                previous_stock = stock[item_id]
+                stock[item_id] = previous_stock + quantity
+                result.update(status='received', previous_stock=previous_stock, new_stock=stock[item_id])
+                movement_rows.append(self.sheets.build_movement_row(
+                    item_id, found[item_id][1].get('Name', ''), 'Shipment Received', quantity, stock[item_id], shipment_id, notes
+                ))
+            if movement_rows and not self.sheets.log_stock_movements(movement_rows):
+                print(f"Error logging movements for shipment {shipment_id}")
             
-            return True
+            return {'success': True, 'shipment_id': shipment_id, 'results': results, 'error': None}
+        except StorageQuotaError:
+            raise
         except Exception as e:
             print(f"Error receiving shipment: {e}")
-            return False
+            return {'success': False, 'shipment_id': shipment_id, 'results': [], 'error': str(e)}
     
-    def get_shipments_by_status(self, status):
-        """Get shipments filtered by status"""
+    def find_shipments(self, status=None, supplier=None):
+        """Get shipments matching every given filter, via the Status/Supplier indexes"""
+        filters = {}
+        if status:
+            filters['Status'] = status
+        if supplier:
+            filters['Supplier'] = supplier
         try:
-            shipments = self.get_all_shipments()
-            return [s for s in shipments if s.get('Status') == status]
+            if not filters:
+                return self.get_all_shipments()
+            return self.sheets.find_records(self.sheet_name, filters)
+        except StorageQuotaError:
+            raise
         except Exception as e:
-            print(f"Error getting shipments by status: {e}")
+            print(f"Error finding shipments: {e}")
             return []
     
+    def get_shipments_by_status(self, status):
+        """Get shipments filtered by status"""
+        return self.find_shipments(status=status)
+    
     def get_shipments_by_supplier(self, supplier):
         """Get shipments filtered by supplier"""
-        try:
-            shipments = self.get_all_shipments()
-            return [s for s in shipments if s.get('Supplier') == supplier]
-        except Exception as e:
-            print(f"Error getting shipments by supplier: {e}")
-            return []
\ No newline at end of file
+        return self.find_shipments(supplier=supplier)
\ No newline at end of file
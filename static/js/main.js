@@ -862,6 +862,18 @@ async function loadData(endpoint) {
     }
 }
 
+// Poll a background job until it finishes and return the job record
+async function waitForJob(jobId, intervalMs = 1000) {
+    while (true) {
+        const data = await apiRequest(`/api/jobs/${jobId}`);
+        const job = data.data;
+        if (job.status === 'completed' || job.status === 'failed') {
+            return job;
+        }
+        await new Promise(resolve => setTimeout(resolve, intervalMs));
+    }
+}
+
 async function createData(endpoint, data) {
     try {
         const result = await apiRequest(endpoint, {
@@ -42,15 +42,20 @@ class ReportManager {
     
     async loadReportData() {
         try {
-            const response = await fetch('/api/inventory');
-            const data = await response.json();
+            const [inventoryResponse, analyticsResponse] = await Promise.all([
+                fetch('/api/inventory'),
+                fetch('/api/analytics/inventory')
+            ]);
+            const data = await inventoryResponse.json();
+            const analytics = await analyticsResponse.json();
             
-            if (data.success) {
+            if (data.success && analytics.success) {
                 this.reportData.inventory = data.data;
+                this.reportData.analytics = analytics.data;
                 this.processReportData();
                 return true;
             } else {
-                throw new Error(data.error || 'Failed to load report data');
+                throw new Error(data.error || analytics.error || 'Failed to load report data');
             }
         } catch (error) {
             console.error('Error loading report data:', error);
@@ -67,82 +72,32 @@ class ReportManager {
             return currentStock <= reorderLevel;
         });
         
-        // Process category analysis
+        // Category and supplier group-bys are computed server-side
         this.reportData.categoryAnalysis = this.processCategoryAnalysis();
-        
-        // Process supplier report
         this.reportData.supplierReport = this.processSupplierReport();
     }
     
     processCategoryAnalysis() {
-        const categoryData = {};
-        
-        this.reportData.inventory.forEach(item => {
-            const category = item.Category || 'Uncategorized';
-            const currentStock = parseFloat(item['Current Stock']) || 0;
-            const costPerUnit = parseFloat(item['Cost Per Unit']) || 0;
-            const reorderLevel = parseFloat(item['Reorder Level']) || 0;
-            const totalValue = currentStock * costPerUnit;
-            
-            if (!categoryData[category]) {
-                categoryData[category] = {
-                    category: category,
-                    totalItems: 0,
-                    totalValue: 0,
-                    totalCost: 0,
-                    lowStockItems: 0
-                };
-            }
-            
-            categoryData[category].totalItems++;
-            categoryData[category].totalValue += totalValue;
-            categoryData[category].totalCost += costPerUnit;
-            
-            if (currentStock <= reorderLevel) {
-                categoryData[category].lowStockItems++;
-            }
-        });
+        const categories = this.reportData.analytics?.categories || [];
         
-        return Object.values(categoryData).map(cat => ({
+        return categories.map(cat => ({
             Category: cat.category,
-            'Total Items': cat.totalItems,
-            'Total Value': cat.totalValue,
-            'Average Cost': cat.totalItems > 0 ? (cat.totalCost / cat.totalItems) : 0,
-            'Low Stock Items': cat.lowStockItems
+            'Total Items': cat.items,
+            'Total Value': cat.value,
+            'Average Cost': cat.average_cost,
+            'Low Stock Items': cat.low_stock_items
         }));
     }
     
     processSupplierReport() {
-        const supplierData = {};
-        
-        this.reportData.inventory.forEach(item => {
-            const supplier = item.Supplier || 'Unknown';
-            const currentStock = parseFloat(item['Current Stock']) || 0;
-            const costPerUnit = parseFloat(item['Cost Per Unit']) || 0;
-            const totalValue = currentStock * costPerUnit;
-            const category = item.Category || 'Uncategorized';
-            
-            if (!supplierData[supplier]) {
-                supplierData[supplier] = {
-                    supplier: supplier,
-                    totalItems: 0,
-                    totalValue: 0,
-                    categories: new Set(),
-                    lastOrderDate: 'N/A'
-                };
-            }
-            
-            supplierData[supplier].totalItems++;
-            supplierData[supplier].totalValue += totalValue;
-            supplierData[supplier].categories.add(category);
-        });
+        const suppliers = this.reportData.analytics?.suppliers || [];
         
-        return Object.values(supplierData).map(sup => ({
+        return suppliers.map(sup => ({
             Supplier: sup.supplier,
-            'Total Items': sup.totalItems,
-            'Total Value': sup.totalValue,
-            Categories: Array.from(sup.categories).join(', '),
-            'Last Order Date': sup.lastOrderDate
+            'Total Items': sup.items,
+            'Total Value': sup.value,
+            Categories: sup.categories.join(', '),
+            'Last Order Date': 'N/A'
         }));
     }
     
@@ -654,19 +609,26 @@ async function generateInventoryReport() {
     showReportLoading('Inventory Report');
     
     try {
-        const inventory = await loadData('/api/inventory');
+        const [inventory, analytics] = await Promise.all([
+            loadData('/api/inventory'),
+            loadData('/api/analytics/inventory')
+        ]);
+        if (Array.isArray(analytics)) {
+            throw new Error('Inventory analytics unavailable');
+        }
         currentReportData = inventory;
         currentReportType = 'inventory';
         
         // Update report manager data
         if (reportManager) {
             reportManager.reportData.inventory = inventory;
+            reportManager.reportData.analytics = analytics;
             reportManager.currentReportData = inventory;
             reportManager.currentReportType = 'inventory';
             reportManager.processReportData();
         }
         
-        displayInventoryReport(inventory);
+        displayInventoryReport(inventory, analytics);
         showReportActions();
     } catch (error) {
         showReportError('Failed to generate inventory report');
@@ -719,8 +681,48 @@ async function generateMovementReport() {
     showReportLoading('Stock Movement Report');
     
     try {
-        notifications.show('Stock movement report feature coming soon!', 'info', 3000);
-        hideReportActions();
+        const params = new URLSearchParams({
+            granularity: document.getElementById('movementGranularity').value
+        });
+        const from = document.getElementById('movementFrom').value;
+        const to = document.getElementById('movementTo').value;
+        if (from) params.set('from', from);
+        if (to) params.set('to', to);
+        
+        const report = await loadData(`/api/reports/movements?${params}`);
+        if (Array.isArray(report)) {
+            throw new Error('Movement report unavailable');
+        }
+        
+        // One row per period and action type for export
+        const rows = [];
+        report.periods.forEach(period => {
+            Object.entries(period.actions).forEach(([action, totals]) => {
+                rows.push({
+                    'Period': period.period,
+                    'Action Type': action,
+                    'Movements': totals.movements,
+                    'Quantity In': totals.quantity_in,
+                    'Quantity Out': totals.quantity_out,
+                    'Net Change': totals.net
+                });
+            });
+        });
+        currentReportData = rows;
+        currentReportType = 'movements';
+        
+        // Update report manager data
+        if (reportManager) {
+            reportManager.currentReportData = rows;
+            reportManager.currentReportType = 'movements';
+        }
+        
+        displayMovementReport(report);
+        if (rows.length > 0) {
+            showReportActions();
+        } else {
+            hideReportActions();
+        }
     } catch (error) {
         showReportError('Failed to generate movement report');
     }
@@ -756,20 +758,17 @@ function hideReportActions() {
     document.getElementById('reportActions').style.display = 'none';
 }
 
-function displayInventoryReport(inventory) {
+function displayInventoryReport(inventory, analytics) {
     if (inventory.length === 0) {
         document.getElementById('reportContent').innerHTML = 
             '<div class="alert alert-info">No inventory items found</div>';
         return;
     }
     
-    const totalItems = inventory.length;
-    const totalValue = inventory.reduce((sum, item) => 
-        sum + (parseFloat(item['Current Stock']) * parseFloat(item['Cost Per Unit'])), 0);
-    const lowStockCount = inventory.filter(item => 
-        parseFloat(item['Current Stock']) <= parseFloat(item['Reorder Level'])).length;
-    
-    const categories = [...new Set(inventory.map(item => item.Category).filter(cat => cat))];
+    const totalItems = analytics.item_count;
+    const totalValue = analytics.total_value;
+    const lowStockCount = analytics.low_stock_items;
+    const categories = analytics.categories;
     
     let html = `
         <div class="row mb-4">
@@ -1000,6 +999,116 @@ function displayShipmentReport(shipments) {
     document.getElementById('reportContent').innerHTML = html;
 }
 
+function displayMovementReport(report) {
+    if (report.periods.length === 0) {
+        document.getElementById('reportContent').innerHTML = 
+            '<div class="alert alert-info">No stock movements found for this period</div>';
+        return;
+    }
+    
+    const periodLabel = report.granularity === 'week' ? 'Week Of' : 'Date';
+    const actions = Object.keys(report.actions);
+    
+    let html = `
+        <div class="row mb-4">
+            <div class="col-md-3">
+                <div class="card bg-primary text-white">
+                    <div class="card-body text-center">
+                        <h3>${report.totals.movements}</h3>
+                        <p class="mb-0">Movements</p>
+                    </div>
+                </div>
+            </div>
+            <div class="col-md-3">
+                <div class="card bg-success text-white">
+                    <div class="card-body text-center">
+                        <h3>${report.totals.quantity_in}</h3>
+                        <p class="mb-0">Units In</p>
+                    </div>
+                </div>
+            </div>
+            <div class="col-md-3">
+                <div class="card bg-warning text-white">
+                    <div class="card-body text-center">
+                        <h3>${report.totals.quantity_out}</h3>
+                        <p class="mb-0">Units Out</p>
+                    </div>
+                </div>
+            </div>
+            <div class="col-md-3">
+                <div class="card bg-info text-white">
+                    <div class="card-body text-center">
+                        <h3>${report.item_count}</h3>
+                        <p class="mb-0">Items Moved</p>
+                    </div>
+                </div>
+            </div>
+        </div>
+        
+        <div class="table-responsive mb-4">
+            <table class="table table-striped">
+                <thead>
+                    <tr>
+                        <th>${periodLabel}</th>
+                        <th>Movements</th>
+                        <th>In</th>
+                        <th>Out</th>
+                        <th>Net</th>
+                        ${actions.map(action => `<th>${action}</th>`).join('')}
+                    </tr>
+                </thead>
+                <tbody>
+    `;
+    
+    report.periods.forEach(period => {
+        html += `
+            <tr>
+                <td>${period.period}</td>
+                <td>${period.movements}</td>
+                <td class="text-success">${period.quantity_in}</td>
+                <td class="text-danger">${period.quantity_out}</td>
+                <td><strong>${period.net}</strong></td>
+                ${actions.map(action => `<td>${period.actions[action] ? period.actions[action].movements : '-'}</td>`).join('')}
+            </tr>
+        `;
+    });
+    
+    html += `
+                </tbody>
+            </table>
+        </div>
+        
+        <h6>Most Active Items</h6>
+        <div class="table-responsive">
+            <table class="table table-sm">
+                <thead>
+                    <tr>
+                        <th>Item</th>
+                        <th>Movements</th>
+                        <th>In</th>
+                        <th>Out</th>
+                        <th>Net</th>
+                    </tr>
+                </thead>
+                <tbody>
+    `;
+    
+    report.items.forEach(item => {
+        html += `
+            <tr>
+                <td><strong>${item.item_name || item.item_id}</strong><br><small class="text-muted">${item.item_id}</small></td>
+                <td>${item.movements}</td>
+                <td class="text-success">${item.quantity_in}</td>
+                <td class="text-danger">${item.quantity_out}</td>
+                <td>${item.net}</td>
+            </tr>
+        `;
+    });
+    
+    html += '</tbody></table></div>';
+    document.getElementById('reportContent').innerHTML = html;
+}
+
 function getShipmentStatusClass(status) {
     const statusClasses = {
         'Pending': 'bg-warning text-dark',
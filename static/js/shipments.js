@@ -1,5 +1,8 @@
 // Shipment Management JavaScript
 
+// Deliveries with at least this many lines are received as a background job
+const ASYNC_RECEIVE_LINES = 25;
+
 document.addEventListener('DOMContentLoaded', function() {
     loadShipments();
     setDefaultDate();
@@ -195,7 +198,9 @@ async function receiveShipment() {
     }
     
     try {
-        const response = await apiRequest(`/api/shipments/${shipmentId}/receive`, {
+        // Large deliveries run as a background job so the request returns at once
+        const runAsJob = itemsReceived.length >= ASYNC_RECEIVE_LINES;
+        let response = await apiRequest(`/api/shipments/${shipmentId}/receive${runAsJob ? '?async=1' : ''}`, {
             method: 'POST',
             body: JSON.stringify({
                 received_by: receivedBy,
@@ -203,8 +208,28 @@ async function receiveShipment() {
             })
         });
         
+        if (runAsJob && response.success) {
+            showAlert('Receiving shipment in the background...', 'info');
+            const job = await waitForJob(response.job_id);
+            const result = job.result || {success: false, error: job.error};
+            const results = result.results || [];
+            response = {
+                success: job.status === 'completed',
+                error: job.error,
+                results: results,
+                rejected_lines: results.filter(line => line.status === 'rejected').length
+            };
+        }
+        
         if (response.success) {
-            showAlert('Shipment received successfully!', 'success');
+            if (response.rejected_lines > 0) {
+                const rejected = response.results
+                    .filter(line => line.status === 'rejected')
+                    .map(line => `${line.item_id || 'line ' + (line.index + 1)}: ${line.error}`);
+                showAlert(`Shipment received with ${response.rejected_lines} rejected line(s): ${rejected.join('; ')}`, 'warning');
+            } else {
+                showAlert('Shipment received successfully!', 'success');
+            }
             hideModal('receiveShipmentModal');
             resetForm('receiveShipmentForm');
             loadShipments();
@@ -116,6 +116,7 @@ async function addTransfer() {
         await createData('/api/transfers', transferData);
         hideModal('addTransferModal');
         resetForm('addTransferForm');
+        resetLocationChoices();
         setDefaultTransferDate();
         loadTransfers();
     } catch (error) {
@@ -145,6 +146,38 @@ async function completeTransfer(transferId) {
     );
 }
 
+async function completePendingTransfers() {
+    const pending = currentTransfers.filter(t => t.Status === 'Pending').map(t => t['Transfer ID']);
+    if (pending.length === 0) {
+        showAlert('No pending transfers to complete', 'info');
+        return;
+    }
+    
+    confirmAction(
+        `Complete all ${pending.length} pending transfers?`,
+        async () => {
+            try {
+                const response = await apiRequest('/api/transfers/complete', {
+                    method: 'POST',
+                    body: JSON.stringify({transfer_ids: pending})
+                });
+                
+                if (response.rejected > 0) {
+                    const rejected = response.results
+                        .filter(line => line.status === 'rejected')
+                        .map(line => `${line.transfer_id}: ${line.error}`);
+                    showAlert(`Completed ${response.completed} transfers; ${response.rejected} rejected: ${rejected.join('; ')}`, 'warning');
+                } else {
+                    showAlert(`Completed ${response.completed} transfers`, 'success');
+                }
+                loadTransfers();
+            } catch (error) {
+                showAlert(`Error completing transfers: ${error.message}`, 'danger');
+            }
+        }
+    );
+}
+
 async function cancelTransfer(transferId) {
     confirmAction(
         'Are you sure you want to cancel this transfer?',
@@ -211,6 +244,24 @@ function exportTransfers() {
     exportToCSV(currentTransfers, filename);
 }
 
+// Transfers can only leave locations that hold the item
+async function loadItemLocations(itemId) {
+    const data = await loadData(`/api/inventory/${encodeURIComponent(itemId)}/locations`);
+    const locations = data.locations || [];
+    const options = locations
+        .filter(entry => entry.location === data.default_location || entry.quantity > 0)
+        .map(entry => `<option value="${entry.location}">${entry.location} (${formatNumber(entry.quantity)} available)</option>`);
+    document.getElementById('fromLocation').innerHTML = options.join('') || '<option value="">No stock available</option>';
+    document.getElementById('knownLocations').innerHTML = locations
+        .map(entry => `<option value="${entry.location}"></option>`)
+        .join('');
+}
+
+function resetLocationChoices() {
+    document.getElementById('fromLocation').innerHTML = '<option value="">Enter an Item ID first</option>';
+    document.getElementById('knownLocations').innerHTML = '';
+}
+
 // Add item lookup functionality
 document.getElementById('transferItemId')?.addEventListener('blur', async function() {
     const itemId = this.value.trim();
@@ -223,9 +274,11 @@ document.getElementById('transferItemId')?.addEventListener('blur', async functi
         if (item) {
             document.getElementById('transferItemName').value = item.Name;
             showAlert(`Item found: ${item.Name}`, 'success', 2000);
+            loadItemLocations(itemId);
         } else {
             showAlert('Item ID not found in inventory', 'warning');
             document.getElementById('transferItemName').value = '';
+            resetLocationChoices();
         }
     } catch (error) {
         console.error('Error looking up item:', error);
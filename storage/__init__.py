@@ -0,0 +1 @@
+# Storage package initialization
\ No newline at end of file
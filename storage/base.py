@@ -0,0 +1,357 @@
+from gspread.utils import numericise
+from contextlib import nullcontext
+import threading
+from datetime import datetime
+from config.settings import Config
+
+# Headers of every sheet (or table) the application uses
+SHEET_SCHEMAS = {
+    Config.INVENTORY_SHEET: [
+        'Item ID', 'Name', 'Category', 'Current Stock', 'Unit', 
+        'Cost Per Unit', 'Reorder Level', 'Supplier', 'Last Updated'
+    ],
+    Config.SHIPMENTS_SHEET: [
+        'Shipment ID', 'Date', 'Supplier', 'Status', 'Total Items', 
+        'Total Cost', 'Received By', 'Notes'
+    ],
+    Config.TRANSFERS_SHEET: [
+        'Transfer ID', 'Date', 'From Location', 'To Location', 
+        'Item ID', 'Item Name', 'Quantity', 'Status', 'Notes'
+    ],
+    Config.STOCK_MOVEMENTS_SHEET: [
+        'Timestamp', 'Item ID', 'Item Name', 'Action Type', 
+        'Quantity Change', 'New Stock Level', 'Reference ID', 'Notes'
+    ],
+    Config.SUPPLIERS_SHEET: [
+        'Supplier ID', 'Name', 'Contact Person', 'Phone', 
+        'Email', 'Address', 'Payment Terms', 'Active'
+    ],
+    Config.USERS_SHEET: [
+        'Username', 'Password', 'Role', 'Active', 'Last Login', 'Created Date'
+    ],
+    Config.STOCK_LOCATIONS_SHEET: [
+        'Item ID', 'Locations', 'Last Updated'
+    ],
+    Config.MOVEMENT_PARTITIONS_SHEET: [
+        'Partition', 'Month', 'First Timestamp', 'Last Timestamp', 'Rows', 'Archived At'
+    ]
+}
+
+# Primary key column of each sheet, used for ID indexes
+ID_COLUMNS = {
+    Config.INVENTORY_SHEET: 'Item ID',
+    Config.SHIPMENTS_SHEET: 'Shipment ID',
+    Config.TRANSFERS_SHEET: 'Transfer ID',
+    Config.SUPPLIERS_SHEET: 'Supplier ID',
+    Config.USERS_SHEET: 'Username',
+    Config.STOCK_LOCATIONS_SHEET: 'Item ID',
+    Config.MOVEMENT_PARTITIONS_SHEET: 'Partition'
+}
+
+# Non-ID columns filtered on by equality, hash-indexed in the table cache and SQLite
+SECONDARY_INDEXES = {
+    Config.SHIPMENTS_SHEET: ['Status', 'Supplier'],
+    Config.TRANSFERS_SHEET: ['Status', 'From Location', 'To Location'],
+    Config.STOCK_MOVEMENTS_SHEET: ['Item ID']
+}
+
+def movement_partition_name(month):
+    """Sheet holding the archived movements of one month ('YYYY-MM')"""
+    return f"{Config.STOCK_MOVEMENTS_SHEET}_{month.replace('-', '_')}"
+
+def movements_in_range(records, start=None, end=None):
+    """Movements whose Timestamp falls on a date within [start, end]; None leaves a side open"""
+    low = start.isoformat() if start else None
+    high = end.isoformat() if end else None
+    return [
+        record for record in records
+        if (low is None or str(record.get('Timestamp', ''))[:10] >= low)
+        and (high is None or str(record.get('Timestamp', ''))[:10] <= high)
+    ]
+
+def partitions_in_range(partitions, start=None, end=None):
+    """Partitions holding movements dated within [start, end]"""
+    low = start.isoformat() if start else None
+    high = end.isoformat() if end else None
+    return [
+        partition for partition in partitions
+        if partition['rows']
+        and (low is None or partition['last_timestamp'][:10] >= low)
+        and (high is None or partition['first_timestamp'][:10] <= high)
+    ]
+
+def normalize_cell(value):
+    """Mirror how a written value reads back through get_all_records"""
+    if isinstance(value, bool):
+        return str(value).upper()
+    if isinstance(value, float) and value.is_integer():
+        return int(value)
+    if isinstance(value, str):
+        return numericise(value)
+    return value
+
+def to_float(value):
+    """Read a numeric cell, treating blanks and text as zero"""
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return 0.0
+
+def build_record(headers, data):
+    """Build a record dict from a written row the way get_all_records would return it"""
+    if isinstance(data, dict):
+        values = [data.get(header, '') for header in headers]
+    else:
+        values = list(data)[:len(headers)]
+        values += [''] * (len(headers) - len(values))
+    return dict(zip(headers, [normalize_cell(value) for value in values]))
+
+class TableView:
+    """Derived data kept in step with the records of one sheet
+    
+    Backends call reset() with a full snapshot, upsert() and remove() for
+    single-row writes, and invalidate() when they can no longer tell what
+    changed. A stale view is rebuilt from the next snapshot.
+    """
+    def __init__(self):
+        self.stale = True
+    
+    def reset(self, records):
+        """Rebuild from a full list of records"""
+        raise NotImplementedError
+    
+    def upsert(self, record):
+        """Apply an added or updated record"""
+        raise NotImplementedError
+    
+    def remove(self, record):
+        """Apply a deleted record"""
+        raise NotImplementedError
+    
+    def invalidate(self):
+        """Mark the view for a rebuild"""
+        self.stale = True
+
+class StorageQuotaError(Exception):
+    """Raised when the backend is still throttled after every retry"""
+    pass
+
+class StorageBackend:
+    """Interface the managers use to read and write sheet-shaped tables
+    
+    Rows are addressed by the row number returned from find_row_by_id; callers
+    should treat it as an opaque handle for update_row and delete_row.
+    """
+    def __init__(self):
+        self._views = {}
+        self._views_lock = threading.Lock()
+    
+    def append_row(self, sheet_name, data):
+        """Append a row to a specific sheet"""
+        raise NotImplementedError
+    
+    def append_rows(self, sheet_name, rows):
+        """Append several rows to a specific sheet"""
+        raise NotImplementedError
+    
+    def append_rows_counted(self, sheet_name, rows):
+        """Append rows and return how many were written
+        
+        Backends that write in several requests can fail part way; the
+        rows before the returned count are stored and the rest are not.
+        """
+        return len(rows) if self.append_rows(sheet_name, rows) else 0
+    
+    def get_all_records(self, sheet_name):
+        """Get all records from a sheet as list of dictionaries"""
+        raise NotImplementedError
+    
+    def batch_get_records(self, sheet_names):
+        """Get all records from several sheets, returned as {sheet_name: records}"""
+        return {sheet_name: self.get_all_records(sheet_name) for sheet_name in sheet_names}
+    
+    def update_row(self, sheet_name, row_number, data):
+        """Update a specific row in a sheet"""
+        return self.update_rows(sheet_name, {row_number: data})
+    
+    def update_rows(self, sheet_name, rows):
+        """Update several rows, given as {row_number: data}"""
+        raise NotImplementedError
+    
+    def update_cells(self, sheet_name, row_number, values):
+        """Update only the given cells of a row, given as {header: value}"""
+        return self.batch_update_cells(sheet_name, {row_number: values})
+    
+    def batch_update_cells(self, sheet_name, rows):
+        """Update only the given cells of several rows, given as {row_number: {header: value}}"""
+        raise NotImplementedError
+    
+    def batch_update_sheets(self, updates):
+        """Update cells across sheets, given as {sheet_name: {row_number: {header: value}}}"""
+        for sheet_name, rows in updates.items():
+            if not self.batch_update_cells(sheet_name, rows):
+                return False
+        return True
+    
+    def update_from_current(self, sheet_name, column, changes, updates=None):
+        """Write cells computed from the current value of one column
+        
+        changes maps row numbers to functions taking the row's current value
+        of column and returning {header: value} cells to write; updates holds
+        other cells, as for batch_update_sheets, written together with them.
+        Returns {row_number: value the change was computed from}, or None.
+        """
+        raise NotImplementedError
+    
+    def delete_row(self, sheet_name, row_number):
+        """Delete a specific row from a sheet"""
+        raise NotImplementedError
+    
+    def delete_rows(self, sheet_name, start_row, end_row):
+        """Delete rows start_row to end_row (inclusive)"""
+        for row_number in range(end_row, start_row - 1, -1):
+            if not self.delete_row(sheet_name, row_number):
+                return False
+        return True
+    
+    def find_row_by_id(self, sheet_name, id_column, id_value):
+        """Find a row by ID and return row number"""
+        raise NotImplementedError
+    
+    def get_record_by_id(self, sheet_name, id_column, id_value):
+        """Find a row by ID and return its record"""
+        raise NotImplementedError
+    
+    def prefetch(self, sheet_names):
+        """Load several sheets ahead of a batch of lookups, where the backend caches them"""
+        return True
+    
+    def find_record_by_id(self, sheet_name, id_column, id_value):
+        """Find a row by ID and return (row number, record)"""
+        row_number = self.find_row_by_id(sheet_name, id_column, id_value)
+        if not row_number:
+            return None, None
+        return row_number, self.get_record_by_id(sheet_name, id_column, id_value)
+    
+    def find_records(self, sheet_name, filters):
+        """Records whose columns equal every value in filters ({header: value}), in sheet order"""
+        wanted = {header: str(value) for header, value in filters.items()}
+        return [
+            record for record in self.get_all_records(sheet_name)
+            if all(str(record.get(header, '')) == value for header, value in wanted.items())
+        ]
+    
+    def find_records_by_ids(self, sheet_name, id_column, id_values):
+        """Find several rows by ID, returned as {id: (row number, record)}"""
+        found = {}
+        for id_value in id_values:
+            row_number, record = self.find_record_by_id(sheet_name, id_column, id_value)
+            if row_number:
+                found[str(id_value)] = (row_number, record)
+        return found
+    
+    def log_stock_movement(self, item_id, item_name, action_type, quantity_change, new_stock_level, reference_id="", notes=""):
+        """Log a stock movement to the stock movements sheet"""
+        try:
+            return self.append_row(Config.STOCK_MOVEMENTS_SHEET, self.build_movement_row(
+                item_id, item_name, action_type, quantity_change, new_stock_level, reference_id, notes
+            ))
+        except Exception as e:
+            print(f"Error logging stock movement: {e}")
+            return False
+    
+    def log_stock_movements(self, rows):
+        """Log many movements, given as rows from build_movement_row, in one write"""
+        try:
+            return self.append_rows(Config.STOCK_MOVEMENTS_SHEET, rows)
+        except Exception as e:
+            print(f"Error logging stock movements: {e}")
+            return False
+    
+    def build_movement_row(self, item_id, item_name, action_type, quantity_change, new_stock_level, reference_id="", notes=""):
+        """Build a Stock_Movements row stamped with the current time"""
+        timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+        return [timestamp, item_id, item_name, action_type, quantity_change, new_stock_level, reference_id, notes]
+    
+    def flush_movements(self):
+        """Write any queued stock movements"""
+        return True
+    
+    def get_movements(self, start=None, end=None):
+        """Stock movements dated within [start, end] (dates, or None for open ends), in log order"""
+        return movements_in_range(self.get_all_records(Config.STOCK_MOVEMENTS_SHEET), start, end)
+    
+    def movement_partitions(self):
+        """Archived monthly partitions of Stock_Movements, oldest first
+        
+        Each is {'partition', 'month', 'first_timestamp', 'last_timestamp',
+        'rows'}; backends that keep one table have none.
+        """
+        return []
+    
+    def get_partition_records(self, partitions):
+        """Records of archived partitions as {partition: records}, cut to their committed rows"""
+        if not partitions:
+            return {}
+        records = self.batch_get_records([partition['partition'] for partition in partitions])
+        return {
+            partition['partition']: records.get(partition['partition'], [])[:partition['rows']]
+            for partition in partitions
+        }
+    
+    def archive_movements(self):
+        """Move closed months out of Stock_Movements, where the backend partitions it"""
+        return {'success': True, 'archived_rows': 0, 'partitions': []}
+    
+    def movement_archive_due(self):
+        """Whether closed months are waiting to be archived"""
+        return False
+    
+    def get_view(self, sheet_name, name, factory):
+        """Return the shared view called name over a sheet, created with factory on first use"""
+        with self._views_lock:
+            views = self._views.setdefault(sheet_name, {})
+            view = views.get(name)
+            if view is None:
+                view = views[name] = factory()
+        self.refresh_views(sheet_name)
+        return view
+    
+    def refresh_views(self, sheet_name):
+        """Rebuild any stale views of a sheet from one snapshot"""
+        views = list(self._views.get(sheet_name, {}).values())
+        if any(view.stale for view in views):
+            records = self.get_all_records(sheet_name)
+            for view in views:
+                if view.stale:
+                    view.reset(records)
+    
+    def _has_views(self, sheet_name):
+        return bool(self._views.get(sheet_name))
+    
+    def _notify_views(self, sheet_name, event, *args):
+        """Pass a change on to every view of a sheet"""
+        for view in list(self._views.get(sheet_name, {}).values()):
+            try:
+                getattr(view, event)(*args)
+            except Exception as e:
+                print(f"Error updating view of {sheet_name}: {e}")
+                view.invalidate()
+    
+    def cache_stats(self):
+        """Get hit/miss counters for the backend's read cache"""
+        return {'enabled': False}
+    
+    def scheduler_stats(self):
+        """Get queue wait times and retry counters for backend calls"""
+        return {'enabled': False}
+    
+    def background(self):
+        """Context manager marking the enclosed calls as background work"""
+        return nullcontext()
+    
+    def begin_request(self):
+        """Called before the app serves a request"""
+    
+    def end_request(self):
+        """Called after the app has served a request"""
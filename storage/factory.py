@@ -0,0 +1,19 @@
+from config.settings import Config
+
+def create_storage_backend(backend=None):
+    """Create the storage backend selected by Config.STORAGE_BACKEND"""
+    backend = (backend or Config.STORAGE_BACKEND).lower()
+    
+    if backend == 'sheets':
+        from sheets_api.google_sheets import SheetsManager
+        return SheetsManager()
+    if backend == 'fake':
+        # In-memory stand-in for Google Sheets, for demos and benchmarks
+        from sheets_api.fake_sheets import FakeClient
+        from sheets_api.google_sheets import SheetsManager
+        return SheetsManager(client=FakeClient(latency_ms=Config.FAKE_SHEETS_LATENCY_MS), spreadsheet_id='fake-spreadsheet')
+    if backend == 'sqlite':
+        from storage.sqlite_backend import SQLiteManager
+        return SQLiteManager()
+    
+    raise ValueError(f"Unknown storage backend: {backend}")
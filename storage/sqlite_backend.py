@@ -0,0 +1,344 @@
+import os
+import sqlite3
+import threading
+from datetime import timedelta
+from config.settings import Config
+from storage.base import ID_COLUMNS, SECONDARY_INDEXES, SHEET_SCHEMAS, StorageBackend, normalize_cell, to_float
+
+# Range-scanned columns indexed on top of the ID and equality-filter columns
+RANGE_INDEXES = {
+    Config.STOCK_MOVEMENTS_SHEET: ['Timestamp']
+}
+
+def _quote(identifier):
+    """Quote a sheet or header name for use as an SQL identifier"""
+    return '"' + identifier.replace('"', '""') + '"'
+
+class SQLiteManager(StorageBackend):
+    """Local storage backend keeping each sheet as an indexed SQLite table
+    
+    The hidden _row column plays the part of the sheet row number.
+    """
+    def __init__(self, database_path=None):
+        super().__init__()
+        self.database_path = database_path or Config.SQLITE_DATABASE_PATH
+        self._lock = threading.RLock()
+        self.connection = None
+        self._initialize_connection()
+    
+    def _initialize_connection(self):
+        """Open the database and create any missing tables"""
+        try:
+            directory = os.path.dirname(self.database_path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            self.connection = sqlite3.connect(self.database_path, check_same_thread=False)
+            self.connection.execute('PRAGMA journal_mode=WAL')
+            self.connection.execute('PRAGMA synchronous=NORMAL')
+            self._ensure_tables_exist()
+        except Exception as e:
+            print(f"Error initializing SQLite storage: {e}")
+    
+    def _ensure_tables_exist(self):
+        """Ensure all required tables exist with their indexes"""
+        with self._lock, self.connection:
+            for sheet_name, headers in SHEET_SCHEMAS.items():
+                columns = ', '.join(_quote(header) for header in headers)
+                self.connection.execute(
+                    f"CREATE TABLE IF NOT EXISTS {_quote(sheet_name)} "
+                    f"(_row INTEGER PRIMARY KEY AUTOINCREMENT, {columns})"
+                )
+                indexed = (
+                    ([ID_COLUMNS[sheet_name]] if sheet_name in ID_COLUMNS else [])
+                    + SECONDARY_INDEXES.get(sheet_name, []) + RANGE_INDEXES.get(sheet_name, [])
+                )
+                for column in indexed:
+                    index_name = _quote(f"idx_{sheet_name}_{column}".replace(' ', '_'))
+                    self.connection.execute(
+                        f"CREATE INDEX IF NOT EXISTS {index_name} ON {_quote(sheet_name)} ({_quote(column)})"
+                    )
+    
+    def _row_values(self, sheet_name, data):
+        """Convert a dict or list row into values ordered like the table headers"""
+        headers = SHEET_SCHEMAS[sheet_name]
+        if isinstance(data, dict):
+            values = [data.get(header, '') for header in headers]
+        else:
+            values = list(data)[:len(headers)]
+            values += [''] * (len(headers) - len(values))
+        return [normalize_cell(value) for value in values]
+    
+    def append_row(self, sheet_name, data):
+        """Append a row to a specific table"""
+        return self.append_rows(sheet_name, [data])
+    
+    def append_rows(self, sheet_name, rows):
+        """Append several rows to a specific table in one transaction"""
+        try:
+            if not rows:
+                return True
+            headers = SHEET_SCHEMAS[sheet_name]
+            columns = ', '.join(_quote(header) for header in headers)
+            placeholders = ', '.join('?' for _ in headers)
+            values = [self._row_values(sheet_name, data) for data in rows]
+            with self._lock, self.connection:
+                self.connection.executemany(
+                    f"INSERT INTO {_quote(sheet_name)} ({columns}) VALUES ({placeholders})", values
+                )
+            for row in values:
+                self._notify_views(sheet_name, 'upsert', dict(zip(headers, row)))
+            return True
+        except Exception as e:
+            print(f"Error appending rows to {sheet_name}: {e}")
+            return False
+    
+    def get_all_records(self, sheet_name):
+        """Get all records from a table as list of dictionaries"""
+        try:
+            headers = SHEET_SCHEMAS[sheet_name]
+            columns = ', '.join(_quote(header) for header in headers)
+            with self._lock:
+                rows = self.connection.execute(
+                    f"SELECT {columns} FROM {_quote(sheet_name)} ORDER BY _row"
+                ).fetchall()
+            return [dict(zip(headers, row)) for row in rows]
+        except Exception as e:
+            print(f"Error getting records from {sheet_name}: {e}")
+            return []
+    
+    def update_rows(self, sheet_name, rows):
+        """Update several rows in one transaction"""
+        try:
+            if not rows:
+                return True
+            headers = SHEET_SCHEMAS[sheet_name]
+            assignments = ', '.join(f"{_quote(header)} = ?" for header in headers)
+            values = [self._row_values(sheet_name, data) for data in rows.values()]
+            with self._lock, self.connection:
+                self.connection.executemany(
+                    f"UPDATE {_quote(sheet_name)} SET {assignments} WHERE _row = ?",
+                    [row + [row_number] for row, row_number in zip(values, rows)]
+                )
+            for row in values:
+                self._notify_views(sheet_name, 'upsert', dict(zip(headers, row)))
+            return True
+        except Exception as e:
+            print(f"Error updating rows in {sheet_name}: {e}")
+            return False
+    
+    def batch_update_cells(self, sheet_name, rows):
+        """Update only the given columns of several rows in one transaction"""
+        try:
+            rows = {row_number: values for row_number, values in rows.items() if values}
+            if not rows:
+                return True
+            headers = SHEET_SCHEMAS[sheet_name]
+            # Rows changing the same set of columns share one statement
+            statements = {}
+            for row_number, values in rows.items():
+                unknown = [header for header in values if header not in headers]
+                if unknown:
+                    print(f"Unknown column {unknown[0]} in {sheet_name}")
+                    return False
+                statements.setdefault(tuple(values), []).append(
+                    [normalize_cell(value) for value in values.values()] + [row_number]
+                )
+            
+            updated = 0
+            with self._lock, self.connection:
+                for columns, parameters in statements.items():
+                    assignments = ', '.join(f"{_quote(header)} = ?" for header in columns)
+                    cursor = self.connection.executemany(
+                        f"UPDATE {_quote(sheet_name)} SET {assignments} WHERE _row = ?", parameters
+                    )
+                    updated += cursor.rowcount
+            if self._has_views(sheet_name):
+                for record in self._records_by_row(sheet_name, list(rows)).values():
+                    self._notify_views(sheet_name, 'upsert', record)
+            return updated == len(rows)
+        except Exception as e:
+            print(f"Error updating cells in {sheet_name}: {e}")
+            return False
+    
+    def update_from_current(self, sheet_name, column, changes, updates=None):
+        """Read the current values and write the derived cells in one transaction"""
+        try:
+            writes = {}
+            for name, rows in (updates or {}).items():
+                for row_number, values in rows.items():
+                    if values:
+                        writes.setdefault(name, {}).setdefault(row_number, {}).update(values)
+            current = {}
+            with self._lock, self.connection:
+                for row_number, change in changes.items():
+                    row = self.connection.execute(
+                        f"SELECT {_quote(column)} FROM {_quote(sheet_name)} WHERE _row = ?", (row_number,)
+                    ).fetchone()
+                    if row is None:
+                        raise LookupError(f"Row {row_number} of {sheet_name} no longer exists")
+                    current[row_number] = to_float(row[0])
+                    values = change(current[row_number])
+                    if values:
+                        writes.setdefault(sheet_name, {}).setdefault(row_number, {}).update(values)
+                for name, rows in writes.items():
+                    headers = SHEET_SCHEMAS[name]
+                    for row_number, values in rows.items():
+                        unknown = [header for header in values if header not in headers]
+                        if unknown:
+                            raise KeyError(f"Unknown column {unknown[0]} in {name}")
+                        assignments = ', '.join(f"{_quote(header)} = ?" for header in values)
+                        cursor = self.connection.execute(
+                            f"UPDATE {_quote(name)} SET {assignments} WHERE _row = ?",
+                            [normalize_cell(value) for value in values.values()] + [row_number]
+                        )
+                        if cursor.rowcount != 1:
+                            raise LookupError(f"Row {row_number} of {name} no longer exists")
+            for name, rows in writes.items():
+                if self._has_views(name):
+                    for record in self._records_by_row(name, list(rows)).values():
+                        self._notify_views(name, 'upsert', record)
+            return current
+        except Exception as e:
+            print(f"Error updating cells in {sheet_name}: {e}")
+            return None
+    
+    def delete_row(self, sheet_name, row_number):
+        """Delete a specific row from a table"""
+        try:
+            record = None
+            if self._has_views(sheet_name):
+                record = self._records_by_row(sheet_name, [row_number]).get(row_number)
+            with self._lock, self.connection:
+                cursor = self.connection.execute(
+                    f"DELETE FROM {_quote(sheet_name)} WHERE _row = ?", (row_number,)
+                )
+            if record is not None and cursor.rowcount > 0:
+                self._notify_views(sheet_name, 'remove', record)
+            return cursor.rowcount > 0
+        except Exception as e:
+            print(f"Error deleting row from {sheet_name}: {e}")
+            return False
+    
+    def _records_by_row(self, sheet_name, row_numbers):
+        """Records for the given row numbers, as {row_number: record}"""
+        headers = SHEET_SCHEMAS[sheet_name]
+        columns = ', '.join(_quote(header) for header in headers)
+        records = {}
+        with self._lock:
+            for start in range(0, len(row_numbers), 500):
+                chunk = row_numbers[start:start + 500]
+                placeholders = ', '.join('?' for _ in chunk)
+                for row in self.connection.execute(
+                    f"SELECT _row, {columns} FROM {_quote(sheet_name)} WHERE _row IN ({placeholders})", chunk
+                ):
+                    records[row[0]] = dict(zip(headers, row[1:]))
+        return records
+    
+    def find_row_by_id(self, sheet_name, id_column, id_value):
+        """Find a row by ID and return row number"""
+        try:
+            row_number, _ = self._find_record(sheet_name, id_column, id_value)
+            return row_number
+        except Exception as e:
+            print(f"Error finding row in {sheet_name}: {e}")
+            return None
+    
+    def get_record_by_id(self, sheet_name, id_column, id_value):
+        """Find a row by ID and return its record"""
+        try:
+            _, record = self._find_record(sheet_name, id_column, id_value)
+            return record
+        except Exception as e:
+            print(f"Error getting record from {sheet_name}: {e}")
+            return None
+    
+    def find_record_by_id(self, sheet_name, id_column, id_value):
+        """Find a row by ID and return (row number, record) from one query"""
+        try:
+            return self._find_record(sheet_name, id_column, id_value)
+        except Exception as e:
+            print(f"Error finding record in {sheet_name}: {e}")
+            return None, None
+    
+    def find_records_by_ids(self, sheet_name, id_column, id_values):
+        """Find several rows by ID with one query per 500 IDs"""
+        try:
+            headers = SHEET_SCHEMAS[sheet_name]
+            columns = ', '.join(_quote(header) for header in headers)
+            keys = [normalize_cell(str(id_value)) for id_value in id_values]
+            found = {}
+            with self._lock:
+                for start in range(0, len(keys), 500):
+                    chunk = keys[start:start + 500]
+                    placeholders = ', '.join('?' for _ in chunk)
+                    rows = self.connection.execute(
+                        f"SELECT _row, {columns} FROM {_quote(sheet_name)} "
+                        f"WHERE {_quote(id_column)} IN ({placeholders}) ORDER BY _row",
+                        chunk
+                    ).fetchall()
+                    for row in rows:
+                        record = dict(zip(headers, row[1:]))
+                        found.setdefault(str(record[id_column]), (row[0], record))
+            return found
+        except Exception as e:
+            print(f"Error finding records in {sheet_name}: {e}")
+            return {}
+    
+    def find_records(self, sheet_name, filters):
+        """Records matching every {header: value} filter, using the column indexes"""
+        try:
+            headers = SHEET_SCHEMAS[sheet_name]
+            unknown = [header for header in filters if header not in headers]
+            if unknown:
+                print(f"Unknown column {unknown[0]} in {sheet_name}")
+                return []
+            columns = ', '.join(_quote(header) for header in headers)
+            conditions = ' AND '.join(f"{_quote(header)} = ?" for header in filters) or '1'
+            with self._lock:
+                rows = self.connection.execute(
+                    f"SELECT {columns} FROM {_quote(sheet_name)} WHERE {conditions} ORDER BY _row",
+                    [normalize_cell(str(value)) for value in filters.values()]
+                ).fetchall()
+            return [dict(zip(headers, row)) for row in rows]
+        except Exception as e:
+            print(f"Error finding records in {sheet_name}: {e}")
+            return []
+    
+    def get_movements(self, start=None, end=None):
+        """Stock movements dated within [start, end], read through the Timestamp index"""
+        try:
+            sheet_name = Config.STOCK_MOVEMENTS_SHEET
+            headers = SHEET_SCHEMAS[sheet_name]
+            conditions = []
+            params = []
+            if start:
+                conditions.append('"Timestamp" >= ?')
+                params.append(start.isoformat())
+            if end:
+                # Timestamps are 'YYYY-MM-DD HH:MM:SS' text, so the day after bounds the range
+                conditions.append('"Timestamp" < ?')
+                params.append((end + timedelta(days=1)).isoformat())
+            columns = ', '.join(_quote(header) for header in headers)
+            where = ' AND '.join(conditions) or '1'
+            with self._lock:
+                rows = self.connection.execute(
+                    f"SELECT {columns} FROM {_quote(sheet_name)} WHERE {where} ORDER BY _row", params
+                ).fetchall()
+            return [dict(zip(headers, row)) for row in rows]
+        except Exception as e:
+            print(f"Error getting stock movements: {e}")
+            return []
+    
+    def _find_record(self, sheet_name, id_column, id_value):
+        """Return (row number, record) for an ID via the column index"""
+        headers = SHEET_SCHEMAS[sheet_name]
+        columns = ', '.join(_quote(header) for header in headers)
+        with self._lock:
+            row = self.connection.execute(
+                f"SELECT _row, {columns} FROM {_quote(sheet_name)} "
+                f"WHERE {_quote(id_column)} = ? ORDER BY _row LIMIT 1",
+                (normalize_cell(str(id_value)),)
+            ).fetchone()
+        if row is None:
+            return None, None
+        return row[0], dict(zip(headers, row[1:]))
@@ -0,0 +1,63 @@
+import os
+import sys
+
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from config.settings import Config
+from sheets_api.fake_sheets import FakeClient
+from sheets_api.google_sheets import SheetsManager
+from sheets_api.scheduler import RequestScheduler
+from storage.base import SHEET_SCHEMAS
+
+SPREADSHEET_ID = 'test-spreadsheet'
+ITEMS = 4
+
+def inventory_row(index, stock=10):
+    return [f"ITM-{index}", f"Item {index}", 'Produce', stock, 'lbs', 2, 5, 'Farm', '2026-10-01 09:00:00']
+
+@pytest.fixture
+def client():
+    """A fake spreadsheet with every sheet's headers and ITEMS inventory rows of 10 in stock"""
+    client = FakeClient()
+    spreadsheet = client.open_by_key(SPREADSHEET_ID)
+    for name, headers in SHEET_SCHEMAS.items():
+        spreadsheet.seed_worksheet(name, [list(headers)])
+    spreadsheet.seed_worksheet(
+        Config.INVENTORY_SHEET,
+        [list(SHEET_SCHEMAS[Config.INVENTORY_SHEET])] + [inventory_row(index) for index in range(ITEMS)]
+    )
+    return client
+
+def make_worker(client):
+    """A SheetsManager on the fake spreadsheet, as a separate app process would hold"""
+    sheets = SheetsManager(client=client, spreadsheet_id=SPREADSHEET_ID)
+    sheets.scheduler = RequestScheduler(reads_per_minute=10 ** 9, writes_per_minute=10 ** 9)
+    return sheets
+
+@pytest.fixture
+def failing_append(request, client, monkeypatch):
+    """Appends of request.param = (sheet_name, chunk_rows) chunks where the second call fails
+    
+    Returns the row count of each append call.
+    """
+    sheet_name, chunk_rows = request.param
+    monkeypatch.setattr(Config, 'SHEETS_APPEND_CHUNK_ROWS', chunk_rows)
+    worksheet = client.open_by_key(SPREADSHEET_ID)._worksheets[sheet_name]
+    append_rows = worksheet.append_rows
+    calls = []
+    
+    def flaky_append_rows(values, **kwargs):
+        calls.append(len(values))
+        if len(calls) == 2:
+            raise RuntimeError('Simulated API failure')
+        return append_rows(values, **kwargs)
+    
+    monkeypatch.setattr(worksheet, 'append_rows', flaky_append_rows)
+    return calls
+
+def sheet_rows(client, sheet_name):
+    """Raw rows of a fake worksheet below its header"""
+    return client.open_by_key(SPREADSHEET_ID)._worksheets[sheet_name].rows[1:]
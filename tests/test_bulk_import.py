@@ -0,0 +1,44 @@
+import pytest
+
+from config.settings import Config
+from inventory.models import InventoryManager
+from tests.conftest import ITEMS, make_worker, sheet_rows
+
+def bulk_items(count):
+    return [
+        {'name': f"Bulk {index}", 'category': 'Bulk', 'current_stock': index, 'unit': 'pcs',
+         'cost_per_unit': 1, 'reorder_level': 1, 'supplier': 'Bulk Supply'}
+        for index in range(count)
+    ]
+
+@pytest.mark.parametrize('failing_append', [(Config.INVENTORY_SHEET, 3)], indirect=True)
+def test_append_rows_counted_reports_committed_chunks(client, failing_append):
+    sheets = make_worker(client)
+    rows = [[f"ITM-NEW-{index}", 'New'] for index in range(7)]
+    
+    assert sheets.append_rows_counted(Config.INVENTORY_SHEET, rows) == 3
+    # Nothing after the failed chunk is sent
+    assert failing_append == [3, 3]
+
+@pytest.mark.parametrize('failing_append', [(Config.INVENTORY_SHEET, 3)], indirect=True)
+def test_bulk_import_reports_items_written_before_a_failed_chunk(client, failing_append):
+    manager = InventoryManager(make_worker(client))
+    
+    result = manager.add_items_bulk(bulk_items(7))
+    
+    assert not result['success']
+    assert len(result['item_ids']) == 3
+    assert [error['index'] for error in result['errors']] == [3, 4, 5, 6]
+    stored = [row[0] for row in sheet_rows(client, Config.INVENTORY_SHEET)[ITEMS:]]
+    assert stored == result['item_ids']
+    # Only the stored items get an Initial Stock movement
+    manager.sheets.flush_movements()
+    assert [row[1] for row in sheet_rows(client, Config.STOCK_MOVEMENTS_SHEET)] == result['item_ids']
+
+def test_bulk_import_writes_every_chunk(client, monkeypatch):
+    monkeypatch.setattr(Config, 'SHEETS_APPEND_CHUNK_ROWS', 3)
+    
+    result = InventoryManager(make_worker(client)).add_items_bulk(bulk_items(7))
+    
+    assert result['success'] and len(result['item_ids']) == 7
+    assert len(sheet_rows(client, Config.INVENTORY_SHEET)) == ITEMS + 7
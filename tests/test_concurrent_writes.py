@@ -0,0 +1,122 @@
+from config.settings import Config
+from inventory.models import InventoryManager
+from shipments.models import ShipmentManager
+from tests.conftest import make_worker, sheet_rows
+
+def stock_by_item(client):
+    return {row[0]: row[3] for row in sheet_rows(client, Config.INVENTORY_SHEET)}
+
+def test_update_after_another_worker_deletes_a_row_above(client):
+    worker_a, worker_b = InventoryManager(make_worker(client)), InventoryManager(make_worker(client))
+    # Both workers hold a snapshot taken before the delete
+    worker_a.get_all_items()
+    worker_b.get_all_items()
+    
+    assert worker_a.delete_item('ITM-0')
+    assert worker_b.update_stock('ITM-1', 5, 'Manual Adjustment')
+    
+    assert stock_by_item(client) == {'ITM-1': '15', 'ITM-2': '10', 'ITM-3': '10'}
+    assert worker_b.get_item_by_id('ITM-1')['Current Stock'] == 15
+
+def test_delete_after_another_worker_deletes_a_row_above(client):
+    worker_a, worker_b = InventoryManager(make_worker(client)), InventoryManager(make_worker(client))
+    worker_a.get_all_items()
+    worker_b.get_all_items()
+    
+    assert worker_a.delete_item('ITM-0')
+    assert worker_b.delete_item('ITM-2')
+    
+    assert sorted(stock_by_item(client)) == ['ITM-1', 'ITM-3']
+
+def test_write_to_a_row_another_worker_deleted_fails(client):
+    worker_a, worker_b = InventoryManager(make_worker(client)), InventoryManager(make_worker(client))
+    worker_b.get_all_items()
+    
+    assert worker_a.delete_item('ITM-1')
+    assert not worker_b.update_stock('ITM-1', 5, 'Manual Adjustment')
+    
+    assert stock_by_item(client) == {'ITM-0': '10', 'ITM-2': '10', 'ITM-3': '10'}
+
+def test_batch_update_is_relocated(client):
+    sheets_a, sheets_b = make_worker(client), make_worker(client)
+    found = sheets_b.find_records_by_ids(Config.INVENTORY_SHEET, 'Item ID', ['ITM-2', 'ITM-3'])
+    
+    assert InventoryManager(sheets_a).delete_item('ITM-0')
+    assert sheets_b.batch_update_cells(Config.INVENTORY_SHEET, {
+        found['ITM-2'][0]: {'Current Stock': 2},
+        found['ITM-3'][0]: {'Current Stock': 3}
+    })
+    
+    assert stock_by_item(client) == {'ITM-1': '10', 'ITM-2': '2', 'ITM-3': '3'}
+
+def test_row_resolved_before_the_snapshot_reloads_keeps_its_item(client):
+    sheets_a, sheets_b = make_worker(client), make_worker(client)
+    row_number, _ = sheets_b.find_record_by_id(Config.INVENTORY_SHEET, 'Item ID', 'ITM-1')
+    
+    assert InventoryManager(sheets_a).delete_item('ITM-0')
+    # The snapshot expires and is reloaded between the lookup and the write
+    sheets_b.cache.invalidate(Config.INVENTORY_SHEET)
+    sheets_b.get_all_records(Config.INVENTORY_SHEET)
+    assert sheets_b.update_cells(Config.INVENTORY_SHEET, row_number, {'Current Stock': 1})
+    
+    assert stock_by_item(client) == {'ITM-1': '1', 'ITM-2': '10', 'ITM-3': '10'}
+
+def test_snapshot_loaded_by_the_request_needs_no_check(client):
+    worker = make_worker(client)
+    worker.spreadsheet
+    inventory = InventoryManager(worker)
+    
+    worker.begin_request()
+    client.stats.reset()
+    assert inventory.update_stock('ITM-1', 5, 'Manual Adjustment')
+    worker.end_request()
+    assert client.stats.read_units == 1
+    
+    # A later request reuses the snapshot, so its rows are read back first
+    worker.begin_request()
+    client.stats.reset()
+    assert inventory.update_stock('ITM-1', 5, 'Manual Adjustment')
+    worker.end_request()
+    assert client.stats.read_units == 1
+    assert client.stats.calls['values_batch_get'] == 1
+    assert stock_by_item(client)['ITM-1'] == '20'
+
+def test_adjustments_from_two_workers_both_apply(client):
+    worker_a, worker_b = InventoryManager(make_worker(client)), InventoryManager(make_worker(client))
+    # Both workers cache a stock of 10 before either writes
+    worker_a.get_all_items()
+    worker_b.get_all_items()
+    
+    assert worker_a.update_stock('ITM-1', 5, 'Manual Adjustment')
+    assert worker_b.update_stock('ITM-1', 5, 'Manual Adjustment')
+    
+    assert stock_by_item(client)['ITM-1'] == '20'
+
+def test_receipt_and_count_build_on_the_live_stock(client):
+    worker_a, worker_b = InventoryManager(make_worker(client)), make_worker(client)
+    shipments = ShipmentManager(worker_b)
+    shipment_id = shipments.add_shipment({'supplier': 'Farm'})
+    InventoryManager(worker_b).get_all_items()
+    
+    assert worker_a.update_stock('ITM-1', 5, 'Manual Adjustment')
+    received = shipments.receive_shipment(shipment_id, [{'item_id': 'ITM-1', 'quantity': 3}], 'Dock')
+    assert received['success']
+    assert stock_by_item(client)['ITM-1'] == '18'
+    
+    assert worker_a.update_stock('ITM-2', -4, 'Manual Adjustment')
+    counted = InventoryManager(worker_b).cycle_count([{'item_id': 'ITM-2', 'counted_quantity': 6}])
+    assert counted['success']
+    assert [(line['system_quantity'], line['variance']) for line in counted['variances']] == [(6, 0)]
+
+def test_full_item_update_keeps_a_concurrent_adjustment(client):
+    worker_a, worker_b = InventoryManager(make_worker(client)), InventoryManager(make_worker(client))
+    worker_b.get_all_items()
+    
+    assert worker_a.update_stock('ITM-1', 5, 'Manual Adjustment')
+    # The form resends every field, with the stock raised from the 10 it showed
+    assert worker_b.update_item('ITM-1', {'name': 'Renamed', 'current_stock': 12, 'unit': 'lbs', 'cost_per_unit': 2})
+    assert worker_b.update_item('ITM-2', {'name': 'Kept', 'current_stock': 10, 'unit': 'kg'})
+    
+    rows = {row[0]: row for row in sheet_rows(client, Config.INVENTORY_SHEET)}
+    assert (rows['ITM-1'][1], rows['ITM-1'][3]) == ('Renamed', '17')
+    assert (rows['ITM-2'][1], rows['ITM-2'][3], rows['ITM-2'][4]) == ('Kept', '10', 'kg')
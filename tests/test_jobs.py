@@ -0,0 +1,19 @@
+from jobs.models import JobManager, JobStore
+from tests.conftest import make_worker
+
+def run_job(client, tmp_path, work):
+    """Run one job to completion and return its record"""
+    manager = JobManager(make_worker(client), store=JobStore(str(tmp_path / 'jobs.db')), max_workers=1)
+    job_id = manager.submit('test', work)
+    manager.executor.shutdown(wait=True)
+    return manager.get_job(job_id)
+
+def test_job_returning_a_result_completes(client, tmp_path):
+    job = run_job(client, tmp_path, lambda progress: {'success': True, 'count': 2})
+    assert job['status'] == 'completed'
+    assert job['result'] == {'success': True, 'count': 2}
+
+def test_job_returning_none_fails(client, tmp_path):
+    job = run_job(client, tmp_path, lambda progress: None)
+    assert job['status'] == 'failed'
+    assert job['error'] == 'Job failed without a result'
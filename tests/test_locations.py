@@ -0,0 +1,60 @@
+from config.settings import Config
+from inventory.models import InventoryManager
+from transfers.models import TransferManager
+from tests.conftest import make_worker, sheet_rows
+
+def transfer(transfers, from_location, to_location, quantity, item_id='ITM-1'):
+    data = {'from_location': from_location, 'to_location': to_location, 'item_id': item_id, 'quantity': quantity}
+    error = transfers.source_error(data)
+    if error:
+        return error
+    return transfers.complete_transfer(transfers.add_transfer(data))['error']
+
+def balances(inventory, item_id='ITM-1'):
+    return {entry['location']: entry['quantity'] for entry in inventory.get_item_locations(item_id)['locations']}
+
+def test_transfer_from_a_location_without_stock_is_refused(client):
+    transfers = TransferManager(make_worker(client))
+    
+    error = transfer(transfers, 'Cold Room', 'Shelf A', 2)
+    assert error.startswith('Cold Room holds no stock of ITM-1')
+    
+    # A transfer in from the default location seeds it
+    assert transfer(transfers, Config.DEFAULT_LOCATION, 'Cold Room', 4) is None
+    assert transfer(transfers, 'Cold Room', 'Shelf A', 2) is None
+    assert balances(InventoryManager(transfers.sheets)) == {Config.DEFAULT_LOCATION: 6, 'Cold Room': 2, 'Shelf A': 2}
+
+def test_lowering_stock_trims_assigned_locations(client):
+    sheets = make_worker(client)
+    inventory, transfers = InventoryManager(sheets), TransferManager(sheets)
+    assert transfer(transfers, Config.DEFAULT_LOCATION, 'Cold Room', 6) is None
+    assert transfer(transfers, Config.DEFAULT_LOCATION, 'Shelf A', 3) is None
+    
+    assert inventory.update_stock('ITM-1', -5, 'Manual Adjustment')
+    
+    # The default location is emptied first, then the largest balance
+    assert balances(inventory) == {Config.DEFAULT_LOCATION: 0, 'Cold Room': 2, 'Shelf A': 3}
+    sheets.flush_movements()
+    assert inventory.rebuild_locations()['mismatches'] == []
+    
+    counted = inventory.cycle_count([{'item_id': 'ITM-1', 'counted_quantity': 1}])
+    assert counted['success']
+    assert balances(inventory) == {Config.DEFAULT_LOCATION: 0, 'Cold Room': 1}
+    sheets.flush_movements()
+    assert inventory.rebuild_locations()['mismatches'] == []
+
+def test_failed_status_write_leaves_no_ledger_rows(client, monkeypatch):
+    sheets = make_worker(client)
+    transfers = TransferManager(sheets)
+    transfer_id = transfers.add_transfer({
+        'from_location': Config.DEFAULT_LOCATION, 'to_location': 'Cold Room', 'item_id': 'ITM-1', 'quantity': 4
+    })
+    
+    # The new ledger row is appended, then the ledger and status write fails
+    monkeypatch.setattr(sheets, 'batch_update_sheets', lambda updates: False)
+    assert transfers.complete_transfers([transfer_id])['error'] == 'Failed to complete transfers'
+    assert sheet_rows(client, Config.STOCK_LOCATIONS_SHEET) == []
+    
+    monkeypatch.undo()
+    assert transfers.complete_transfer(transfer_id)['error'] is None
+    assert balances(InventoryManager(sheets)) == {Config.DEFAULT_LOCATION: 6, 'Cold Room': 4}
@@ -0,0 +1,26 @@
+import time
+
+import pytest
+
+from config.settings import Config
+from sheets_api.movement_writer import MovementWriter
+from tests.conftest import make_worker, sheet_rows
+
+def movement(index):
+    return ['2026-10-01 09:00:00', f"ITM-{index}", f"Item {index}", 'Manual Adjustment', -1, 9, '', '']
+
+@pytest.mark.parametrize('failing_append', [(Config.STOCK_MOVEMENTS_SHEET, 2)], indirect=True)
+def test_failed_flush_requeues_only_unwritten_rows_and_retries(client, failing_append):
+    writer = MovementWriter(make_worker(client), max_rows=100, flush_interval_ms=50)
+    for index in range(5):
+        writer.enqueue(movement(index))
+    
+    assert not writer.flush()
+    assert writer.pending() == 3
+    
+    # The re-armed timer writes the rest without another enqueue or flush call
+    deadline = time.monotonic() + 2
+    while writer.pending() and time.monotonic() < deadline:
+        time.sleep(0.01)
+    assert writer.pending() == 0
+    assert [row[1] for row in sheet_rows(client, Config.STOCK_MOVEMENTS_SHEET)] == [f"ITM-{index}" for index in range(5)]
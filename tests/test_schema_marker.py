@@ -0,0 +1,34 @@
+import gspread
+
+from config.settings import Config
+from tests.conftest import SPREADSHEET_ID, make_worker
+
+def boot(client, marker_path):
+    """Connect a fresh worker whose instance temp directory starts empty"""
+    marker_path.unlink(missing_ok=True)
+    sheets = make_worker(client)
+    sheets._use_schema_marker = True
+    client.stats.reset()
+    sheets.spreadsheet
+    return sheets
+
+def test_cold_boot_on_a_new_instance_skips_the_schema_check(client, tmp_path, monkeypatch):
+    marker_path = tmp_path / 'schema_verified'
+    monkeypatch.setattr(Config, 'SCHEMA_MARKER_PATH', str(marker_path))
+    boot(client, marker_path)
+    assert client.stats.calls['worksheets'] == 1
+    assert len(client.open_by_key(SPREADSHEET_ID).developer_metadata) == 1
+    
+    boot(client, marker_path)
+    assert 'worksheets' not in client.stats.calls
+    assert client.stats.calls['fetch_sheet_metadata'] == 1
+
+def test_structural_error_unmarks_the_spreadsheet(client, tmp_path, monkeypatch):
+    marker_path = tmp_path / 'schema_verified'
+    monkeypatch.setattr(Config, 'SCHEMA_MARKER_PATH', str(marker_path))
+    sheets = boot(client, marker_path)
+    sheets._handle_error(Config.INVENTORY_SHEET, gspread.exceptions.WorksheetNotFound(Config.INVENTORY_SHEET))
+    assert client.open_by_key(SPREADSHEET_ID).developer_metadata == []
+    
+    boot(client, marker_path)
+    assert client.stats.calls['worksheets'] == 1
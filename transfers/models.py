@@ -1,11 +1,14 @@
 from datetime import datetime
 import uuid
 from config.settings import Config
+from inventory.locations import LocationLedger, parse_locations
+from storage.base import StorageQuotaError
 
 class TransferManager:
     def __init__(self, sheets_manager):
         self.sheets = sheets_manager
         self.sheet_name = Config.TRANSFERS_SHEET
+        self.locations = LocationLedger(sheets_manager)
     
     def generate_transfer_id(self):
         """Generate a unique transfer ID"""
@@ -34,14 +37,40 @@ class TransferManager:
             if success:
                 return transfer_id
             return None
+        except StorageQuotaError:
+            raise
         except Exception as e:
             print(f"Error adding transfer: {e}")
             return None
     
+    def source_error(self, transfer_data):
+        """Why a new transfer's source cannot supply it, or None
+        
+        Stock reaches a named location only by a transfer into it, so a
+        transfer out of one that holds none of the item could never complete.
+        """
+        try:
+            from_location = str(transfer_data.get('from_location', '')).strip()
+            if not from_location or from_location == self.locations.default_location:
+                return None
+            item_id = str(transfer_data.get('item_id', '')).strip()
+            _, ledger_record = self.sheets.find_record_by_id(Config.STOCK_LOCATIONS_SHEET, 'Item ID', item_id)
+            assigned = parse_locations(ledger_record.get('Locations') if ledger_record else None)
+            if assigned.get(from_location, 0) > 1e-9:
+                return None
+            return f"{from_location} holds no stock of {item_id}; transfer stock there from {self.locations.default_location} first"
+        except StorageQuotaError:
+            raise
+        except Exception as e:
+            print(f"Error checking transfer source: {e}")
+            return None
+    
     def get_all_transfers(self):
         """Get all transfers"""
         try:
             return self.sheets.get_all_records(self.sheet_name)
+        except StorageQuotaError:
+            raise
         except Exception as e:
             print(f"Error getting all transfers: {e}")
             return []
@@ -49,11 +78,9 @@ class TransferManager:
     def get_transfer_by_id(self, transfer_id):
         """Get a specific transfer by ID"""
         try:
-            records = self.get_all_transfers()
-            for record in records:
-                if record.get('Transfer ID') == transfer_id:
-                    return record
-            return None
+            return self.sheets.get_record_by_id(self.sheet_name, 'Transfer ID', transfer_id)
+        except StorageQuotaError:
+            raise
         except Exception as e:
             print(f"Error getting transfer by ID: {e}")
             return None
@@ -84,61 +111,169 @@ class TransferManager:
             }
             
             return self.sheets.update_row(self.sheet_name, row_number, updated_data)
+        except StorageQuotaError:
+            raise
         except Exception as e:
             print(f"Error updating transfer status: {e}")
             return False
     
     def complete_transfer(self, transfer_id):
-        """Complete a transfer and update inventory levels"""
+        """Complete a transfer, moving its quantity between locations
+        
+        Returns {'success', 'transfer_id', 'error', 'locations'}.
+        """
+        result = self.complete_transfers([transfer_id])
+        if result['results']:
+            line = result['results'][0]
+            return {
+                'success': line['status'] == 'completed',
+                'transfer_id': transfer_id,
+                'error': line['error'],
+                'locations': line['locations']
+            }
+        return {'success': False, 'transfer_id': transfer_id, 'error': result['error'], 'locations': None}
+    
+    def complete_transfers(self, transfer_ids):
+        """Complete many transfers against one snapshot of Transfers, Inventory and Stock_Locations
+        
+        Item totals are unchanged; each transfer moves its quantity from the
+        source location (which must hold enough stock) to the destination.
+        Transfers of the same item are applied in order. Ledger rows and
+        statuses go out in one batched write and the movements in one
+        append. Ledger rows for items without one are appended first and
+        deleted again if the batched write fails, so a retry starts from the
+        same balances. Returns {'success', 'results', 'error'} with one
+        result per ID.
+        """
         try:
-            from inventory.models import InventoryManager
-            inventory_manager = InventoryManager(self.sheets)
+            self.sheets.prefetch([self.sheet_name, Config.INVENTORY_SHEET, Config.STOCK_LOCATIONS_SHEET])
+            transfer_ids = [str(transfer_id).strip() for transfer_id in transfer_ids]
+            transfers = self.sheets.find_records_by_ids(self.sheet_name, 'Transfer ID', list(set(transfer_ids)))
+            item_ids = list({str(transfers[transfer_id][1].get('Item ID', '')) for transfer_id in transfers})
+            items = self.sheets.find_records_by_ids(Config.INVENTORY_SHEET, 'Item ID', item_ids)
+            ledger = self.sheets.find_records_by_ids(Config.STOCK_LOCATIONS_SHEET, 'Item ID', item_ids)
             
-            transfer = self.get_transfer_by_id(transfer_id)
-            if not transfer:
-                return False
-            
-            item_id = transfer.get('Item ID')
-            quantity = float(transfer.get('Quantity', 0))
-            from_location = transfer.get('From Location', '')
-            to_location = transfer.get('To Location', '')
-            
-            if item_id and quantity > 0:
-                # Note: In a more complex system, you'd have location-specific inventory
-                # For now, we'll just log the transfer movement
-                inventory_manager.sheets.log_stock_movement(
+            # Working copy of each touched item's assigned balances
+            states = {}
+            moved = set()
+            status_updates = {}
+            movement_rows = []
+            results = []
+            for transfer_id in transfer_ids:
+                result = {'transfer_id': transfer_id, 'status': 'rejected', 'error': None, 'locations': None}
+                results.append(result)
+                if transfer_id not in transfers:
+                    result['error'] = 'Transfer not found'
+                    continue
+                row_number, transfer = transfers[transfer_id]
+                if row_number in status_updates:
+                    result['error'] = 'Transfer listed more than once'
+                    continue
+                if transfer.get('Status') != 'Pending':
+                    result['error'] = f"Transfer is {transfer.get('Status')}"
+                    continue
+                
+                item_id = str(transfer.get('Item ID', ''))
+                quantity = float(transfer.get('Quantity', 0) or 0)
+                from_location = str(transfer.get('From Location', ''))
+                to_location = str(transfer.get('To Location', ''))
+                if not item_id or quantity <= 0:
+                    result['error'] = 'Transfer needs an item and a positive quantity'
+                    continue
+                if from_location == to_location:
+                    result['error'] = 'From and To locations are the same'
+                    continue
+                if item_id not in items:
+                    result['error'] = 'Item not found'
+                    continue
+                
+                _, item = items[item_id]
+                if item_id not in states:
+                    ledger_row, ledger_record = ledger.get(item_id, (None, None))
+                    states[item_id] = (ledger_row, parse_locations(ledger_record.get('Locations') if ledger_record else None))
+                ledger_row, assigned = states[item_id]
+                assigned, error = self.locations.move(item, assigned, from_location, to_location, quantity)
+                if error:
+                    result['error'] = error
+                    continue
+                states[item_id] = (ledger_row, assigned)
+                moved.add(item_id)
+                status_updates[row_number] = {'Status': 'Completed'}
+                movement_rows.append(self.sheets.build_movement_row(
                     item_id,
-                    transfer.get('Item Name', ''),
+                    item.get('Name', ''),
                     'Transfer',
-                    0,  # No net stock change in simple system
-                    inventory_manager.get_item_by_id(item_id).get('Current Stock', 0),
+                    0,
+                    item.get('Current Stock', 0),
                     transfer_id,
                     f"Transferred {quantity} from {from_location} to {to_location}"
-                )
-                
-                # Update transfer status
-                return self.update_transfer_status(transfer_id, 'Completed')
+                ))
+                result['status'] = 'completed'
+                result['locations'] = {
+                    from_location: self.locations.available(item, assigned, from_location),
+                    to_location: self.locations.available(item, assigned, to_location)
+                }
             
-            return False
+            if not status_updates:
+                return {'success': True, 'results': results, 'error': None}
+            
+            # New ledger rows need an append; everything else is one write
+            ledger_updates, new_rows = self.locations.ledger_writes({
+                item_id: states[item_id] for item_id in moved
+            })
+            failed = None
+            if new_rows and not self.sheets.append_rows(Config.STOCK_LOCATIONS_SHEET, new_rows):
+                failed = 'Failed to write stock locations'
+            elif not self.sheets.batch_update_sheets({
+                Config.STOCK_LOCATIONS_SHEET: ledger_updates,
+                self.sheet_name: status_updates
+            }):
+                failed = 'Failed to complete transfers'
+            if failed:
+                # Rows added for this batch would move the stock again on a retry
+                if new_rows and not self.locations.drop_rows(row[0] for row in new_rows):
+                    print("Error removing stock location rows of failed transfers")
+                for result in results:
+                    if result['status'] == 'completed':
+                        result.update(status='rejected', error=failed, locations=None)
+                return {'success': False, 'results': results, 'error': failed}
+            
+            # Total stock is unchanged; the movements record the transfers for replay
+            if not self.sheets.log_stock_movements(movement_rows):
+                print("Error logging transfer movements")
+            
+            return {'success': True, 'results': results, 'error': None}
+        except StorageQuotaError:
+            raise
         except Exception as e:
-            print(f"Error completing transfer: {e}")
-            return False
+            print(f"Error completing transfers: {e}")
+            return {'success': False, 'results': [], 'error': str(e)}
     
-    def get_transfers_by_status(self, status):
-        """Get transfers filtered by status"""
+    def find_transfers(self, status=None, from_location=None, to_location=None):
+        """Get transfers matching every given filter, via the Status/location indexes"""
+        filters = {}
+        if status:
+            filters['Status'] = status
+        if from_location:
+            filters['From Location'] = from_location
+        if to_location:
+            filters['To Location'] = to_location
         try:
-            transfers = self.get_all_transfers()
-            return [t for t in transfers if t.get('Status') == status]
+            if not filters:
+                return self.get_all_transfers()
+            return self.sheets.find_records(self.sheet_name, filters)
+        except StorageQuotaError:
+            raise
         except Exception as e:
-            print(f"Error getting transfers by status: {e}")
+            print(f"Error finding transfers: {e}")
             return []
     
+    def get_transfers_by_status(self, status):
+        """Get transfers filtered by status"""
+        return self.find_transfers(status=status)
+    
     def get_transfers_by_location(self, location, location_type='from'):
         """Get transfers filtered by location (from or to)"""
-        try:
-            transfers = self.get_all_transfers()
-            location_field = 'From Location' if location_type == 'from' else 'To Location'
-            return [t for t in transfers if t.get(location_field) == location]
-        except Exception as e:
-            print(f"Error getting transfers by location: {e}")
-            return []
\ No newline at end of file
+        if location_type == 'from':
+            return self.find_transfers(from_location=location)
+        return self.find_transfers(to_location=location)
\ No newline at end of file